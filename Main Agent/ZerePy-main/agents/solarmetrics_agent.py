@@ -1,5 +1,7 @@
 import json
-import requests
+import time
+import importlib.util
+import httpx
 
 # Load agent configuration
 with open("agent.json", "r") as config_file:
@@ -7,6 +9,16 @@ with open("agent.json", "r") as config_file:
 
 OPENAI_API_KEY = config["config"][1]["api_key"]
 
+# One keep-alive client for every call: no new TCP/TLS handshake per decision.
+# HTTP/2 is used when the optional `h2` package is installed.
+client = httpx.Client(
+    base_url="https://api.openai.com/v1",
+    headers={"Authorization": f"Bearer {OPENAI_API_KEY}"},
+    http2=importlib.util.find_spec("h2") is not None,
+    limits=httpx.Limits(max_connections=10, max_keepalive_connections=5, keepalive_expiry=120),
+    timeout=httpx.Timeout(60.0, connect=5.0),
+)
+
 
 def process_energy_data(energy_data):
     """
@@ -34,14 +46,15 @@ def process_energy_data(energy_data):
     Provide only the necessary transactions.
     """
 
-    response = requests.post(
-        "https://api.openai.com/v1/chat/completions",
-        headers={"Authorization": f"Bearer {OPENAI_API_KEY}"},
+    start = time.perf_counter()
+    response = client.post(
+        "/chat/completions",
         json={
             "model": "gpt-4",
             "messages": [{"role": "system", "content": prompt}],
         },
     )
+    print(f"⏱️ OpenAI responded in {(time.perf_counter() - start) * 1000:.0f} ms ({response.http_version})")
 
     decision = response.json().get("choices", [{}])[0].get("message", {}).get("content", "No decision made")
     return decision
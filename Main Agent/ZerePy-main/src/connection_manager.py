@@ -13,6 +13,7 @@ from src.connections.solana_connection import SolanaConnection
 from src.connections.hyperbolic_connection import HyperbolicConnection
 from src.connections.galadriel_connection import GaladrielConnection
 from src.connections.sonic_connection import SonicConnection
+from src.connections.async_sonic_connection import AsyncSonicConnection
 from src.connections.discord_connection import DiscordConnection
 from src.connections.allora_connection import AlloraConnection
 from src.connections.xai_connection import XAIConnection
@@ -59,6 +60,7 @@ class ConnectionManager:
             "hyperbolic": HyperbolicConnection,
             "galadriel": GaladrielConnection,
             "sonic": SonicConnection,
+            "sonic_async": AsyncSonicConnection,
             "discord": DiscordConnection,
             "allora": AlloraConnection,
             "xai": XAIConnection,
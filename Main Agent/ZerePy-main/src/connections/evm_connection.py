@@ -8,6 +8,9 @@ from web3 import Web3
 from web3.middleware import geth_poa_middleware
 from src.constants.networks import EVM_NETWORKS
 from src.constants.abi import ERC20_ABI
+from src.helpers.nonce_manager import get_nonce_manager
+from src.helpers.rpc_pool import make_provider
+from src.helpers.token_metadata import token_metadata
 from src.connections.base_connection import BaseConnection, Action, ActionParameter
 
 logger = logging.getLogger("connections.evm_connection")
@@ -34,11 +37,14 @@ class EVMConnection(BaseConnection):
         
         # Get RPC URL: either from the config override or from the network defaults
         self.rpc_url = config.get("rpc") or network_config["rpc_url"]
+        self.rpc_urls = config.get("rpc_urls") or (
+            [self.rpc_url] if config.get("rpc") else network_config.get("rpc_urls", [self.rpc_url]))
         self.scanner_url = network_config["scanner_url"]
         self.chain_id = network_config["chain_id"]
         
         super().__init__(config)
         self._initialize_web3()
+        self._nonces = get_nonce_manager(self._web3)
         
         # Kyberswap aggregator API for best swap routes
         self.aggregator_api = f"https://aggregator-api.kyberswap.com/{self.network}/api/v1"
@@ -50,27 +56,38 @@ class EVMConnection(BaseConnection):
     def _initialize_web3(self) -> None:
         """Initialize Web3 connection with retry logic"""
         if not self._web3:
+            # One provider for every attempt: each PooledHTTPProvider runs its own health check thread
+            web3 = Web3(make_provider(self.rpc_urls))
+            web3.middleware_onion.inject(geth_poa_middleware, layer=0)
             for attempt in range(3):
                 try:
-                    self._web3 = Web3(Web3.HTTPProvider(self.rpc_url))
-                    self._web3.middleware_onion.inject(geth_poa_middleware, layer=0)
-                    
-                    if not self._web3.is_connected():
+                    if not web3.is_connected():
                         raise EthereumConnectionError("Failed to connect to Ethereum network")
                     
-                    chain_id = self._web3.eth.chain_id
+                    chain_id = web3.eth.chain_id
                     if chain_id != self.chain_id:
                         raise EthereumConnectionError(f"Connected to wrong chain. Expected {self.chain_id}, got {chain_id}")
                         
                     logger.info(f"Connected to {self.network} network with chain ID: {chain_id}")
+                    self._web3 = web3
                     break
                     
                 except Exception as e:
                     if attempt == 2:
+                        if hasattr(web3.provider, "close"):
+                            web3.provider.close()
                         raise EthereumConnectionError(f"Failed to initialize Web3 after 3 attempts: {str(e)}")
                     logger.warning(f"Web3 initialization attempt {attempt + 1} failed: {str(e)}")
                     time.sleep(1)
 
+    def _sign_and_send(self, account, tx: Dict[str, Any]):
+        """Sign and broadcast a transaction using a locally managed nonce"""
+        def sign(nonce: int):
+            tx['nonce'] = nonce
+            return account.sign_transaction(tx).rawTransaction
+
+        return self._nonces.submit(account.address, sign)
+
     @property
     def is_llm_provider(self) -> bool:
         return False
@@ -254,7 +271,7 @@ class EVMConnection(BaseConnection):
                 abi=ERC20_ABI
             )
             balance = contract.functions.balanceOf(Web3.to_checksum_address(address)).call()
-            decimals = contract.functions.decimals().call()
+            decimals = token_metadata.decimals(self._web3, token_address)
             return balance / (10 ** decimals)
         else:
             balance = self._web3.eth.get_balance(Web3.to_checksum_address(address))
@@ -280,7 +297,7 @@ class EVMConnection(BaseConnection):
                 address=Web3.to_checksum_address(token_address), 
                 abi=ERC20_ABI 
             )
-            decimals = token_contract.functions.decimals().call()
+            decimals = token_metadata.decimals(self._web3, token_address)
             raw_balance = token_contract.functions.balanceOf(account.address).call()
             token_balance = raw_balance / (10 ** decimals)
             return token_balance
@@ -293,7 +310,6 @@ class EVMConnection(BaseConnection):
         try:
             private_key = os.getenv('EVM_PRIVATE_KEY') or os.getenv('ETH_PRIVATE_KEY')
             account = self._web3.eth.account.from_key(private_key)
-            nonce = self._web3.eth.get_transaction_count(account.address)
             gas_price = self._web3.eth.gas_price
             
             if token_address and token_address.lower() != self.NATIVE_TOKEN.lower():
@@ -301,20 +317,18 @@ class EVMConnection(BaseConnection):
                     address=Web3.to_checksum_address(token_address),
                     abi=ERC20_ABI
                 )
-                decimals = contract.functions.decimals().call()
+                decimals = token_metadata.decimals(self._web3, token_address)
                 amount_raw = int(amount * (10 ** decimals))
                 tx = contract.functions.transfer(
                     Web3.to_checksum_address(to_address),
                     amount_raw
                 ).build_transaction({
                     'from': account.address,
-                    'nonce': nonce,
                     'gasPrice': gas_price,
                     'chainId': self.chain_id
                 })
             else:
                 tx = {
-                    'nonce': nonce,
                     'to': Web3.to_checksum_address(to_address),
                     'value': self._web3.to_wei(amount, 'ether'),
                     'gas': 21000,
@@ -336,8 +350,7 @@ class EVMConnection(BaseConnection):
             tx = self._prepare_transfer_tx(to_address, amount, token_address)
             private_key = os.getenv('EVM_PRIVATE_KEY') or os.getenv('ETH_PRIVATE_KEY')
             account = self._web3.eth.account.from_key(private_key)
-            signed = account.sign_transaction(tx)
-            tx_hash = self._web3.eth.send_raw_transaction(signed.rawTransaction)
+            tx_hash = self._sign_and_send(account, tx)
             tx_url = self._get_explorer_link(tx_hash.hex())
             return tx_url
 
@@ -352,11 +365,7 @@ class EVMConnection(BaseConnection):
             if token_in.lower() == self.NATIVE_TOKEN.lower():
                 amount_raw = self._web3.to_wei(amount, 'ether')
             else:
-                token_contract = self._web3.eth.contract(
-                    address=Web3.to_checksum_address(token_in),
-                    abi=ERC20_ABI
-                )
-                decimals = token_contract.functions.decimals().call()
+                decimals = token_metadata.decimals(self._web3, token_in)
                 amount_raw = int(amount * (10 ** decimals))
             
             headers = {"x-client-id": "zerepy"}
@@ -403,7 +412,6 @@ class EVMConnection(BaseConnection):
                 'to': Web3.to_checksum_address(route_data["routerAddress"]),
                 'data': data["data"]["data"],
                 'value': self._web3.to_wei(amount, 'ether') if token_in.lower() == self.NATIVE_TOKEN.lower() else 0,
-                'nonce': self._web3.eth.get_transaction_count(account.address),
                 'gasPrice': self._web3.eth.gas_price,
                 'chainId': self.chain_id
             }
@@ -435,7 +443,6 @@ class EVMConnection(BaseConnection):
                     amount
                 ).build_transaction({
                     'from': account.address,
-                    'nonce': self._web3.eth.get_transaction_count(account.address),
                     'gasPrice': self._web3.eth.gas_price,
                     'chainId': self.chain_id
                 })
@@ -445,8 +452,7 @@ class EVMConnection(BaseConnection):
                 except Exception as e:
                     logger.warning(f"Approval gas estimation failed: {e}, using default")
                     approve_tx['gas'] = 100000
-                signed_approve = account.sign_transaction(approve_tx)
-                tx_hash = self._web3.eth.send_raw_transaction(signed_approve.rawTransaction)
+                tx_hash = self._sign_and_send(account, approve_tx)
                 receipt = self._web3.eth.wait_for_transaction_receipt(tx_hash)
                 if receipt['status'] != 1:
                     raise ValueError("Token approval failed")
@@ -473,18 +479,13 @@ class EVMConnection(BaseConnection):
                 if token_in.lower() == "0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2".lower():
                     amount_raw = self._web3.to_wei(amount, 'ether')
                 else:
-                    token_contract = self._web3.eth.contract(
-                        address=Web3.to_checksum_address(token_in),
-                        abi=ERC20_ABI
-                    )
-                    decimals = token_contract.functions.decimals().call()
+                    decimals = token_metadata.decimals(self._web3, token_in)
                     amount_raw = int(amount * (10 ** decimals))
                 approval_hash = self._handle_token_approval(token_in, router_address, amount_raw)
                 if approval_hash:
                     logger.info(f"Token approval transaction: {self._get_explorer_link(approval_hash)}")
             swap_tx = self._build_swap_tx(token_in, token_out, amount, slippage, route_data)
-            signed_tx = account.sign_transaction(swap_tx)
-            tx_hash = self._web3.eth.send_raw_transaction(signed_tx.rawTransaction)
+            tx_hash = self._sign_and_send(account, swap_tx)
             tx_url = self._get_explorer_link(tx_hash.hex())
             return (f"Swap transaction sent! (allow time for scanner to populate it):\nTransaction: {tx_url}")
                 
@@ -1,7 +1,7 @@
 import logging
 import requests
 import json
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, Optional
 from src.connections.base_connection import BaseConnection, Action, ActionParameter
 
 logger = logging.getLogger("connections.ollama_connection")
@@ -21,6 +21,11 @@ class OllamaConnection(BaseConnection):
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.base_url = config.get("base_url", "http://localhost:11434")  # Default to local Ollama setup
+        # Keep the model resident and the HTTP connection open between calls
+        self.keep_alive = config.get("keep_alive", "30m")
+        self.options = config.get("options", {})
+        self.timeout = config.get("timeout", 60)
+        self.session = requests.Session()
 
     @property
     def is_llm_provider(self) -> bool:
@@ -95,39 +100,66 @@ class OllamaConnection(BaseConnection):
                 logger.error(f"Ollama configuration check failed: {e}")
             return False
 
-    def generate_text(self, prompt: str, system_prompt: str, model: str = None, **kwargs) -> str:
-        """Generate text using Ollama API with streaming support"""
-        try:
-            url = f"{self.base_url}/api/generate"
-            payload = {
-                "model": model or self.config["model"],
-                "prompt": prompt,
-                "system": system_prompt,
-            }
-            response = requests.post(url, json=payload, stream=True)
+    def stream_text(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        model: str = None,
+        **options
+    ) -> Iterator[str]:
+        """Yield the generated text piece by piece as Ollama streams it back.
+
+        Keyword arguments are passed as model options (temperature, num_predict, ...)
+        on top of the configured ones.
+        """
+        url = f"{self.base_url}/api/generate"
+        payload = {
+            "model": model or self.config["model"],
+            "prompt": prompt,
+            "stream": True,
+            "keep_alive": self.keep_alive,
+        }
+        # An empty system prompt would override the one baked into the Modelfile
+        if system_prompt:
+            payload["system"] = system_prompt
+        if self.options or options:
+            payload["options"] = {**self.options, **options}
 
+        with self.session.post(url, json=payload, stream=True, timeout=self.timeout) as response:
             if response.status_code != 200:
                 raise OllamaAPIError(f"API error: {response.status_code} - {response.text}")
 
-            # Initialize an empty string to store the complete response
-            full_response = ""
-
-            # Process each line of the response as a JSON object
+            # Each line of the response is a JSON object carrying the next piece of text
             for line in response.iter_lines():
-                if line:
-                    try:
-                        # Parse the JSON object
-                        data = json.loads(line.decode("utf-8"))
-                        # Append the "response" field to the full response
-                        full_response += data.get("response", "")
-                    except json.JSONDecodeError as e:
-                        raise OllamaAPIError(f"Failed to parse JSON: {e}")
-
-            return full_response
+                if not line:
+                    continue
+                try:
+                    data = json.loads(line.decode("utf-8"))
+                except json.JSONDecodeError as e:
+                    raise OllamaAPIError(f"Failed to parse JSON: {e}")
+                if data.get("error"):
+                    raise OllamaAPIError(data["error"])
+                if data.get("response"):
+                    yield data["response"]
+                if data.get("done"):
+                    break
 
+    def generate_text(self, prompt: str, system_prompt: str, model: str = None, **kwargs) -> str:
+        """Generate text using Ollama API with streaming support"""
+        try:
+            return "".join(self.stream_text(prompt, system_prompt, model))
         except Exception as e:
             raise OllamaAPIError(f"Text generation failed: {e}")
 
+    def preload(self, model: str = None) -> None:
+        """Load the model into memory ahead of the first request so it doesn't pay the load time"""
+        response = self.session.post(
+            f"{self.base_url}/api/generate",
+            json={"model": model or self.config["model"], "keep_alive": self.keep_alive},
+            timeout=self.timeout)
+        if response.status_code != 200:
+            raise OllamaAPIError(f"Failed to load model: {response.status_code} - {response.text}")
+
     def perform_action(self, action_name: str, kwargs) -> Any:
         if action_name not in self.actions:
             raise KeyError(f"Unknown action: {action_name}")
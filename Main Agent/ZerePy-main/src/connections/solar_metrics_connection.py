@@ -2,18 +2,83 @@ import logging
 import json
 import websocket
 import time
-from typing import Dict, Any
-from threading import Thread
-from openai import OpenAI
-from src.connections.base_connection import BaseConnection
+import itertools
+import random
+import multiprocessing
+from typing import Dict, Any, Iterator, List, Union
+from threading import Event, Thread
+from concurrent.futures import ProcessPoolExecutor
+from src.connections.base_connection import BaseConnection, Action
 from src.helpers.solar_transaction_manager import SolarTransactionManager
+from src.helpers.decision_cache import DecisionCache
+from src.helpers.decision_feed import DecisionFeed
+from src.helpers.energy_dataset import energy_prompt
+from src.helpers.llm_client import LatencyRecorder, get_openai_client
+from src.helpers.tick_coalescer import FeederPool
+from src.helpers.solar_clearing import ClearingEngine, build_decision, parse_decision_text
 
 logger = logging.getLogger("connections.solar_metrics_connection")
 
 
+DECISION_ENGINES = ("clearing", "llm", "local")
+CLEARING_EXECUTORS = ("thread", "process")
+
+SYSTEM_PROMPT = (
+    "You are an AI agent responsible for handling SOLAR token transactions in an energy marketplace.\n"
+    "You must correctly process transactions ensuring that:\n"
+    "- The receiver of kWh **ALWAYS** sends SOLAR tokens in return.\n"
+    "- The sender of kWh **ALWAYS** receives SOLAR tokens.\n"
+    "- If a house has extra energy, it receives SOLAR tokens from the Public Grid.\n"
+    "- If a house needs energy, it **sends** SOLAR tokens to the seller.\n"
+    "- Your final output must only contain SOLAR token transactions formatted as follows:\n"
+    "   - 'Wallet [Sender Wallet] sends [Token Amount] SOLAR to [Receiver Wallet] on Sonic Network.'\n"
+)
+
+
+def llm_messages(data: str, wallets: Dict[str, str]) -> List[Dict[str, str]]:
+    """Chat messages asking a general-purpose model to settle one energy snapshot"""
+    return [{
+        "role": "system",
+        "content": SYSTEM_PROMPT
+    }, {
+        "role": "user",
+        "content": f"Analyze the energy flow and structure transactions using the following wallets:\n\n"
+        f"{json.dumps(wallets, indent=2)}\n\n"
+        "Example format:\n"
+        "- Wallet 0x... sends 3 SOLAR to Wallet 0x... on Sonic Network.\n"
+        "- Wallet 0x... sends 5 SOLAR to Wallet 0x... on Sonic Network.\n\n"
+        f"Analyze and generate transactions for: {data}"
+    }]
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """Full-jitter exponential backoff: a random delay up to min(cap, base * 2^attempt)"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def clear_houses(engine: ClearingEngine, houses: List[Dict[str, Any]], batch_threshold: int, chunk_ticks: int):
+    """Clear one snapshot, switching to the vectorized path for large unpriced ones.
+
+    Module-level so a ProcessPoolExecutor can run it.
+    """
+    if len(houses) < batch_threshold or any("price" in house for house in houses):
+        return engine.clear(houses)
+
+    from src.helpers.solar_batch_clearing import clear_batch, houses_to_arrays, to_trades
+
+    houses = [house for house in houses if engine.wallet_for(house)]
+    names, generation, consumption = houses_to_arrays(houses)
+    result = clear_batch(generation, consumption,
+                         price_per_kwh=engine.price_per_kwh,
+                         allocation=engine.allocation,
+                         chunk_ticks=chunk_ticks)
+    return to_trades(result, names, price_per_kwh=engine.price_per_kwh, precision=engine.precision)
+
+
 class SolarMetricsConnection(BaseConnection):
     last_ai_decision = None
-    ws_clients = []  
+    last_decision = None
+    last_explanation = None
 
     house_wallets = {
         "H1": "0xE860ADA0513Cd6490684BC23e04B27E410DE84FC",
@@ -31,35 +96,105 @@ class SolarMetricsConnection(BaseConnection):
 
         super().__init__(config)
 
-        self._start_backend_websocket()
+        self.house_wallets = {**SolarMetricsConnection.house_wallets, **config.get("house_wallets", {})}
+        self.decision_engine = config.get("decision_engine", "clearing")
+        self.llm_model = config.get("llm_model", "gpt-4")
+        self.llm_explainer = config.get("llm_explainer", False)
+        self.llm_pool = config.get("llm_pool", {})
+        self.llm_stream = config.get("llm_stream", True)
+        self.llm_latency = LatencyRecorder()
+        self._client = None
+        # Local model served by Ollama (or any server speaking its /api/generate), tuned on modeltraining/energy.json
+        self.local_model = config.get("local_model", "solarmetrics")
+        self.local_base_url = config.get("local_base_url", "http://localhost:11434")
+        self.local_keep_alive = config.get("local_keep_alive", "30m")
+        self.local_options = config.get("local_options", {"temperature": 0})
+        self._local = None
+        self.decision_cache = None
+        if config.get("decision_cache", True):
+            self.decision_cache = DecisionCache(
+                max_entries=config.get("decision_cache_size", 1024),
+                ttl=config.get("decision_cache_ttl", 3600),
+                path=config.get("decision_cache_path"),
+                precision=config.get("decision_cache_precision", 3))
+        self.clearing_engine = ClearingEngine(
+            self.house_wallets,
+            price_per_kwh=config.get("price_per_kwh", 1.0),
+            allocation=config.get("allocation", "priority"))
+        self.batch_threshold = config.get("batch_threshold", 1000)
+        self.batch_chunk_ticks = config.get("batch_chunk_ticks", 256)
+        self.token_decimals = config.get("token_decimals", 18)
+        self._ticks = itertools.count(1)
+        self.netting = None
+        if config.get("settle_on_chain", False):
+            # Settle cleared trades ourselves, netted per wallet pair across a window of rounds
+            from src.helpers.settlement_netting import NettingLedger
+            self.netting = NettingLedger(
+                self.tx_manager,
+                # A time window alone closes on time; rounds only count when asked for
+                window_rounds=config.get(
+                    "netting_window_rounds", None if config.get("netting_window_seconds") else 1),
+                window_seconds=config.get("netting_window_seconds"),
+                precision=self.clearing_engine.precision)
+
+        self.clearing_pool = None
+        if config.get("clearing_executor", "thread") == "process":
+            # CPU-bound clearing runs outside the GIL; broadcasts and LLM calls stay on the worker threads
+            # Spawned, not forked: forking copies the feed, websocket and broadcast threads' locks mid-use
+            self.clearing_pool = ProcessPoolExecutor(
+                max_workers=config.get("clearing_processes"),
+                mp_context=multiprocessing.get_context("spawn"))
+
+        self.coalescer = None
+        if config.get("coalesce_ticks", True):
+            # Decide on the freshest merged snapshot per feeder instead of every backend message in turn
+            self.coalescer = FeederPool(
+                self.process_energy_data,
+                workers=config.get("workers"),
+                max_staleness=config.get("max_staleness"),
+                min_interval=config.get("min_decision_interval", 0.0))
+
+        if self.decision_engine == "local":
+            Thread(target=self._preload_local_model, daemon=True).start()
+
         self._start_output_websocket_server()
+        self._start_backend_websocket()
         self.register_actions()
 
     def _start_backend_websocket(self):
         """Establish WebSocket connection with backend and retry if it fails."""
 
         def connect():
+            attempt = 0
             while True:
                 try:
                     logger.info("🔗 Connecting to backend WebSocket...")
                     self.ws = websocket.WebSocketApp(
                         f"{self.ws_url}/",
+                        on_open=lambda ws: opened.set(),
                         on_message=self._on_message,
                         on_error=self._on_error,
                         on_close=self._on_close)
+                    opened.clear()
                     self.ws.run_forever()
                 except Exception as e:
                     logger.error(f"❌ WebSocket backend error: {e}")
 
-                logger.warning("⚠️ Backend connection lost. Retrying in 5 seconds...")
-                time.sleep(5)
+                attempt = 0 if opened.is_set() else attempt + 1
+                delay = backoff_delay(attempt)
+                logger.warning(f"⚠️ Backend connection lost. Retrying in {delay:.1f} seconds...")
+                time.sleep(delay)
 
+        opened = Event()
         thread = Thread(target=connect, daemon=True)
         thread.start()
 
     def _on_message(self, ws, message):
         logger.info(f"📩 Message received from backend: {message}")
-        self.process_energy_data(message)
+        if self.coalescer:
+            self.coalescer.submit(message)
+        else:
+            self.process_energy_data(message)
 
     def _on_error(self, ws, error):
         logger.error(f"❌ WebSocket backend error: {error}")
@@ -69,92 +204,259 @@ class SolarMetricsConnection(BaseConnection):
 
     def _start_output_websocket_server(self):
         """Launch a WebSocket server to send AI decisions in real time."""
-        import asyncio
-        import websockets
-
-        async def handler(websocket, path):
-            self.ws_clients.append(websocket)
-            logger.info("🟢 WebSocket client connected")
-            try:
-                async for message in websocket:
-                    pass  
-            except:
-                logger.warning("🔴 WebSocket client disconnected")
-                self.ws_clients.remove(websocket)
-
-        async def run_server():
-            while True:
-                try:
-                    server = await websockets.serve(handler, "0.0.0.0", 8765, origins=None)
-                    logger.info("✅ WebSocket output started at ws://0.0.0.0:8765")
-                    await server.wait_closed()
-                except Exception as e:
-                    logger.error(f"❌ Error in WebSocket output: {e}")
+        self.feed = DecisionFeed(
+            port=self.config.get("output_port", 8765),
+            client_buffer=self.config.get("client_buffer", 64),
+            send_timeout=self.config.get("client_send_timeout", 5.0),
+            replay_size=self.config.get("replay_size", 1024),
+            spill_path=self.config.get("replay_spill_path"),
+            handshake_timeout=self.config.get("client_handshake_timeout", 1.0))
+        self.feed.start()
+
+    def _mark_settlement(self, decision: Dict[str, Any]) -> Dict[str, Any]:
+        """Flag decisions the server settles itself, so meter agents don't pay them as well"""
+        if self.netting:
+            decision["settled_by"] = "server"
+        return decision
+
+    def _feeders(self, houses: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Wallet -> feeder id for the houses that report one, for `feeder:` subscribers"""
+        return {
+            self.clearing_engine.wallet_for(house): house["feeder"]
+            for house in houses if house.get("feeder") is not None and self.clearing_engine.wallet_for(house)
+        }
+
+    def _broadcast_ai_decision(self, ai_decision, decision=None, feeders=None):
+        """Send AI decision (text plus the typed transfer list) to subscribed WebSocket clients."""
+        self.feed.publish({"ai_decision": ai_decision, "decision": decision}, feeders)
+
+    def process_energy_data(self, data: Union[str, Dict[str, Any]]):
+        """Turn an energy snapshot (raw JSON or already parsed) into SOLAR transactions and broadcast them."""
+        if self.decision_engine in ("llm", "local"):
+            return self._process_with_llm(data if isinstance(data, str) else json.dumps(data))
 
-                logger.warning("⚠️ WebSocket output closed. Retrying in 5 seconds...")
-                await asyncio.sleep(5)
+        try:
+            start = time.perf_counter()
+            snapshot = json.loads(data) if isinstance(data, str) else data
+            houses = snapshot.get("houses", [])
+            tick = snapshot.get("tick", next(self._ticks))
+
+            trades = self._clear(houses)
+            ai_decision = self.clearing_engine.format_decision(trades, houses)
+            decision = build_decision(tick, self.clearing_engine.transfers(trades, houses), self.token_decimals)
+            if "feeder" in snapshot:
+                decision["feeder"] = snapshot["feeder"]
+            self._mark_settlement(decision)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            logger.info(f"⚖️ Cleared {len(houses)} houses into {len(trades)} transactions in {elapsed_ms:.3f} ms:\n{ai_decision}")
 
-        thread = Thread(target=lambda: asyncio.run(run_server()), daemon=True)
-        thread.start()
+            SolarMetricsConnection.last_ai_decision = ai_decision
+            SolarMetricsConnection.last_decision = decision
+            self._broadcast_ai_decision(ai_decision, decision, self._feeders(houses))
 
-    def _broadcast_ai_decision(self, ai_decision):
-        """Send AI decision to all connected WebSocket clients."""
-        import asyncio
-        import websockets
+            if self.netting:
+                self.netting.record([(trade.buyer, trade.seller, trade.amount) for trade in trades])
 
-        async def send_message():
-            if self.ws_clients:
-                logger.info(f"📡 Sending Solametrics AI decisions to {len(self.ws_clients)} peers...")
-                for client in self.ws_clients:
-                    try:
-                        await client.send(json.dumps({"ai_decision": ai_decision}))
-                    except websockets.exceptions.ConnectionClosed:
-                        self.ws_clients.remove(client)
+            if self.llm_explainer:
+                raw = data if isinstance(data, str) else json.dumps(data)
+                Thread(target=self._explain_decision, args=(raw, ai_decision), daemon=True).start()
 
-        asyncio.run(send_message())
+            return ai_decision
+
+        except (json.JSONDecodeError, AttributeError, TypeError, ValueError) as e:
+            logger.error(f"❌ Invalid energy data: {e}")
+            return {"error": str(e)}
+
+    def clear_batch(self, generation, consumption):
+        """Clear N houses x T ticks of generation/consumption (NumPy arrays) in one vectorized pass."""
+        from src.helpers.solar_batch_clearing import clear_batch
+
+        start = time.perf_counter()
+        result = clear_batch(
+            generation,
+            consumption,
+            price_per_kwh=self.clearing_engine.price_per_kwh,
+            allocation=self.clearing_engine.allocation,
+            chunk_ticks=self.batch_chunk_ticks)
+        elapsed = time.perf_counter() - start
+        logger.info(f"⚖️ Batch cleared {result.net.shape[0]} houses x {result.net.shape[1]} ticks "
+                    f"into {result.num_trades} internal trades in {elapsed:.3f} s")
+        return result
+
+    def _clear(self, houses: List[Dict[str, Any]]):
+        """Clear one snapshot, in the clearing process pool when one is configured."""
+        if self.clearing_pool:
+            return self.clearing_pool.submit(
+                clear_houses, self.clearing_engine, houses, self.batch_threshold, self.batch_chunk_ticks).result()
+        return clear_houses(self.clearing_engine, houses, self.batch_threshold, self.batch_chunk_ticks)
+
+    def _get_client(self):
+        """Long-lived OpenAI client shared by every decision and explanation"""
+        if not self._client:
+            self._client = get_openai_client(**self.llm_pool)
+        return self._client
+
+    def _get_local(self):
+        """Long-lived Ollama connection for the local decision model"""
+        if not self._local:
+            from src.connections.ollama_connection import OllamaConnection
+            self._local = OllamaConnection({
+                "base_url": self.local_base_url,
+                "model": self.local_model,
+                "keep_alive": self.local_keep_alive,
+                "options": self.local_options})
+        return self._local
+
+    def _preload_local_model(self):
+        try:
+            self._get_local().preload()
+            logger.info(f"✅ Local model '{self.local_model}' loaded at {self.local_base_url}")
+        except Exception as e:
+            logger.warning(f"⚠️ Could not preload local model '{self.local_model}': {e}")
+
+    @property
+    def decision_model(self) -> str:
+        return self.local_model if self.decision_engine == "local" else self.llm_model
 
-    def process_energy_data(self, data: str):
+    def get_llm_latency(self) -> Dict[str, float]:
+        """Latency summary of recent LLM calls"""
+        return self.llm_latency.summary()
+
+    def _process_with_llm(self, data: str):
         """Process energy data with AI and structure transactions with correct wallet mappings."""
         try:
+            tick = next(self._ticks)
+            snapshot = json.loads(data)
+            feeders = self._feeders(snapshot.get("houses", []))
+            cache_key = None
+            if self.decision_cache:
+                cache_key = self.decision_cache.key(snapshot, self.house_wallets, self.decision_model)
+                ai_decision = self.decision_cache.get(cache_key)
+                if ai_decision is not None:
+                    logger.info(f"♻️ Identical snapshot seen before, reusing cached decision:\n{ai_decision}")
+                    return self._publish_llm_decision(ai_decision, tick, feeders=feeders)
+
             logger.info("⚡ Processing energy data with AI...")
 
-            ai_response = OpenAI().chat.completions.create(
-                model="gpt-4",
-                messages=[{
-                    "role": "system",
-                    "content": (
-                        "You are an AI agent responsible for handling SOLAR token transactions in an energy marketplace.\n"
-                        "You must correctly process transactions ensuring that:\n"
-                        "- The receiver of kWh **ALWAYS** sends SOLAR tokens in return.\n"
-                        "- The sender of kWh **ALWAYS** receives SOLAR tokens.\n"
-                        "- If a house has extra energy, it receives SOLAR tokens from the Public Grid.\n"
-                        "- If a house needs energy, it **sends** SOLAR tokens to the seller.\n"
-                        "- Your final output must only contain SOLAR token transactions formatted as follows:\n"
-                        "   - 'Wallet [Sender Wallet] sends [Token Amount] SOLAR to [Receiver Wallet] on Sonic Network.'\n"
-                    )
-                }, {
-                    "role": "user",
-                    "content": f"Analyze the energy flow and structure transactions using the following wallets:\n\n"
-                    f"{json.dumps(self.house_wallets, indent=2)}\n\n"
-                    "Example format:\n"
-                    "- Wallet 0x... sends 3 SOLAR to Wallet 0x... on Sonic Network.\n"
-                    "- Wallet 0x... sends 5 SOLAR to Wallet 0x... on Sonic Network.\n\n"
-                    f"Analyze and generate transactions for: {data}"
-                }]
-            )
+            start = time.perf_counter()
+            with self.llm_latency.timed():
+                if self.llm_stream:
+                    ai_decision, remaining = self._stream_llm_decision(self._llm_deltas(data), tick, start, feeders)
+                elif self.decision_engine == "local":
+                    ai_decision, remaining = "".join(self._llm_deltas(data)), None
+                else:
+                    ai_response = self._get_client().chat.completions.create(
+                        model=self.llm_model,
+                        messages=self._llm_messages(data))
+                    ai_decision, remaining = ai_response.choices[0].message.content, None
 
-            ai_decision = ai_response.choices[0].message.content
-            logger.info(f"🧠 AI Decision:\n{ai_decision}")
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            logger.info(f"🧠 AI Decision in {elapsed_ms:.0f} ms:\n{ai_decision}")
 
-            SolarMetricsConnection.last_ai_decision = ai_decision
-            self._broadcast_ai_decision(ai_decision)
+            if cache_key and parse_decision_text(ai_decision):
+                self.decision_cache.put(cache_key, ai_decision)
 
-            return ai_decision
+            return self._publish_llm_decision(ai_decision, tick, remaining, feeders)
 
         except Exception as e:
-            logger.error(f"❌ OpenAI API call failed: {e}")
+            logger.error(f"❌ {'Local model' if self.decision_engine == 'local' else 'OpenAI API'} call failed: {e}")
             return {"error": str(e)}
 
+    def _llm_messages(self, data: str) -> List[Dict[str, str]]:
+        return llm_messages(data, self.house_wallets)
+
+    def _llm_deltas(self, data: str) -> Iterator[str]:
+        """Pieces of the decision text as the configured model produces them"""
+        if self.decision_engine == "local":
+            # The local model was tuned on bare energy.json prompts, without the wallet preamble
+            yield from self._get_local().stream_text(energy_prompt(json.loads(data)))
+            return
+
+        stream = self._get_client().chat.completions.create(
+            model=self.llm_model,
+            messages=self._llm_messages(data),
+            stream=True)
+        for chunk in stream:
+            if chunk.choices:
+                yield chunk.choices[0].delta.content or ""
+
+    def _stream_llm_decision(self, deltas: Iterator[str], tick: int, start: float, feeders=None):
+        """Consume the streamed text and broadcast each transaction line the moment it is complete.
+
+        Returns the full text and the transfers from the unterminated last line,
+        which are left for the closing message.
+        """
+        text = []
+        pending = ""
+        dispatched = 0
+
+        for delta in deltas:
+            text.append(delta)
+            *lines, pending = (pending + delta).split("\n")
+            for line in lines:
+                transfers = parse_decision_text(line)
+                if not transfers:
+                    continue
+                if not dispatched:
+                    logger.info(f"🚀 First transaction dispatched after {(time.perf_counter() - start) * 1000:.0f} ms")
+                dispatched += len(transfers)
+                decision = build_decision(tick, transfers, self.token_decimals)
+                decision["complete"] = False
+                self._broadcast_ai_decision(None, self._mark_settlement(decision), feeders)
+
+        return "".join(text), parse_decision_text(pending)
+
+    def _publish_llm_decision(self, ai_decision: str, tick: int, remaining=None, feeders=None) -> str:
+        """Broadcast the full text plus every transfer not already streamed out.
+
+        `remaining` is None when nothing was streamed; otherwise it holds the
+        transfers that were still undispatched when the stream ended, so each
+        transfer reaches the meters exactly once per tick.
+        """
+        # Parse the prose once here so meter agents get the same typed message as with clearing
+        transfers = parse_decision_text(ai_decision)
+        full_decision = build_decision(tick, transfers, self.token_decimals)
+        decision = full_decision
+        if remaining is not None:
+            decision = build_decision(tick, remaining, self.token_decimals)
+            decision["complete"] = True
+            decision["transfers_total"] = len(full_decision["transfers"])
+
+        self._mark_settlement(full_decision)
+        self._mark_settlement(decision)
+
+        SolarMetricsConnection.last_ai_decision = ai_decision
+        SolarMetricsConnection.last_decision = full_decision
+        self._broadcast_ai_decision(ai_decision, decision, feeders)
+
+        if self.netting:
+            # Every transfer of the tick, streamed ones included, goes through the ledger once
+            self.netting.record([(sender, recipient, float(amount)) for sender, recipient, amount in transfers])
+
+        return ai_decision
+
+    def _explain_decision(self, data: str, decision: str):
+        """Ask the LLM to explain/audit a clearing result. Runs off the settlement path."""
+        try:
+            with self.llm_latency.timed():
+                ai_response = self._get_client().chat.completions.create(
+                    model=self.llm_model,
+                    messages=[{
+                        "role": "system",
+                        "content": SYSTEM_PROMPT
+                    }, {
+                        "role": "user",
+                        "content": f"These transactions were already settled for the energy data below. "
+                        "Explain them briefly and flag any that break the rules above.\n\n"
+                        f"Energy data: {data}\n\nTransactions:\n{decision}"
+                    }]
+                )
+            explanation = ai_response.choices[0].message.content
+            SolarMetricsConnection.last_explanation = explanation
+            logger.info(f"🧠 AI Explanation:\n{explanation}")
+        except Exception as e:
+            logger.error(f"❌ OpenAI explanation failed: {e}")
+
     def configure(self) -> bool:
         logger.info("⚙️ Configuring SolarMetrics connection...")
         return True
@@ -172,8 +474,30 @@ class SolarMetricsConnection(BaseConnection):
         missing = [field for field in required if field not in config]
         if missing:
             raise ValueError(f"Missing configuration parameters: {', '.join(missing)}")
+        if config.get("decision_engine", "clearing") not in DECISION_ENGINES:
+            raise ValueError(f"Invalid decision_engine. Must be one of: {', '.join(DECISION_ENGINES)}")
+        if config.get("clearing_executor", "thread") not in CLEARING_EXECUTORS:
+            raise ValueError(f"Invalid clearing_executor. Must be one of: {', '.join(CLEARING_EXECUTORS)}")
         return config
 
     def register_actions(self):
-        self.actions = {}
+        self.actions = {
+            "get-llm-latency": Action(
+                name="get-llm-latency",
+                parameters=[],
+                description="Get latency percentiles of recent LLM decision calls"
+            )
+        }
         logger.info(f"✅ Registered actions: {list(self.actions.keys())}")
+
+    def perform_action(self, action_name: str, kwargs) -> Any:
+        if action_name not in self.actions:
+            raise KeyError(f"Unknown action: {action_name}")
+
+        action = self.actions[action_name]
+        errors = action.validate_params(kwargs)
+        if errors:
+            raise ValueError(f"Invalid parameters: {', '.join(errors)}")
+
+        method_name = action_name.replace('-', '_')
+        return getattr(self, method_name)(**kwargs)
@@ -1,6 +1,12 @@
+# "rpc_urls" lists interchangeable endpoints for the RPC pool; "rpc_url" is the primary one
 SONIC_NETWORKS = {
     "mainnet": {
         "rpc_url": "https://rpc.soniclabs.com",
+        "rpc_urls": [
+            "https://rpc.soniclabs.com",
+            "https://sonic-rpc.publicnode.com",
+            "https://sonic.drpc.org"
+        ],
         "scanner_url": "https://sonicscan.org"
     },
     "testnet": {
@@ -16,16 +22,31 @@ SONIC_NETWORKS = {
 EVM_NETWORKS = {
     "ethereum": {
         "rpc_url": "https://ethereum-rpc.publicnode.com",
+        "rpc_urls": [
+            "https://ethereum-rpc.publicnode.com",
+            "https://eth.llamarpc.com",
+            "https://eth.drpc.org"
+        ],
         "scanner_url": "etherscan.io",
         "chain_id": 1
     },
     "base": {
         "rpc_url": "https://mainnet.base.org",
+        "rpc_urls": [
+            "https://mainnet.base.org",
+            "https://base-rpc.publicnode.com",
+            "https://base.llamarpc.com"
+        ],
         "scanner_url": "basescan.org",
         "chain_id": 8453
     },
     "polygon": {
         "rpc_url": "https://polygon-rpc.com",
+        "rpc_urls": [
+            "https://polygon-rpc.com",
+            "https://polygon-bor-rpc.publicnode.com",
+            "https://polygon.llamarpc.com"
+        ],
         "scanner_url": "polygonscan.com",
         "chain_id": 137
     }
@@ -0,0 +1,130 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger("helpers.decision_cache")
+
+# Snapshot fields that change every tick without changing the decision
+VOLATILE_FIELDS = ("tick", "timestamp", "time", "seq")
+
+
+class DecisionCache:
+    """Content-addressed cache of decisions for identical energy snapshots.
+
+    The key is a SHA-256 over a canonical form of the snapshot (volatile
+    fields removed, numbers rounded to `precision`, houses sorted by name)
+    plus the wallet map and model, so two ticks with the same weather and
+    per-house readings share one decision. Entries expire after `ttl`
+    seconds and the least recently used one is evicted beyond `max_entries`.
+    With `path`, entries are appended to a JSON Lines file and reloaded on
+    start; the file is compacted when it grows well past the live set.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: Optional[float] = 3600.0,
+        path: Optional[str] = None,
+        precision: int = 3
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.precision = precision
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._load()
+
+    def _canonical(self, value: Any) -> Any:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return round(float(value), self.precision)
+        if isinstance(value, dict):
+            return {key: self._canonical(item) for key, item in value.items() if key not in VOLATILE_FIELDS}
+        if isinstance(value, list):
+            return [self._canonical(item) for item in value]
+        return value
+
+    def key(self, snapshot: Dict[str, Any], wallets: Dict[str, str], model: str = "") -> str:
+        canonical = self._canonical({key: value for key, value in snapshot.items() if key != "houses"})
+        canonical["houses"] = sorted(
+            (self._canonical(house) for house in snapshot.get("houses", [])),
+            key=lambda house: str(house.get("house")))
+        material = json.dumps(
+            {"snapshot": canonical, "wallets": wallets, "model": model},
+            sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return self.ttl is not None and now - stored_at > self.ttl
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._expired(entry[0], now):
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, value: Any) -> None:
+        now = time.time()
+        with self._lock:
+            self._entries[key] = (now, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            if self.path:
+                self._append(key, now, value)
+
+    def _append(self, key: str, stored_at: float, value: Any) -> None:
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"key": key, "at": stored_at, "value": value}) + "\n")
+        except OSError as e:
+            logger.warning(f"Could not persist decision cache entry: {e}")
+
+    def _load(self) -> None:
+        now = time.time()
+        lines = 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if not self._expired(record["at"], now):
+                        self._entries[record["key"]] = (record["at"], record["value"])
+                        self._entries.move_to_end(record["key"])
+        except FileNotFoundError:
+            return
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        logger.info(f"♻️ Loaded {len(self._entries)} cached decisions from {self.path}")
+        if lines > 2 * max(len(self._entries), 1):
+            self._compact()
+
+    def _compact(self) -> None:
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for key, (stored_at, value) in self._entries.items():
+                    f.write(json.dumps({"key": key, "at": stored_at, "value": value}) + "\n")
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not compact decision cache: {e}")
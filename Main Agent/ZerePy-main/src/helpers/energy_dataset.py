@@ -0,0 +1,102 @@
+import json
+import logging
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from src.helpers.solar_clearing import PUBLIC_GRID, ClearingEngine, Trade, format_amount
+
+logger = logging.getLogger("helpers.energy_dataset")
+
+# Prompt layout of modeltraining/energy.json; a model tuned on it expects exactly this
+PROMPT_TEMPLATE = "Energy data: {data}\n\n###\n"
+PROMPT_PATTERN = re.compile(r"Energy data:\s*(.*?)\s*###", re.DOTALL)
+SAMPLE_START = re.compile(r'\{\s*"prompt"')
+
+
+def energy_prompt(snapshot: Dict[str, Any]) -> str:
+    """Prompt for an energy snapshot in the training layout (compact JSON, '###' terminator)"""
+    return PROMPT_TEMPLATE.format(data=json.dumps(snapshot, separators=(",", ":")))
+
+
+def parse_prompt(prompt: str) -> Optional[Dict[str, Any]]:
+    """The energy snapshot embedded in a training prompt, or None if it is not valid JSON"""
+    match = PROMPT_PATTERN.search(prompt or "")
+    if not match:
+        return None
+    try:
+        snapshot = json.loads(match.group(1))
+    except json.JSONDecodeError:
+        return None
+    return snapshot if isinstance(snapshot, dict) and isinstance(snapshot.get("houses"), list) else None
+
+
+def load_samples(path: str) -> List[Dict[str, Any]]:
+    """Every usable {"prompt", "completion", "snapshot"} record in an energy.json file.
+
+    The file is a hand-edited list of prompt/completion objects and is not
+    valid JSON as a whole, so each object is decoded on its own and the ones
+    that are truncated or whose prompt holds no parseable snapshot are skipped.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        raw = f.read()
+
+    decoder = json.JSONDecoder(strict=False)
+    samples = []
+    skipped = 0
+    position = 0
+    while True:
+        match = SAMPLE_START.search(raw, position)
+        if not match:
+            break
+        try:
+            record, position = decoder.raw_decode(raw, match.start())
+        except json.JSONDecodeError:
+            skipped += 1
+            position = match.end()
+            continue
+        snapshot = parse_prompt(record.get("prompt"))
+        if snapshot is None or not isinstance(record.get("completion"), str):
+            skipped += 1
+            continue
+        samples.append({"prompt": record["prompt"], "completion": record["completion"], "snapshot": snapshot})
+
+    if skipped:
+        logger.warning(f"⚠️ Skipped {skipped} malformed samples in {path}")
+    return samples
+
+
+def format_completion(
+    trades: List[Trade],
+    houses: List[Dict[str, Any]],
+    engine: ClearingEngine
+) -> str:
+    """Render a clearing result in the energy.json completion layout"""
+    def line(trade: Trade, payer: str, recipient: str) -> str:
+        amount = format_amount(trade.amount, engine.precision)
+        kwh = format_amount(trade.kwh, engine.precision)
+        if trade.seller == PUBLIC_GRID:
+            flow = f"Public Grid sends to House {trade.buyer} {kwh} KWH"
+        elif trade.buyer == PUBLIC_GRID:
+            flow = f"Public Grid receives from House {trade.seller} {kwh} KWH"
+        else:
+            flow = f"House {trade.seller} sends {kwh} KWH to House {trade.buyer}"
+        return f"   - {flow}; Wallet {payer} sends {amount} SOLAR to Wallet {recipient} on Sonic Network."
+
+    pairs = list(zip(trades, engine.transfers(trades, houses)))
+    internal = [line(trade, payer, recipient) for trade, (payer, recipient, _) in pairs if trade.is_internal]
+    grid = [line(trade, payer, recipient) for trade, (payer, recipient, _) in pairs if not trade.is_internal]
+    # Sections are numbered in order and left out when empty, as in the dataset
+    sections = [(title, rows) for title, rows in (("Internal trades", internal), ("Public Grid transactions", grid)) if rows]
+    lines = ["Transactions:"]
+    for number, (title, rows) in enumerate(sections, 1):
+        lines += [f"{number}. {title}:"] + rows
+    return "\n".join(lines)
+
+
+def net_flows(transfers: Iterable[Tuple[str, str, Any]], precision: int = 6) -> Dict[str, float]:
+    """Net SOLAR received per wallet (lower-cased), dropping wallets that net to zero"""
+    flows: Dict[str, float] = {}
+    for sender, recipient, amount in transfers:
+        amount = float(amount)
+        flows[sender.lower()] = flows.get(sender.lower(), 0.0) - amount
+        flows[recipient.lower()] = flows.get(recipient.lower(), 0.0) + amount
+    return {wallet: round(net, precision) for wallet, net in flows.items() if round(net, precision)}
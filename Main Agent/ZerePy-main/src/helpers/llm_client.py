@@ -0,0 +1,96 @@
+import importlib.util
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+import httpx
+from openai import OpenAI
+
+logger = logging.getLogger("helpers.llm_client")
+
+# HTTP/2 needs the optional `h2` package (pip install httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+_clients: Dict[tuple, OpenAI] = {}
+_clients_lock = threading.Lock()
+
+
+def get_openai_client(
+    max_connections: int = 20,
+    max_keepalive: int = 10,
+    keepalive_expiry: float = 120.0,
+    timeout: float = 60.0,
+    connect_timeout: float = 5.0,
+    http2: Optional[bool] = None
+) -> OpenAI:
+    """Process-wide OpenAI client on a keep-alive httpx pool.
+
+    Reusing one client keeps TLS sessions warm between ticks, so a decision
+    pays for the request itself and not a fresh handshake. HTTP/2 is used when
+    `h2` is installed unless `http2=False`.
+    """
+    use_http2 = HTTP2_AVAILABLE if http2 is None else http2 and HTTP2_AVAILABLE
+    key = (max_connections, max_keepalive, keepalive_expiry, timeout, connect_timeout, use_http2)
+    with _clients_lock:
+        if key not in _clients:
+            http_client = httpx.Client(
+                http2=use_http2,
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_keepalive,
+                    keepalive_expiry=keepalive_expiry),
+                timeout=httpx.Timeout(timeout, connect=connect_timeout))
+            _clients[key] = OpenAI(http_client=http_client)
+            logger.debug(f"Created OpenAI client (http2={use_http2}, max_connections={max_connections})")
+        return _clients[key]
+
+
+class LatencyRecorder:
+    """Rolling window of call latencies with percentile summaries"""
+
+    def __init__(self, window: int = 1000):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.errors = 0
+
+    def record(self, seconds: float, error: bool = False) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+            if error:
+                self.errors += 1
+
+    @contextmanager
+    def timed(self):
+        start = time.perf_counter()
+        error = False
+        try:
+            yield
+        except Exception:
+            error = True
+            raise
+        finally:
+            self.record(time.perf_counter() - start, error)
+
+    def summary(self) -> Dict[str, float]:
+        """count, errors and mean/p50/p95/p99/max in milliseconds over the window"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return {"count": self.count, "errors": self.errors}
+
+        def percentile(q: float) -> float:
+            return samples[min(len(samples) - 1, int(q * len(samples)))] * 1000
+
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "mean_ms": sum(samples) / len(samples) * 1000,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": samples[-1] * 1000
+        }
@@ -0,0 +1,75 @@
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from web3 import Web3
+from src.constants.abi import ERC20_ABI, MULTICALL3_ABI
+from src.helpers.rpc_batch import gather
+
+logger = logging.getLogger("helpers.multicall")
+
+# Multicall3 is deployed at the same address on Sonic, Sonic Blaze and most EVM chains
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
+
+class Multicall:
+    """Batch many read-only contract calls into a single eth_call via Multicall3"""
+
+    def __init__(self, web3: Web3, address: str = MULTICALL3_ADDRESS, chunk_size: int = 2000):
+        self._web3 = web3
+        self.chunk_size = chunk_size
+        self.contract = web3.eth.contract(address=Web3.to_checksum_address(address), abi=MULTICALL3_ABI)
+        self._erc20 = web3.eth.contract(abi=ERC20_ABI)
+
+    def aggregate(self, calls: List[Tuple[str, bytes]]) -> List[Tuple[bool, bytes]]:
+        """Run (target, calldata) pairs; returns (success, return data) per call, in order.
+
+        Chunks of `chunk_size` calls go out together, sharing one round trip
+        when the provider batches JSON-RPC requests.
+        """
+        chunks = [
+            [(Web3.to_checksum_address(target), True, data) for target, data in calls[start:start + self.chunk_size]]
+            for start in range(0, len(calls), self.chunk_size)
+        ]
+        replies = gather(self._web3, *[
+            lambda chunk=chunk: self.contract.functions.aggregate3(chunk).call() for chunk in chunks
+        ])
+        return [(success, bytes(data)) for reply in replies for success, data in reply]
+
+    def erc20_call(self, token: str, fn_name: str, args: Optional[List[Any]] = None) -> Tuple[str, bytes]:
+        data = self._erc20.encodeABI(fn_name=fn_name, args=args or [])
+        return token, Web3.to_bytes(hexstr=data)
+
+    def decode_uint(self, success: bool, data: bytes) -> Optional[int]:
+        if not success or not data:
+            return None
+        return self._web3.codec.decode(["uint256"], data)[0]
+
+    def erc20_balances(
+        self,
+        wallets: List[str],
+        tokens: List[str],
+        decimals: Optional[Dict[str, int]] = None
+    ) -> Tuple[Dict[Tuple[str, str], Optional[int]], Dict[str, Optional[int]]]:
+        """Raw balances for every (wallet, token) pair plus decimals for tokens not in `decimals`.
+
+        Everything is fetched in one aggregate3 call (per `chunk_size` calls).
+        """
+        decimals = decimals or {}
+        pairs = [(wallet, token) for token in tokens for wallet in wallets]
+        missing = [token for token in tokens if token not in decimals]
+
+        calls = [
+            self.erc20_call(token, "balanceOf", [Web3.to_checksum_address(wallet)])
+            for wallet, token in pairs
+        ]
+        calls += [self.erc20_call(token, "decimals") for token in missing]
+        results = self.aggregate(calls)
+
+        balances = {
+            pair: self.decode_uint(*result)
+            for pair, result in zip(pairs, results[:len(pairs)])
+        }
+        fetched = {
+            token: self.decode_uint(*result)
+            for token, result in zip(missing, results[len(pairs):])
+        }
+        return balances, fetched
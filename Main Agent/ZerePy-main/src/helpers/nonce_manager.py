@@ -0,0 +1,119 @@
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+from web3 import Web3
+
+logger = logging.getLogger("helpers.nonce_manager")
+
+# Errors that mean our local view of the account nonce is out of date
+NONCE_ERRORS = (
+    "nonce too low",
+    "nonce too high",
+    "replacement transaction underpriced",
+    "invalid nonce",
+    "invalid transaction nonce",
+)
+# The node already holds this exact signed transaction: it was sent, and re-signing would pay twice
+ALREADY_KNOWN = ("already known", "known transaction")
+
+_managers: Dict[str, "NonceManager"] = {}
+_managers_lock = threading.Lock()
+
+
+def is_nonce_error(error: Exception) -> bool:
+    message = str(error).lower()
+    return any(pattern in message for pattern in NONCE_ERRORS)
+
+
+def is_already_known(error: Exception) -> bool:
+    message = str(error).lower()
+    return any(pattern in message for pattern in ALREADY_KNOWN)
+
+
+class NonceManager:
+    """Hands out sequential nonces per account without an RPC call per transaction.
+
+    Each account is seeded once from the chain's pending transaction count and
+    then incremented locally under a lock, so concurrent threads and coroutines
+    never receive the same nonce. Any failed broadcast drops the local counter
+    so the next allocation resynchronizes with the chain.
+    """
+
+    def __init__(self, web3: Web3):
+        self._web3 = web3
+        self._lock = threading.Lock()
+        self._next: Dict[str, int] = {}
+
+    def allocate(self, address: str) -> int:
+        """Reserve the next nonce for `address`"""
+        key = address.lower()
+        with self._lock:
+            if key not in self._next:
+                self._next[key] = self._web3.eth.get_transaction_count(
+                    Web3.to_checksum_address(address), "pending")
+                logger.debug(f"Seeded nonce for {address}: {self._next[key]}")
+            nonce = self._next[key]
+            self._next[key] = nonce + 1
+            return nonce
+
+    def resync(self, address: str) -> None:
+        """Forget the local counter so the next allocation reads it from the chain"""
+        with self._lock:
+            self._next.pop(address.lower(), None)
+
+    def submit(self, address: str, sign: Callable[[int], Any], retries: int = 1) -> Any:
+        """Sign with a fresh nonce and broadcast, retrying with a resynced nonce on nonce errors.
+
+        `sign(nonce)` must return the raw signed transaction for that nonce. A
+        node that reports the transaction as already known has it in its
+        mempool, so its hash is returned as sent.
+        """
+        attempt = 0
+        while True:
+            nonce = self.allocate(address)
+            raw_transaction = sign(nonce)
+            try:
+                return self._web3.eth.send_raw_transaction(raw_transaction)
+            except Exception as e:
+                if is_already_known(e):
+                    return Web3.keccak(raw_transaction)
+                self.resync(address)
+                if attempt < retries and is_nonce_error(e):
+                    attempt += 1
+                    logger.warning(f"Nonce {nonce} rejected for {address} ({e}), resyncing and retrying")
+                    continue
+                raise
+
+    async def submit_async(self, web3: Any, address: str, sign: Callable[[int], Any], retries: int = 1) -> Any:
+        """submit() through an AsyncWeb3 client, sharing this manager's counters with the sync path"""
+        key = address.lower()
+        attempt = 0
+        while True:
+            if key not in self._next:
+                # Seed outside the lock; concurrent seeders agree on the pending count
+                count = await web3.eth.get_transaction_count(Web3.to_checksum_address(address), "pending")
+                with self._lock:
+                    self._next.setdefault(key, count)
+            nonce = self.allocate(address)
+            raw_transaction = sign(nonce)
+            try:
+                return await web3.eth.send_raw_transaction(raw_transaction)
+            except Exception as e:
+                if is_already_known(e):
+                    return Web3.keccak(raw_transaction)
+                self.resync(address)
+                if attempt < retries and is_nonce_error(e):
+                    attempt += 1
+                    logger.warning(f"Nonce {nonce} rejected for {address} ({e}), resyncing and retrying")
+                    continue
+                raise
+
+
+def get_nonce_manager(web3: Web3) -> NonceManager:
+    """Process-wide NonceManager for the RPC endpoint behind `web3`"""
+    key = getattr(web3.provider, "endpoint_uri", None) or str(id(web3.provider))
+    with _managers_lock:
+        manager: Optional[NonceManager] = _managers.get(key)
+        if manager is None:
+            manager = _managers[key] = NonceManager(web3)
+        return manager
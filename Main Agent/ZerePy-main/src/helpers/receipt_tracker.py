@@ -0,0 +1,251 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, Optional, Set
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.datastructures import AttributeDict
+from web3.exceptions import TransactionNotFound
+
+logger = logging.getLogger("helpers.receipt_tracker")
+
+METHOD_NOT_FOUND = -32601
+# Receipt and log fields web3 returns as int / HexBytes from eth_getTransactionReceipt
+RECEIPT_QUANTITIES = ("blockNumber", "cumulativeGasUsed", "effectiveGasPrice", "gasUsed", "status",
+                      "transactionIndex", "type", "blobGasUsed", "blobGasPrice")
+RECEIPT_HASHES = ("blockHash", "transactionHash", "logsBloom", "root")
+LOG_QUANTITIES = ("blockNumber", "logIndex", "transactionIndex")
+LOG_HASHES = ("blockHash", "transactionHash", "data")
+
+_trackers: Dict[str, "ReceiptTracker"] = {}
+_trackers_lock = threading.Lock()
+
+
+def _hex_hash(tx_hash: Any) -> str:
+    value = tx_hash.hex() if isinstance(tx_hash, (bytes, bytearray)) else str(tx_hash)
+    return (value if value.startswith("0x") else f"0x{value}").lower()
+
+
+def _to_int(value: Any) -> int:
+    return int(value, 16) if isinstance(value, str) else int(value)
+
+
+def _format(raw: Dict[str, Any], quantities, hashes) -> Dict[str, Any]:
+    formatted = dict(raw)
+    for field in quantities:
+        if formatted.get(field) is not None:
+            formatted[field] = _to_int(formatted[field])
+    for field in hashes:
+        if isinstance(formatted.get(field), str):
+            formatted[field] = HexBytes(formatted[field])
+    return formatted
+
+
+def _format_receipt(raw: Dict[str, Any]) -> AttributeDict:
+    """An eth_getBlockReceipts entry shaped like web3's get_transaction_receipt result"""
+    receipt = _format(raw, RECEIPT_QUANTITIES, RECEIPT_HASHES)
+    receipt["logs"] = [
+        AttributeDict({**_format(log, LOG_QUANTITIES, LOG_HASHES),
+                       "topics": [HexBytes(topic) for topic in log.get("topics", [])]})
+        for log in raw.get("logs", [])
+    ]
+    for field in ("from", "to", "contractAddress"):
+        if receipt.get(field):
+            receipt[field] = Web3.to_checksum_address(receipt[field])
+    return AttributeDict(receipt)
+
+
+def _method_missing(error: Exception) -> bool:
+    """Whether an RPC error says the node doesn't implement the method at all"""
+    detail = error.args[0] if error.args else None
+    if isinstance(detail, dict):
+        if detail.get("code") == METHOD_NOT_FOUND:
+            return True
+        detail = detail.get("message")
+    message = str(detail).lower()
+    return "method not found" in message or "does not exist" in message or "not supported" in message
+
+
+class _Pending:
+    def __init__(self, deadline: Optional[float]):
+        self.future: Future = Future()
+        self.deadline = deadline
+
+
+class ReceiptTracker:
+    """Resolves receipts for every in-flight transaction from one block follower.
+
+    `track` registers a hash and returns a concurrent Future; a single
+    background thread polls `eth_getBlockByNumber` once per `poll_interval`,
+    walks every new block, and when a block carries tracked hashes settles
+    them all from one `eth_getBlockReceipts` call (per-hash receipts on nodes
+    without it). Any number of pending transactions costs the same one poll
+    per interval, instead of a polling loop each. A block the node can't
+    serve yet, or whose receipts come back incomplete, is retried for up to
+    `block_retries` polls before the follower moves on. The follower sleeps
+    while nothing is pending. A hash that isn't seen before its timeout gets one
+    direct receipt lookup, in case it was mined before tracking began or in
+    blocks skipped while catching up, and then fails with TimeoutError.
+    """
+
+    def __init__(
+        self,
+        web3: Web3,
+        poll_interval: float = 1.0,
+        timeout: Optional[float] = 120.0,
+        max_catch_up: int = 64,
+        backfill: int = 4,
+        block_retries: int = 3
+    ):
+        self._web3 = web3
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.max_catch_up = max_catch_up
+        self.backfill = backfill
+        self.block_retries = block_retries
+
+        self._lock = threading.Lock()
+        self._pending: Dict[str, _Pending] = {}
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._block_receipts = True
+        self._last_block: Optional[int] = None
+        self._retries = 0
+        self.stats = {"blocks": 0, "resolved": 0, "timed_out": 0}
+
+    def track(self, tx_hash: Any, timeout: Optional[float] = None) -> Future:
+        """Future resolved with the receipt of `tx_hash`, or TimeoutError"""
+        key = _hex_hash(tx_hash)
+        timeout = self.timeout if timeout is None else timeout
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is None:
+                entry = self._pending[key] = _Pending(time.monotonic() + timeout if timeout else None)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name="receipt-tracker")
+                self._thread.start()
+        self._wakeup.set()
+        return entry.future
+
+    def wait(self, tx_hash: Any, timeout: Optional[float] = None) -> AttributeDict:
+        """Block until `tx_hash` is mined and return its receipt"""
+        return self.track(tx_hash, timeout).result()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            if not self._pending:
+                # Nothing to follow: forget our place and sleep until the next track()
+                self._last_block = None
+                self._wakeup.wait()
+            try:
+                self._follow()
+            except Exception as e:
+                logger.warning(f"⚠️ Receipt tracker poll failed: {e}")
+            self._expire()
+            time.sleep(self.poll_interval)
+
+    def _rpc(self, method: str, params: list) -> Any:
+        response = self._web3.provider.make_request(method, params)
+        if response.get("error"):
+            raise ValueError(response["error"])
+        return response.get("result")
+
+    def _follow(self) -> None:
+        head = self._rpc("eth_getBlockByNumber", ["latest", False])
+        if not head:
+            return
+        number = _to_int(head["number"])
+        if self._last_block is None:
+            # Start a few blocks back: transactions may have landed while the follower was asleep
+            self._last_block = number - self.backfill - 1
+        elif number - self._last_block > self.max_catch_up:
+            # Too far behind to walk block by block; skipped hashes are found by the timeout lookup
+            logger.warning(f"⚠️ Receipt tracker skipped {number - self._last_block - self.max_catch_up} blocks")
+            self._last_block = number - self.max_catch_up
+        for block_number in range(self._last_block + 1, number + 1):
+            block = head if block_number == number else self._rpc("eth_getBlockByNumber", [hex(block_number), False])
+            if not block or not self._scan(block):
+                # A lagging node may not have the block, or all its receipts, yet: try it again next poll,
+                # but not for long, since every later block waits behind it
+                if self._retries < self.block_retries:
+                    self._retries += 1
+                    return
+                logger.warning(f"⚠️ Receipt tracker moving past block {block_number} with receipts still missing")
+            self._retries = 0
+            self._last_block = block_number
+
+    def _scan(self, block: Dict[str, Any]) -> bool:
+        """Resolve the tracked hashes in `block`; False if some receipt isn't available yet"""
+        self.stats["blocks"] += 1
+        with self._lock:
+            mined: Set[str] = {
+                key for key in map(_hex_hash, block.get("transactions", [])) if key in self._pending}
+        if not mined:
+            return True
+
+        receipts = self._receipts(block, mined)
+        for receipt in receipts:
+            self._resolve(_hex_hash(receipt["transactionHash"]), receipt)
+        return len(receipts) == len(mined)
+
+    def _receipts(self, block: Dict[str, Any], mined: Set[str]):
+        if self._block_receipts:
+            try:
+                raw = self._rpc("eth_getBlockReceipts", [hex(_to_int(block["number"]))]) or []
+                return [_format_receipt(receipt)
+                        for receipt in raw if _hex_hash(receipt["transactionHash"]) in mined]
+            except Exception as e:
+                if _method_missing(e):
+                    self._block_receipts = False
+                    logger.info(f"eth_getBlockReceipts unavailable ({e}), fetching receipts per transaction")
+                else:
+                    logger.warning(f"⚠️ eth_getBlockReceipts failed ({e}), fetching this block's receipts per transaction")
+
+        receipts = []
+        for tx_hash in mined:
+            try:
+                receipts.append(self._web3.eth.get_transaction_receipt(tx_hash))
+            except TransactionNotFound:
+                continue
+        return receipts
+
+    def _resolve(self, key: str, receipt: AttributeDict) -> None:
+        with self._lock:
+            entry = self._pending.pop(key, None)
+        if entry and not entry.future.done():
+            self.stats["resolved"] += 1
+            entry.future.set_result(receipt)
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, entry in self._pending.items() if entry.deadline and entry.deadline <= now]
+        for key in expired:
+            try:
+                self._resolve(key, self._web3.eth.get_transaction_receipt(key))
+                continue
+            except TransactionNotFound:
+                pass
+            except Exception as e:
+                logger.warning(f"⚠️ Receipt lookup for {key} failed: {e}")
+            with self._lock:
+                entry = self._pending.pop(key, None)
+            if entry and not entry.future.done():
+                self.stats["timed_out"] += 1
+                entry.future.set_exception(TimeoutError(f"Transaction {key} not mined in time"))
+
+
+def get_receipt_tracker(web3: Web3, poll_interval: float = 1.0) -> ReceiptTracker:
+    """Process-wide ReceiptTracker for the RPC endpoint behind `web3`"""
+    key = getattr(web3.provider, "endpoint_uri", None) or str(id(web3.provider))
+    with _trackers_lock:
+        tracker = _trackers.get(key)
+        if tracker is None:
+            tracker = _trackers[key] = ReceiptTracker(web3, poll_interval=poll_interval)
+        return tracker
@@ -0,0 +1,335 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from aiohttp import ClientSession
+from web3 import AsyncHTTPProvider, Web3
+from web3.providers.base import JSONBaseProvider
+from web3.types import RPCEndpoint, RPCResponse
+from .rpc_batch import BatchingProvider, post_batch
+
+logger = logging.getLogger("helpers.rpc_pool")
+
+# Sent to the pinned endpoint only, so one node sees an account's nonces in order
+WRITE_METHODS = {"eth_sendRawTransaction", "eth_sendTransaction"}
+# JSON-RPC errors that mean "this node won't serve us right now", not "the request is wrong"
+UNAVAILABLE_ERRORS = ("rate limit", "too many requests", "limit exceeded", "capacity", "timeout", "unavailable")
+ALREADY_KNOWN = ("already known", "known transaction")
+
+
+def _is_unavailable(error: Any) -> bool:
+    message = str(error.get("message", error) if isinstance(error, dict) else error).lower()
+    return any(pattern in message for pattern in UNAVAILABLE_ERRORS)
+
+
+def _is_write(method: str, params: Any) -> bool:
+    # The pending nonce must come from the node that saw our broadcasts
+    return method in WRITE_METHODS or (method == "eth_getTransactionCount" and params and params[-1] == "pending")
+
+
+class _Endpoint:
+    def __init__(self, url: str, request_kwargs: Optional[Dict[str, Any]]):
+        self.url = url
+        self.provider = Web3.HTTPProvider(url, request_kwargs=request_kwargs)
+        self.latency: Optional[float] = None
+        self.block: Optional[int] = None
+        self.failures = 0
+        self.down_until = 0.0
+        # Cleared once the node answers a batch with a single error object
+        self.batches = True
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.down_until
+
+    def observe(self, seconds: float, smoothing: float = 0.3) -> None:
+        self.latency = seconds if self.latency is None else (1 - smoothing) * self.latency + smoothing * seconds
+        self.failures = 0
+        self.down_until = 0.0
+
+    def fail(self, cooldown: float, max_cooldown: float) -> None:
+        self.failures += 1
+        self.down_until = time.monotonic() + min(max_cooldown, cooldown * 2 ** (self.failures - 1))
+
+
+class PooledHTTPProvider(JSONBaseProvider):
+    """Spreads JSON-RPC traffic over several HTTP endpoints for the same chain.
+
+    Reads go to the healthy endpoint with the lowest smoothed latency.
+    Transaction broadcasts and pending-nonce reads stay pinned to one
+    endpoint (the first healthy one in list order) so nonces reach a single
+    node in order, and move only when it fails. A request that fails on one
+    node (connection error, HTTP error, rate limit) puts that node in an
+    exponential cooldown and is retried on the next. A broadcast retried
+    after a failover that reports "already known" is treated as sent. A
+    background thread probes every endpoint with `eth_blockNumber` each
+    `health_interval` seconds; nodes more than `max_block_lag` blocks behind
+    the best one are only read from when nothing better is left; `close`
+    stops it.
+    """
+
+    def __init__(
+        self,
+        endpoint_uris: Sequence[str],
+        request_kwargs: Optional[Dict[str, Any]] = None,
+        health_interval: float = 15.0,
+        max_block_lag: int = 5,
+        cooldown: float = 5.0,
+        max_cooldown: float = 300.0
+    ):
+        if not endpoint_uris:
+            raise ValueError("PooledHTTPProvider needs at least one endpoint")
+        super().__init__()
+        self.endpoints = [_Endpoint(url, request_kwargs) for url in endpoint_uris]
+        # Stable identity for per-endpoint caches (nonces, gas, token metadata)
+        self.endpoint_uri = "|".join(endpoint_uris)
+        self.health_interval = health_interval
+        self.max_block_lag = max_block_lag
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+
+        self._lock = threading.Lock()
+        self._pinned: Optional[_Endpoint] = None
+        self._stopped = threading.Event()
+        self._health_thread: Optional[threading.Thread] = None
+        if health_interval and len(self.endpoints) > 1:
+            self._health_thread = threading.Thread(target=self._health_loop, daemon=True, name="rpc-health")
+            self._health_thread.start()
+
+    def __str__(self) -> str:
+        return f"Pooled HTTP connection {self.endpoint_uri}"
+
+    def _read_order(self) -> List[_Endpoint]:
+        best_block = max((endpoint.block for endpoint in self.endpoints if endpoint.block is not None), default=None)
+
+        def rank(endpoint: _Endpoint):
+            lagging = (best_block is not None and endpoint.block is not None
+                       and best_block - endpoint.block > self.max_block_lag)
+            unmeasured = endpoint.latency is None
+            return (not endpoint.healthy, lagging, unmeasured, endpoint.latency or 0.0)
+
+        return sorted(self.endpoints, key=rank)
+
+    def _write_order(self) -> List[_Endpoint]:
+        with self._lock:
+            if self._pinned is None or not self._pinned.healthy:
+                healthy = [endpoint for endpoint in self.endpoints if endpoint.healthy]
+                pinned = (healthy or self.endpoints)[0]
+                if self._pinned is not None and pinned is not self._pinned:
+                    logger.warning(f"⚠️ Moving transaction broadcasts from {self._pinned.url} to {pinned.url}")
+                self._pinned = pinned
+            pinned = self._pinned
+        return [pinned] + [endpoint for endpoint in self.endpoints if endpoint is not pinned and endpoint.healthy]
+
+    def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        write = _is_write(method, params)
+        candidates = self._write_order() if write else self._read_order()
+        last_error: Optional[Exception] = None
+
+        for attempt, endpoint in enumerate(candidates):
+            start = time.perf_counter()
+            try:
+                response = endpoint.provider.make_request(method, params)
+            except Exception as e:
+                last_error = e
+                endpoint.fail(self.cooldown, self.max_cooldown)
+                logger.warning(f"⚠️ RPC {endpoint.url} failed on {method}: {e}")
+                continue
+
+            error = response.get("error")
+            if error and _is_unavailable(error):
+                last_error = ValueError(error)
+                endpoint.fail(self.cooldown, self.max_cooldown)
+                logger.warning(f"⚠️ RPC {endpoint.url} unavailable for {method}: {error}")
+                continue
+
+            endpoint.observe(time.perf_counter() - start)
+            if write and attempt and error and any(p in str(error).lower() for p in ALREADY_KNOWN):
+                # The earlier node took the transaction before failing to answer
+                return {"jsonrpc": "2.0", "id": response.get("id"), "result": self._tx_hash(method, params)}
+            return response
+
+        raise ConnectionError(f"All {len(candidates)} RPC endpoints failed for {method}: {last_error}")
+
+    def make_batch_request(self, calls: Sequence[Tuple[str, Any]]) -> Any:
+        """Send `calls` as one JSON-RPC batch, routed and failed over like a single request.
+
+        Endpoints that refuse batches are skipped from then on; when none is
+        left the result is a None per call, so the caller sends them singly.
+        """
+        write = any(_is_write(method, params) for method, params in calls)
+        candidates = [endpoint for endpoint in (self._write_order() if write else self._read_order())
+                      if endpoint.batches]
+        if not candidates:
+            return [None] * len(calls)
+        last_error: Optional[Exception] = None
+
+        for endpoint in candidates:
+            start = time.perf_counter()
+            try:
+                body = post_batch(endpoint.provider, calls)
+            except Exception as e:
+                last_error = e
+                endpoint.fail(self.cooldown, self.max_cooldown)
+                logger.warning(f"⚠️ RPC {endpoint.url} failed on a batch of {len(calls)}: {e}")
+                continue
+
+            errors = [response.get("error") for response in body if response] if isinstance(body, list) else [
+                body.get("error")]
+            if any(error and _is_unavailable(error) for error in errors):
+                last_error = ValueError(next(error for error in errors if error and _is_unavailable(error)))
+                endpoint.fail(self.cooldown, self.max_cooldown)
+                logger.warning(f"⚠️ RPC {endpoint.url} unavailable for a batch of {len(calls)}: {last_error}")
+                continue
+
+            if not isinstance(body, list):
+                # The node is up but won't take batches: stop sending it any and try the next one
+                endpoint.batches = False
+                logger.warning(f"⚠️ RPC {endpoint.url} rejected a batch ({body.get('error')}), "
+                               f"sending it requests singly")
+                continue
+
+            endpoint.observe(time.perf_counter() - start)
+            return body
+
+        if not any(endpoint.batches for endpoint in candidates):
+            return [None] * len(calls)
+        raise ConnectionError(f"All {len(candidates)} RPC endpoints failed for a batch of {len(calls)}: {last_error}")
+
+    @staticmethod
+    def _tx_hash(method: str, params: Any) -> Optional[str]:
+        if method == "eth_sendRawTransaction":
+            return Web3.to_hex(Web3.keccak(hexstr=params[0]))
+        return None
+
+    def is_connected(self, show_traceback: bool = False) -> bool:
+        for endpoint in self._read_order():
+            if endpoint.provider.is_connected(show_traceback=show_traceback):
+                return True
+        return False
+
+    def check_health(self) -> None:
+        """Probe every endpoint once, updating latency, head block and cooldowns"""
+        for endpoint in self.endpoints:
+            start = time.perf_counter()
+            try:
+                response = endpoint.provider.make_request(RPCEndpoint("eth_blockNumber"), [])
+                if response.get("error"):
+                    raise ValueError(response["error"])
+                endpoint.block = int(response["result"], 16)
+                endpoint.observe(time.perf_counter() - start)
+            except Exception as e:
+                endpoint.fail(self.cooldown, self.max_cooldown)
+                logger.debug(f"Health check of {endpoint.url} failed: {e}")
+
+    def _health_loop(self) -> None:
+        while not self._stopped.is_set():
+            self.check_health()
+            self._stopped.wait(self.health_interval)
+
+    def close(self) -> None:
+        """Stop the health check thread"""
+        self._stopped.set()
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Current view of every endpoint, for logs and diagnostics"""
+        return [{
+            "url": endpoint.url,
+            "healthy": endpoint.healthy,
+            "latency_ms": None if endpoint.latency is None else endpoint.latency * 1000,
+            "block": endpoint.block,
+            "failures": endpoint.failures,
+            "batches": endpoint.batches,
+            "pinned": endpoint is self._pinned
+        } for endpoint in self.endpoints]
+
+
+class SessionHTTPProvider(AsyncHTTPProvider):
+    """AsyncHTTPProvider that posts through the aiohttp `session` it is given.
+
+    web3's own provider takes its session from a cache keyed by thread and
+    URL, so a later event loop on the same thread silently gets a default
+    session that ignores our connection limit and timeout and is never
+    closed. This one always uses `session`; closing it releases everything.
+    """
+
+    def __init__(self, endpoint_uri: str, session: ClientSession):
+        super().__init__(endpoint_uri)
+        self.session = session
+
+    async def _post(self, endpoint_uri: str, method: RPCEndpoint, params: Any) -> RPCResponse:
+        data = self.encode_rpc_request(method, params)
+        async with self.session.post(endpoint_uri, data=data, headers=self.get_request_headers()) as response:
+            response.raise_for_status()
+            return self.decode_rpc_response(await response.read())
+
+    async def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        return await self._post(self.endpoint_uri, method, params)
+
+
+class AsyncPooledHTTPProvider(SessionHTTPProvider):
+    """SessionHTTPProvider that routes every request the way `pool` would.
+
+    Reads go to the fastest healthy endpoint, broadcasts and pending-nonce
+    reads to the pool's pinned one, with the same failover and "already
+    known" handling. Latency and cooldowns are shared with `pool`, so sync
+    and async senders agree on which node is pinned.
+    """
+
+    def __init__(self, pool: PooledHTTPProvider, session: ClientSession):
+        super().__init__(pool.endpoints[0].url, session)
+        self.pool = pool
+
+    async def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        pool = self.pool
+        write = _is_write(method, params)
+        candidates = pool._write_order() if write else pool._read_order()
+        last_error: Optional[Exception] = None
+
+        for attempt, endpoint in enumerate(candidates):
+            start = time.perf_counter()
+            try:
+                response = await self._post(endpoint.url, method, params)
+            except Exception as e:
+                last_error = e
+                endpoint.fail(pool.cooldown, pool.max_cooldown)
+                logger.warning(f"⚠️ RPC {endpoint.url} failed on {method}: {e}")
+                continue
+
+            error = response.get("error")
+            if error and _is_unavailable(error):
+                last_error = ValueError(error)
+                endpoint.fail(pool.cooldown, pool.max_cooldown)
+                logger.warning(f"⚠️ RPC {endpoint.url} unavailable for {method}: {error}")
+                continue
+
+            endpoint.observe(time.perf_counter() - start)
+            if write and attempt and error and any(p in str(error).lower() for p in ALREADY_KNOWN):
+                return {"jsonrpc": "2.0", "id": response.get("id"), "result": pool._tx_hash(method, params)}
+            return response
+
+        raise ConnectionError(f"All {len(candidates)} RPC endpoints failed for {method}: {last_error}")
+
+
+def make_async_provider(provider: JSONBaseProvider, session: ClientSession) -> SessionHTTPProvider:
+    """Async counterpart of a provider from make_provider, posting through `session`"""
+    provider = provider.provider if isinstance(provider, BatchingProvider) else provider
+    if isinstance(provider, PooledHTTPProvider):
+        return AsyncPooledHTTPProvider(provider, session)
+    return SessionHTTPProvider(provider.endpoint_uri, session)
+
+
+def make_provider(endpoint_uris: Sequence[str], batch_window: Optional[float] = None, **options) -> JSONBaseProvider:
+    """A plain HTTPProvider for one endpoint, a PooledHTTPProvider for several.
+
+    With `batch_window` set (0 batches only explicit `gather` calls) the
+    provider is wrapped in a BatchingProvider.
+    """
+    endpoint_uris = [url for url in endpoint_uris if url]
+    if len(endpoint_uris) == 1:
+        provider = Web3.HTTPProvider(endpoint_uris[0], request_kwargs=options.get("request_kwargs"))
+    else:
+        provider = PooledHTTPProvider(endpoint_uris, **options)
+    if batch_window is None:
+        return provider
+    return BatchingProvider(provider, window=batch_window)
@@ -0,0 +1,65 @@
+from typing import Any, Dict, Iterable, List, Tuple
+from src.helpers.solar_clearing import PUBLIC_GRID, ClearingEngine
+
+
+def check_settlement(
+    houses: List[Dict[str, Any]],
+    transfers: Iterable[Tuple[str, str, Any]],
+    engine: ClearingEngine,
+    tolerance: float = 1e-6
+) -> List[str]:
+    """Rule violations in a set of SOLAR transfers for one tick, empty when it settles correctly.
+
+    Checks that every transfer is between known, distinct wallets; that the
+    buyer pays (a house short of energy only sends SOLAR and a house with a
+    surplus only receives it); that each house's net SOLAR equals its net kWh
+    at the engine's price; and that the Public Grid absorbs exactly the
+    community's residual. Any valid pairing passes, not just the one
+    ClearingEngine would pick.
+    """
+    wallets = {}
+    for house in houses:
+        wallet = engine.wallet_for(house)
+        if wallet:
+            wallets[wallet.lower()] = house.get("house")
+    grid_wallet = engine.house_wallets[PUBLIC_GRID].lower()
+    wallets[grid_wallet] = PUBLIC_GRID
+
+    positions = engine.net_positions(houses)
+    expected = {name: net * engine.price_per_kwh for name, net in positions.items()}
+    expected[PUBLIC_GRID] = -sum(expected.values())
+
+    violations = []
+    received = {name: 0.0 for name in expected}
+    paid = {name: 0.0 for name in expected}
+    for sender, recipient, amount in transfers:
+        payer, payee = wallets.get(sender.lower()), wallets.get(recipient.lower())
+        if payer is None or payee is None:
+            violations.append(f"unknown wallet in {sender} -> {recipient}")
+            continue
+        if payer == payee:
+            violations.append(f"{payer} pays itself")
+            continue
+        amount = float(amount)
+        if amount <= 0:
+            violations.append(f"non-positive amount {amount} from {payer} to {payee}")
+            continue
+        paid[payer] += amount
+        received[payee] += amount
+
+    # Tokens are conserved by construction; rounding can leave up to `tolerance` per transfer
+    slack = tolerance * (1 + len(houses))
+    for name, target in expected.items():
+        if name == PUBLIC_GRID:
+            continue
+        if target < -slack and received[name] > slack:
+            violations.append(f"buyer-pays: {name} is short {-target:g} kWh but receives {received[name]:g} SOLAR")
+        if target > slack and paid[name] > slack:
+            violations.append(f"buyer-pays: {name} has {target:g} kWh spare but pays {paid[name]:g} SOLAR")
+        if abs(received[name] - paid[name] - target) > slack:
+            violations.append(f"conservation: {name} nets {received[name] - paid[name]:g} SOLAR, expected {target:g}")
+
+    grid_net = received[PUBLIC_GRID] - paid[PUBLIC_GRID]
+    if abs(grid_net - expected[PUBLIC_GRID]) > slack:
+        violations.append(f"conservation: {PUBLIC_GRID} nets {grid_net:g} SOLAR, expected {expected[PUBLIC_GRID]:g}")
+    return violations
@@ -0,0 +1,155 @@
+import atexit
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger("helpers.settlement_netting")
+
+
+class NettingLedger:
+    """Accumulates SOLAR obligations per wallet pair and settles only the net.
+
+    Each call to `record` adds one round of (payer, recipient, amount)
+    obligations. Offsetting flows between the same two participants cancel
+    out, and the ledger hands the net amounts to the transaction manager's
+    `execute_batch` once the window closes: after `window_rounds` rounds,
+    after `window_seconds` seconds, or at interpreter shutdown. Transfers
+    that fail to go out are put back in the ledger for the next window.
+    """
+
+    def __init__(
+        self,
+        tx_manager,
+        window_rounds: Optional[int] = None,
+        window_seconds: Optional[float] = None,
+        precision: int = 6
+    ):
+        if not window_rounds and not window_seconds:
+            raise ValueError("NettingLedger needs window_rounds and/or window_seconds")
+
+        self.tx_manager = tx_manager
+        self.window_rounds = window_rounds
+        self.window_seconds = window_seconds
+        self.precision = precision
+
+        self._lock = threading.Lock()
+        # (a, b) with a < b -> net amount owed by a to b (negative: b owes a)
+        self._balances: Dict[Tuple[str, str], float] = {}
+        self._rounds = 0
+        self._opened_at = time.monotonic()
+        self._closed = False
+
+        atexit.register(self.close)
+        if window_seconds:
+            threading.Thread(target=self._flush_loop, daemon=True).start()
+
+    def record(self, transfers: List[Tuple[str, str, float]]) -> Optional[Dict[str, List[str]]]:
+        """Add one round of obligations; returns the settlement result if this closed the window"""
+        with self._lock:
+            self._add_locked(transfers)
+            self._rounds += 1
+
+        if self._window_closed():
+            return self.flush()
+        return None
+
+    def _add_locked(self, transfers: List[Tuple[str, str, float]]) -> None:
+        for payer, recipient, amount in transfers:
+            if payer == recipient or amount <= 0:
+                continue
+            if payer < recipient:
+                key, signed = (payer, recipient), amount
+            else:
+                key, signed = (recipient, payer), -amount
+            self._balances[key] = self._balances.get(key, 0.0) + signed
+
+    def net_obligations(self) -> List[Tuple[str, str, float]]:
+        """Current net (payer, recipient, amount) list without settling it"""
+        with self._lock:
+            return self._net_locked()
+
+    def _net_locked(self) -> List[Tuple[str, str, float]]:
+        obligations = []
+        for (a, b), amount in self._balances.items():
+            amount = round(amount, self.precision)
+            if amount > 0:
+                obligations.append((a, b, amount))
+            elif amount < 0:
+                obligations.append((b, a, -amount))
+        return obligations
+
+    def _window_closed(self) -> bool:
+        if self.window_rounds and self._rounds >= self.window_rounds:
+            return True
+        if self.window_seconds and time.monotonic() - self._opened_at >= self.window_seconds:
+            return True
+        return False
+
+    def flush(self) -> Dict[str, List[str]]:
+        """Settle all net obligations on-chain and start a new window"""
+        with self._lock:
+            obligations = self._net_locked()
+            rounds = self._rounds
+            self._balances = {}
+            self._rounds = 0
+            self._opened_at = time.monotonic()
+
+        if not obligations:
+            return {}
+
+        logger.info(f"🧾 Settling {len(obligations)} net transfers for {rounds} rounds")
+        try:
+            results = self.tx_manager.execute_batch(obligations)
+        except Exception:
+            self._requeue(obligations)
+            raise
+
+        self._requeue(self._failed(obligations, results))
+        return results
+
+    @staticmethod
+    def _failed(obligations: List[Tuple[str, str, float]],
+                results: Dict[str, List[Optional[str]]]) -> List[Tuple[str, str, float]]:
+        """Obligations that execute_batch reports as not sent"""
+        by_payer: Dict[str, List[Tuple[str, str, float]]] = {}
+        for obligation in obligations:
+            by_payer.setdefault(obligation[0], []).append(obligation)
+
+        failed = []
+        for payer, owed in by_payer.items():
+            hashes = results.get(payer) or [None] * len(owed)
+            if len(hashes) == len(owed):
+                failed.extend(obligation for obligation, tx_hash in zip(owed, hashes) if not tx_hash)
+            elif not any(hashes):
+                # A multisend whose broadcast failed may still land; paying again could pay twice
+                logger.error(f"❌ Multisend settlement for {payer} has an unknown outcome, not re-queued")
+        return failed
+
+    def _requeue(self, obligations: List[Tuple[str, str, float]]) -> None:
+        if not obligations:
+            return
+        logger.warning(f"⚠️ {len(obligations)} net transfers failed, carrying them into the next window")
+        with self._lock:
+            self._add_locked(obligations)
+
+    def _flush_loop(self):
+        while not self._closed:
+            time.sleep(self.window_seconds)
+            if self._closed:
+                break
+            try:
+                if self._window_closed():
+                    self.flush()
+            except Exception as e:
+                logger.error(f"❌ Scheduled netting flush failed: {e}")
+
+    def close(self) -> None:
+        """Flush whatever is outstanding; called automatically at shutdown"""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"❌ Final netting flush failed: {e}")
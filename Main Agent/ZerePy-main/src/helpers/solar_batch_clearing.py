@@ -0,0 +1,203 @@
+import logging
+from dataclasses import dataclass
+from typing import Dict, Any, List, Tuple
+import numpy as np
+from src.helpers.solar_clearing import ALLOCATIONS, PUBLIC_GRID, Trade
+
+logger = logging.getLogger("helpers.solar_batch_clearing")
+
+
+@dataclass
+class BatchClearingResult:
+    """Columnar clearing result for N houses x T ticks.
+
+    Per-house arrays have shape (N, T). Trades are parallel 1-D arrays: in
+    trade k, house `trade_buyer[k]` pays `trade_amount[k]` SOLAR to house
+    `trade_seller[k]` for `trade_kwh[k]` at tick `trade_tick[k]`.
+    """
+    net: np.ndarray
+    grid_export: np.ndarray
+    grid_import: np.ndarray
+    trade_tick: np.ndarray
+    trade_seller: np.ndarray
+    trade_buyer: np.ndarray
+    trade_kwh: np.ndarray
+    trade_amount: np.ndarray
+
+    @property
+    def num_trades(self) -> int:
+        return len(self.trade_tick)
+
+    @property
+    def sold_internal(self) -> np.ndarray:
+        return np.clip(self.net, 0, None) - self.grid_export
+
+    @property
+    def bought_internal(self) -> np.ndarray:
+        return np.clip(-self.net, 0, None) - self.grid_import
+
+    def trades_for_tick(self, tick: int) -> List[Tuple[int, int, float, float]]:
+        """(seller, buyer, kwh, amount) tuples for one tick"""
+        mask = self.trade_tick == tick
+        return list(zip(
+            self.trade_seller[mask].tolist(),
+            self.trade_buyer[mask].tolist(),
+            self.trade_kwh[mask].tolist(),
+            self.trade_amount[mask].tolist()
+        ))
+
+
+def houses_to_arrays(houses: List[Dict[str, Any]]) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """Convert the backend `houses` list into names plus (N, 1) generation/consumption columns"""
+    names = [house.get("house") for house in houses]
+    generation = np.array([float(house.get("generation", 0)) for house in houses]).reshape(-1, 1)
+    consumption = np.array([float(house.get("consumption", 0)) for house in houses]).reshape(-1, 1)
+    return names, generation, consumption
+
+
+def to_trades(
+    result: BatchClearingResult,
+    names: List[str],
+    tick: int = 0,
+    price_per_kwh: float = 1.0,
+    precision: int = 6
+) -> List[Trade]:
+    """Expand one tick of a batch result into Trade objects, grid residuals last"""
+    trades = []
+    dust = 10 ** -precision
+
+    def append(seller: str, buyer: str, kwh: float):
+        kwh = round(kwh, precision)
+        if kwh > dust:
+            trades.append(Trade(seller=seller, buyer=buyer, kwh=kwh, amount=round(kwh * price_per_kwh, precision)))
+
+    for seller, buyer, kwh, _ in result.trades_for_tick(tick):
+        append(names[seller], names[buyer], kwh)
+    for index in np.flatnonzero(result.grid_export[:, tick] > dust):
+        append(names[index], PUBLIC_GRID, float(result.grid_export[index, tick]))
+    for index in np.flatnonzero(result.grid_import[:, tick] > dust):
+        append(PUBLIC_GRID, names[index], float(result.grid_import[index, tick]))
+    return trades
+
+
+def clear_batch(
+    generation: np.ndarray,
+    consumption: np.ndarray,
+    price_per_kwh: float = 1.0,
+    allocation: str = "priority",
+    chunk_ticks: int = 256,
+    dust: float = 1e-6
+) -> BatchClearingResult:
+    """Clear N houses x T ticks in vectorized passes of `chunk_ticks` ticks.
+
+    Follows the same rules as ClearingEngine: houses trade among themselves
+    first (in input order for `priority`, proportionally for `pro_rata`) and
+    the residual on either side is settled with the Public Grid.
+    """
+    if allocation not in ALLOCATIONS:
+        raise ValueError(f"Invalid allocation '{allocation}'. Must be one of: {', '.join(ALLOCATIONS)}")
+
+    generation = np.asarray(generation)
+    consumption = np.asarray(consumption)
+    if generation.ndim == 1:
+        generation = generation.reshape(-1, 1)
+    if consumption.ndim == 1:
+        consumption = consumption.reshape(-1, 1)
+    if generation.shape != consumption.shape:
+        raise ValueError(f"Shape mismatch: generation {generation.shape} vs consumption {consumption.shape}")
+
+    # float32 inputs give float32 results so a day of 10k meters fits in memory, but each
+    # chunk is cleared in float64: in float32 the bought and sold running totals drift
+    # apart and pair houses across ticks
+    dtype = np.result_type(generation.dtype, consumption.dtype, np.float32)
+    num_ticks = generation.shape[1]
+    net = np.subtract(generation, consumption, dtype=dtype)
+    grid_export = np.empty_like(net)
+    grid_import = np.empty_like(net)
+    chunks = []
+
+    step = max(chunk_ticks, 1)
+    for start in range(0, num_ticks, step):
+        window = slice(start, start + step)
+        chunk = np.subtract(generation[:, window], consumption[:, window], dtype=np.float64)
+        surplus = np.clip(chunk, 0, None)
+        deficit = np.clip(-chunk, 0, None)
+
+        supply = surplus.sum(axis=0)
+        demand = deficit.sum(axis=0)
+        matched = np.minimum(supply, demand)
+
+        if allocation == "pro_rata":
+            with np.errstate(divide="ignore", invalid="ignore"):
+                sold = surplus * np.where(supply > 0, matched / supply, 0)
+                bought = deficit * np.where(demand > 0, matched / demand, 0)
+        else:
+            # Earlier houses fill first: each gets whatever of `matched` is left after those before it
+            sold = np.clip(matched - (np.cumsum(surplus, axis=0) - surplus), 0, surplus)
+            bought = np.clip(matched - (np.cumsum(deficit, axis=0) - deficit), 0, deficit)
+
+        grid_export[:, window] = surplus - sold
+        grid_import[:, window] = deficit - bought
+        chunks.append(_match_chunk(sold, bought, start, dust, dtype))
+
+    if chunks:
+        tick, seller, buyer, kwh = (np.concatenate(column) for column in zip(*chunks))
+    else:
+        tick = seller = buyer = np.zeros(0, dtype=np.int32)
+        kwh = np.zeros(0, dtype=dtype)
+
+    return BatchClearingResult(
+        net=net,
+        grid_export=grid_export,
+        grid_import=grid_import,
+        trade_tick=tick,
+        trade_seller=seller,
+        trade_buyer=buyer,
+        trade_kwh=kwh,
+        trade_amount=kwh * price_per_kwh
+    )
+
+
+def _match_chunk(
+    sold: np.ndarray,
+    bought: np.ndarray,
+    tick_offset: int,
+    dust: float,
+    dtype: np.dtype = np.float64
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Pair sellers with buyers for every tick of a chunk at once.
+
+    Each tick's sold and bought volumes are laid end to end on a number line;
+    the overlap of seller i's interval with buyer j's interval is the volume
+    i sells to j. Ticks are shifted apart on the same line so one sort and
+    two searchsorted calls cover the whole chunk. `sold` and `bought` must be
+    float64; only the returned volumes are cast to `dtype`.
+    """
+    num_houses, num_ticks = sold.shape
+    if num_houses == 0:
+        empty = np.zeros(0, dtype=np.int32)
+        return empty, empty, empty, np.zeros(0, dtype=dtype)
+    totals = np.minimum(sold.sum(axis=0), bought.sum(axis=0))
+    span = float(totals.max(initial=0.0)) + 1.0
+    offsets = np.arange(num_ticks) * span
+
+    sell_edges = (np.cumsum(sold, axis=0) + offsets).T.ravel()
+    buy_edges = (np.cumsum(bought, axis=0) + offsets).T.ravel()
+
+    points = np.unique(np.concatenate([offsets, sell_edges, buy_edges]))
+    starts, lengths = points[:-1], np.diff(points)
+    mids = starts + lengths / 2
+
+    ticks = np.floor(mids / span).astype(np.int64)
+    inside = (lengths > dust) & (mids - ticks * span < totals[ticks])
+    lengths, mids, ticks = lengths[inside], mids[inside], ticks[inside]
+
+    sell_index = np.searchsorted(sell_edges, mids, side="right")
+    buy_index = np.searchsorted(buy_edges, mids, side="right")
+    seller, buyer = sell_index % num_houses, buy_index % num_houses
+    # Rounding can still leave a sliver past one side's total, which would land in the next
+    # tick's row: keep only segments pairing a seller and a buyer of this very tick
+    valid = ((sell_index // num_houses == ticks) & (buy_index // num_houses == ticks)
+             & (sold[seller, ticks] > 0) & (bought[buyer, ticks] > 0))
+    return ((ticks[valid] + tick_offset).astype(np.int32), seller[valid].astype(np.int32),
+            buyer[valid].astype(np.int32), lengths[valid].astype(dtype))
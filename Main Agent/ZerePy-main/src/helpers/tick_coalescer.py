@@ -0,0 +1,168 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+logger = logging.getLogger("helpers.tick_coalescer")
+
+DEFAULT_FEEDER = None
+
+
+class TickCoalescer:
+    """Keeps only the freshest reading per house while a decision is in flight.
+
+    `submit` is cheap and never blocks the feed thread: it merges the
+    snapshot's houses into the pending one (newer readings replace older ones
+    for the same house) and schedules a decision on `executor` unless one is
+    already running. At most one decision per coalescer is in flight, so
+    decisions run in order on the latest data and never queue up, however
+    fast the backend publishes. Each decision only sees houses that reported
+    since the previous one, so a house that drops out isn't settled again on
+    its last reading. Readings older than `max_staleness` seconds are dropped
+    rather than decided on, and `min_interval` caps the decision rate.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Dict[str, Any]], Any],
+        max_staleness: Optional[float] = None,
+        min_interval: float = 0.0,
+        executor: Optional[Executor] = None
+    ):
+        self.handler = handler
+        self.max_staleness = max_staleness
+        self.min_interval = min_interval
+        self.executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="decision")
+
+        self._lock = threading.Lock()
+        self._houses: Dict[Any, Tuple[float, Dict[str, Any]]] = {}
+        self._fields: Dict[str, Any] = {}
+        self._pending = 0
+        self._running = False
+        self._last_start = 0.0
+        self.stats = {"received": 0, "coalesced": 0, "stale_dropped": 0, "decisions": 0}
+
+    def submit(self, snapshot: Dict[str, Any]) -> None:
+        """Merge a parsed backend snapshot into the pending one"""
+        now = time.monotonic()
+        with self._lock:
+            self.stats["received"] += 1
+            self._fields = {key: value for key, value in snapshot.items() if key != "houses"}
+            for house in snapshot.get("houses", []):
+                self._houses[house.get("house") or house.get("wallet")] = (now, house)
+            self._pending += 1
+            self._schedule()
+
+    def _schedule(self) -> None:
+        """Start a decision if there is new data and none is running; caller holds the lock"""
+        if not self._pending or self._running:
+            return
+        self._running = True
+        delay = self.min_interval - (time.monotonic() - self._last_start)
+        if delay > 0:
+            threading.Timer(delay, self.executor.submit, args=(self._decide,)).start()
+        else:
+            self.executor.submit(self._decide)
+
+    def _take(self) -> Dict[str, Any]:
+        """Pop the merged snapshot; caller holds the lock"""
+        if self.max_staleness is not None:
+            cutoff = time.monotonic() - self.max_staleness
+            stale = [name for name, (received, _) in self._houses.items() if received < cutoff]
+            for name in stale:
+                del self._houses[name]
+            self.stats["stale_dropped"] += len(stale)
+
+        if self._pending > 1:
+            logger.info(f"🧮 Merged {self._pending} backend messages into one decision")
+        self.stats["coalesced"] += self._pending - 1
+        self._pending = 0
+        houses, self._houses = self._houses, {}
+        return {**self._fields, "houses": [house for _, house in houses.values()]}
+
+    def _decide(self) -> None:
+        with self._lock:
+            snapshot = self._take()
+            self._last_start = time.monotonic()
+        try:
+            if snapshot["houses"]:
+                self.stats["decisions"] += 1
+                self.handler(snapshot)
+        except Exception as e:
+            logger.error(f"❌ Decision failed: {e}")
+        finally:
+            # Anything that arrived meanwhile is merged and waiting for the next round
+            with self._lock:
+                self._running = False
+                self._schedule()
+
+
+class FeederPool:
+    """Decides independent feeders in parallel, each one strictly in order.
+
+    Houses are routed by their optional `feeder` field to one TickCoalescer
+    per feeder, and all coalescers share a pool of `workers` threads (one
+    per CPU by default). A slow decision (an LLM call, a large clearing
+    round) only holds back its own feeder; the rest keep deciding on the
+    other workers. Messages that aren't valid snapshots are logged and
+    counted as `invalid`.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Dict[str, Any]], Any],
+        workers: Optional[int] = None,
+        max_staleness: Optional[float] = None,
+        min_interval: float = 0.0
+    ):
+        self.handler = handler
+        self.max_staleness = max_staleness
+        self.min_interval = min_interval
+        self.executor = ThreadPoolExecutor(
+            max_workers=max(workers or os.cpu_count() or 1, 1), thread_name_prefix="decision")
+        self.feeders: Dict[Any, TickCoalescer] = {}
+        self._lock = threading.Lock()
+        self._invalid = 0
+
+    def _coalescer(self, feeder: Any) -> TickCoalescer:
+        with self._lock:
+            if feeder not in self.feeders:
+                self.feeders[feeder] = TickCoalescer(
+                    self.handler,
+                    max_staleness=self.max_staleness,
+                    min_interval=self.min_interval,
+                    executor=self.executor)
+            return self.feeders[feeder]
+
+    def submit(self, message: Union[str, Dict[str, Any]]) -> None:
+        """Split a snapshot (raw JSON or already parsed) by feeder and hand each part to its coalescer"""
+        by_feeder = defaultdict(list)
+        try:
+            snapshot = json.loads(message) if isinstance(message, str) else message
+            for house in snapshot.get("houses", []):
+                by_feeder[house.get("feeder", DEFAULT_FEEDER)].append(house)
+        except (json.JSONDecodeError, AttributeError, TypeError) as e:
+            with self._lock:
+                self._invalid += 1
+            logger.error(f"❌ Invalid energy data: {e}")
+            return
+
+        fields = {key: value for key, value in snapshot.items() if key != "houses"}
+        for feeder, houses in by_feeder.items():
+            part = {**fields, "houses": houses}
+            if feeder is not DEFAULT_FEEDER:
+                part["feeder"] = feeder
+            self._coalescer(feeder).submit(part)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Counters summed over all feeders"""
+        totals = defaultdict(int, invalid=self._invalid)
+        for coalescer in list(self.feeders.values()):
+            for name, value in coalescer.stats.items():
+                totals[name] += value
+        return dict(totals)
@@ -0,0 +1,106 @@
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional
+from web3 import Web3
+from src.constants.abi import ERC20_ABI
+
+logger = logging.getLogger("helpers.token_metadata")
+
+CACHE_PATH = os.path.expanduser("~/.zerepy_cache/token_metadata.json")
+
+
+class TokenMetadataCache:
+    """Process-wide cache of immutable ERC-20 metadata (decimals, symbol).
+
+    Entries are keyed by "<chain id>:<lowercase address>" and persisted to a
+    JSON file so they survive restarts. The chain id itself is cached per RPC
+    endpoint, so a warm lookup costs no RPC calls at all.
+    """
+
+    def __init__(self, path: str = CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._chain_ids: Dict[str, int] = {}
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is None:
+            try:
+                with open(self.path, "r") as f:
+                    self._entries = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._entries = {}
+        return self._entries
+
+    def _save(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._entries, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not persist token metadata cache: {e}")
+
+    def chain_id(self, web3: Web3) -> int:
+        endpoint = getattr(web3.provider, "endpoint_uri", None) or str(id(web3.provider))
+        if endpoint not in self._chain_ids:
+            self._chain_ids[endpoint] = web3.eth.chain_id
+        return self._chain_ids[endpoint]
+
+    async def chain_id_async(self, web3: Any) -> int:
+        """chain_id() for an AsyncWeb3 client"""
+        endpoint = getattr(web3.provider, "endpoint_uri", None) or str(id(web3.provider))
+        if endpoint not in self._chain_ids:
+            self._chain_ids[endpoint] = await web3.eth.chain_id
+        return self._chain_ids[endpoint]
+
+    def _key(self, chain_id: int, token_address: str) -> str:
+        return f"{chain_id}:{token_address.lower()}"
+
+    def put(self, chain_id: int, token_address: str, **fields: Any) -> None:
+        """Record metadata fetched elsewhere (e.g. in a multicall batch)"""
+        with self._lock:
+            entry = self._load().setdefault(self._key(chain_id, token_address), {})
+            if any(entry.get(name) != value for name, value in fields.items()):
+                entry.update(fields)
+                self._save()
+
+    def lookup(self, chain_id: int, token_address: str, field: str) -> Optional[Any]:
+        """Cached value or None, without touching the chain"""
+        with self._lock:
+            return self._load().get(self._key(chain_id, token_address), {}).get(field)
+
+    def get(self, web3: Web3, token_address: str, field: str) -> Any:
+        """Cached `field` ('decimals' or 'symbol'), calling the token contract on a miss"""
+        chain_id = self.chain_id(web3)
+        value = self.lookup(chain_id, token_address, field)
+        if value is None:
+            contract = web3.eth.contract(address=Web3.to_checksum_address(token_address), abi=ERC20_ABI)
+            value = getattr(contract.functions, field)().call()
+            self.put(chain_id, token_address, **{field: value})
+        return value
+
+    async def get_async(self, web3: Any, token_address: str, field: str) -> Any:
+        """get() for an AsyncWeb3 client"""
+        chain_id = await self.chain_id_async(web3)
+        value = self.lookup(chain_id, token_address, field)
+        if value is None:
+            contract = web3.eth.contract(address=Web3.to_checksum_address(token_address), abi=ERC20_ABI)
+            value = await getattr(contract.functions, field)().call()
+            self.put(chain_id, token_address, **{field: value})
+        return value
+
+    def decimals(self, web3: Web3, token_address: str) -> int:
+        return self.get(web3, token_address, "decimals")
+
+    def symbol(self, web3: Web3, token_address: str) -> str:
+        return self.get(web3, token_address, "symbol")
+
+    async def decimals_async(self, web3: Any, token_address: str) -> int:
+        return await self.get_async(web3, token_address, "decimals")
+
+
+token_metadata = TokenMetadataCache()
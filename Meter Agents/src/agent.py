@@ -1,25 +1,42 @@
 import json
 import os
+import random
 import sys
 import asyncio
 import websockets
 from dotenv import load_dotenv
 from web3 import Web3
 from eth_account import Account
-import re
 
-# Función para guardar las transacciones en un archivo JSON local
-LOG_FILE = os.path.join(os.path.dirname(_file_), "transactions_log.json")
+from helpers.gas_oracle import GasOracle
+from helpers.nonce_manager import get_nonce_manager
+from helpers.receipt_tracker import ReceiptTracker
+from helpers.rpc_pool import make_provider
+from helpers.transaction_journal import TransactionJournal
+from helpers.solar_clearing import parse_decision_text, to_wei
+
+# Diario local de transacciones (JSON Lines, solo append)
+LEGACY_LOG_FILE = os.path.join(os.path.dirname(__file__), "transactions_log.json")
+journal = None
+
+
+def open_journal():
+    global journal
+    journal = TransactionJournal(
+        # One journal per agent: the index offsets assume a single writer
+        config.get("journal_path", os.path.join(os.path.dirname(__file__), f"transactions_log_{AGENT_NAME}")),
+        max_bytes=config.get("journal_max_bytes", 64 * 1024 * 1024),
+        fsync_every=config.get("journal_fsync_every", 32),
+        fsync_interval=config.get("journal_fsync_interval", 1.0))
+    # El log antiguo es compartido: cada agente copia solo sus envíos y lo deja para los demás
+    migrated = journal.import_legacy(
+        LEGACY_LOG_FILE, where=lambda record: str(record.get("sender", "")).lower() == AGENT_WALLET)
+    if migrated:
+        print(f"📚 {AGENT_NAME}: {migrated} transacciones migradas de {LEGACY_LOG_FILE}")
+
 
 def save_transaction_local(tx_result):
-    try:
-        with open(LOG_FILE, 'r') as f:
-            data = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        data = []
-    data.append(tx_result)
-    with open(LOG_FILE, 'w') as f:
-        json.dump(data, f, indent=2)
+    journal.append(tx_result)
 
 # -- Resto de tu configuración y lógica --
 
@@ -43,6 +60,8 @@ with open(CONFIG_PATH, "r") as f:
 AGENT_NAME = config["name"]
 PRIVATE_KEY_ENV = config["private_key_env"]
 RPC_URL = config["rpc_url"]
+# Endpoints extra opcionales: lecturas al más rápido, envíos fijados a uno solo
+RPC_URLS = config.get("rpc_urls") or [RPC_URL]
 SOLAR_TOKEN_ADDRESS = config["solar_contract"]
 
 PRIVATE_KEY = os.getenv(PRIVATE_KEY_ENV)
@@ -50,7 +69,8 @@ if not PRIVATE_KEY:
     print(f"❌ Error: Private key {PRIVATE_KEY_ENV} no encontrada.")
     sys.exit(1)
 
-web3 = Web3(Web3.HTTPProvider(RPC_URL))
+# Las peticiones concurrentes de los hilos de envío viajan juntas en un batch JSON-RPC
+web3 = Web3(make_provider(RPC_URLS, batch_window=config.get("batch_window", 0.002)))
 if not web3.is_connected():
     raise ConnectionError(f"❌ {AGENT_NAME}: No se pudo conectar al RPC.")
 
@@ -81,12 +101,37 @@ solar_contract = web3.eth.contract(
 WEBSOCKET_URL = "ws://127.0.0.1:8765"
 WEBSOCKET_URL = WEBSOCKET_URL.replace("https://", "wss://").replace("http://", "ws://")
 
+CHAIN_ID = web3.eth.chain_id
+RECEIPT_TIMEOUT = config.get("receipt_timeout", 120)
+RECEIPT_POLL_INTERVAL = config.get("receipt_poll_interval", 1)
+MAX_IN_FLIGHT = config.get("max_in_flight", 64)
+
+# Un solo seguidor de bloques resuelve los recibos de todas las transferencias en vuelo
+receipts = ReceiptTracker(web3, poll_interval=RECEIPT_POLL_INTERVAL, timeout=RECEIPT_TIMEOUT)
+
+# Tarifas de gas cacheadas por bloque y compartidas por todas las transferencias
+GAS_URGENCY = config.get("gas_urgency", "standard")
+gas_oracle = GasOracle(web3, refresh_interval=config.get("gas_refresh_interval", 1.0))
+RECONNECT_BASE_DELAY = config.get("reconnect_base_delay", 1)
+RECONNECT_MAX_DELAY = config.get("reconnect_max_delay", 60)
+
+# Nonces are handed out locally so a whole decision can be broadcast back to back
+nonces = get_nonce_manager(web3)
+in_flight = set()
+in_flight_slots = None
 
-def get_adjusted_gas_price():
-    base_gas_price = web3.eth.gas_price
-    return int(base_gas_price * 1.2)
+# Última decisión procesada, para retomar el feed tras una reconexión
+last_epoch = None
+last_seq = 0
 
-def send_solar_tokens(to_address, amount):
+
+def get_transaction_fees():
+    """Fee fields for the next transfer (type-2 when the chain supports it), from the cached oracle"""
+    return gas_oracle.fees(GAS_URGENCY)
+
+
+def send_solar_tokens(to_address, amount_raw, fees=None):
+    """Sign and broadcast a transfer of `amount_raw` base units without waiting for it to be mined."""
     transaction_result = {
         "success": False,
         "txHash": None,
@@ -102,83 +147,156 @@ def send_solar_tokens(to_address, amount):
             transaction_result["error"] = error_msg
             return transaction_result
 
-        print(f"🔄 {AGENT_NAME}: Sending {amount} SOLAR to {to_address}...")
-
-        amount_raw = int(float(amount) * (10**18))
+        print(f"🔄 {AGENT_NAME}: Sending {Web3.from_wei(amount_raw, 'ether')} SOLAR to {to_address}...")
 
         tx = solar_contract.functions.transfer(
             Web3.to_checksum_address(to_address),
             amount_raw
         ).build_transaction({
-            "chainId": web3.eth.chain_id,
-            "nonce": web3.eth.get_transaction_count(account.address, "pending"),
-            "gasPrice": get_adjusted_gas_price(),
+            "chainId": CHAIN_ID,
+            "nonce": 0,  # Placeholder so web3 skips its own nonce lookup; sign() sets the real one
+            **(fees or get_transaction_fees()),
             "from": account.address
         })
 
-        signed_tx = web3.eth.account.sign_transaction(tx, PRIVATE_KEY)
-        tx_hash = web3.eth.send_raw_transaction(signed_tx.rawTransaction)
+        def sign(nonce):
+            tx["nonce"] = nonce
+            return web3.eth.account.sign_transaction(tx, PRIVATE_KEY).rawTransaction
+
+        # Reintenta con nonce resincronizado; "already known" cuenta como enviada
+        tx_hash = nonces.submit(account.address, sign)
         
         transaction_result["txHash"] = tx_hash.hex()
         print(f"✅ {AGENT_NAME}: TX SENT OK - TxHash: {tx_hash.hex()}")
 
-        receipt = web3.eth.wait_for_transaction_receipt(tx_hash, timeout=120)
+    except Exception as e:
+        error_msg = f"❌ {AGENT_NAME}: Error sending SOLAR - {e}"
+        print(error_msg)
+        transaction_result["error"] = str(e)
+
+    return transaction_result
+
+
+async def wait_for_settlement(result_data):
+    """Wait for the receipt of a broadcast transfer and log the final result."""
+    try:
+        receipt = await asyncio.wrap_future(receipts.track(result_data["txHash"]))
 
+        result_data["blockNumber"] = receipt["blockNumber"]
+        result_data["gasUsed"] = receipt["gasUsed"]
         if receipt["status"] == 1:
-            transaction_result["success"] = True
-            transaction_result["blockNumber"] = receipt["blockNumber"]
-            transaction_result["gasUsed"] = receipt["gasUsed"]
+            result_data["success"] = True
             print(f"✅ {AGENT_NAME}: TX confirmada - Block {receipt['blockNumber']}")
             print(f"📜 Success! - Used Gas : {receipt['gasUsed']} - Block: {receipt['blockNumber']}")
         else:
-            transaction_result["error"] = "Transacción fallida en la red"
+            result_data["error"] = "Transacción fallida en la red"
             print(f"⚠️ {AGENT_NAME}: Failed TX - Block {receipt['blockNumber']}")
 
     except Exception as e:
-        error_msg = f"❌ {AGENT_NAME}: Error sending SOLAR - {e}"
-        print(error_msg)
-        transaction_result["error"] = str(e)
+        print(f"❌ {AGENT_NAME}: Error waiting for receipt - {e}")
+        result_data["error"] = str(e)
 
-    return transaction_result
+    finally:
+        # Guarda la transacción en el diario local
+        save_transaction_local(result_data)
+        in_flight_slots.release()
 
 
 async def receive_orders():
-    """Escucha las decisiones de IA por WebSocket."""
-    async with websockets.connect(WEBSOCKET_URL) as websocket:
-        print(f"🔌 {AGENT_NAME} conectado a {WEBSOCKET_URL}, waiting for IA instructions...")
-        while True:
-            message = await websocket.recv()
-            process_transactions(message)
-
-
-def process_transactions(message):
-    """Procesa las transacciones indicadas por la IA."""
+    """Escucha las decisiones de IA por WebSocket, reconectando con backoff y retomando por seq."""
+    attempt = 0
+    while True:
+        try:
+            async with websockets.connect(WEBSOCKET_URL) as websocket:
+                attempt = 0
+                print(f"🔌 {AGENT_NAME} conectado a {WEBSOCKET_URL}, waiting for IA instructions...")
+
+                # Solo recibir las transferencias en las que participa esta wallet,
+                # y las decisiones perdidas desde la última recibida
+                subscription = {"subscribe": [f"wallet:{AGENT_WALLET}"]}
+                if last_epoch is not None:
+                    subscription["resume"] = {"epoch": last_epoch, "seq": last_seq}
+                await websocket.send(json.dumps(subscription))
+
+                async for message in websocket:
+                    await process_transactions(message)
+
+        except (OSError, websockets.exceptions.WebSocketException) as e:
+            print(f"⚠️ {AGENT_NAME}: conexión perdida con {WEBSOCKET_URL} - {e}")
+
+        # Full jitter so a restarted server isn't hit by every meter at once
+        delay = random.uniform(0, min(RECONNECT_MAX_DELAY, RECONNECT_BASE_DELAY * 2 ** attempt))
+        attempt += 1
+        print(f"🔁 {AGENT_NAME}: reconectando en {delay:.1f}s...")
+        await asyncio.sleep(delay)
+
+
+async def process_transactions(message):
+    """Procesa las transacciones indicadas por la IA.
+
+    All transfers this agent owes are broadcast immediately with sequential
+    local nonces; receipts are tracked in the background.
+    """
+    global last_epoch, last_seq
     try:
         data = json.loads(message)
+
+        if "subscribed" in data:
+            print(f"📬 {AGENT_NAME} suscrito a {data['subscribed']} (seq {data.get('seq')})")
+            if data.get("gap"):
+                print(f"⚠️ {AGENT_NAME}: algunas decisiones ya no están en el buffer del servidor")
+            return
+        if "error" in data:
+            print(f"⚠️ {AGENT_NAME}: el servidor rechazó la suscripción - {data['error']}")
+            return
+
+        seq = data.get("seq")
+        if seq is not None:
+            if data.get("epoch") == last_epoch and seq <= last_seq:
+                return  # Ya procesada (llegó en vivo y también en el replay)
+            last_epoch, last_seq = data.get("epoch"), seq
+
         ai_decision = data.get("ai_decision", "")
+        decision = data.get("decision")
 
         print(f"🔍 {AGENT_NAME} busca transacciones en la decisión IA...")
-        print(f"🔍 RAW AI Decision Text: {ai_decision}")
-
-        transactions = re.findall(
-            r"Wallet (0x[a-fA-F0-9]+) sends (\d+) SOLAR to Wallet (0x[a-fA-F0-9]+) on Sonic Network\.",
-            ai_decision
-        )
+        if decision and decision.get("settled_by") == "server":
+            # El servidor liquida (neteado) en cadena; pagar aquí también pagaría dos veces
+            print(f"🧾 {AGENT_NAME}: decisión liquidada por el servidor, nada que enviar")
+            return
+        if decision:
+            transactions = [
+                (transfer["from"], int(transfer["amount_wei"]), transfer["to"])
+                for transfer in decision.get("transfers", [])
+            ]
+        else:
+            # Servidores antiguos solo envían el texto
+            print(f"🔍 RAW AI Decision Text: {ai_decision}")
+            transactions = [
+                (sender, to_wei(amount), recipient)
+                for sender, recipient, amount in parse_decision_text(ai_decision)
+            ]
 
         if not transactions:
             print(f"⚠️ {AGENT_NAME} No valid tx found.")
             return
 
-        for sender, amount, recipient in transactions:
+        fees = None
+        for sender, amount_wei, recipient in transactions:
             sender = sender.lower()
             recipient = recipient.lower()
+            amount = str(Web3.from_wei(amount_wei, "ether"))
 
             if recipient == AGENT_WALLET:
                 print(f"💰 {AGENT_NAME} recibe {amount} SOLAR de {sender}")
 
             elif sender == AGENT_WALLET:
                 print(f"📩 {AGENT_NAME} inicia transacción: {amount} SOLAR → {recipient}")
-                tx_result = send_solar_tokens(recipient, int(amount))
+                if fees is None:
+                    fees = await asyncio.to_thread(get_transaction_fees)
+
+                await in_flight_slots.acquire()
+                tx_result = await asyncio.to_thread(send_solar_tokens, recipient, amount_wei, fees)
 
                 # Crea el diccionario para la transacción
                 result_data = {
@@ -186,28 +304,43 @@ def process_transactions(message):
                     "sender": sender,
                     "recipient": recipient,
                     "amount": amount,
+                    "amountWei": str(amount_wei),
                     "txHash": tx_result["txHash"],
                     "success": tx_result["success"],
                     "error": tx_result["error"],
                     "blockNumber": tx_result["blockNumber"],
                     "gasUsed": tx_result["gasUsed"]
                 }
-                
-                # Guarda la transacción localmente en transactions_log.json
-                save_transaction_local(result_data)
+
+                if not tx_result["txHash"]:
+                    save_transaction_local(result_data)
+                    in_flight_slots.release()
+                    continue
+
+                task = asyncio.create_task(wait_for_settlement(result_data))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
 
             elif sender == PUBLIC_GRID_WALLET and recipient == AGENT_WALLET:
                 print(f"🏦 Public Grid sent {amount} SOLAR to {AGENT_NAME}")
 
+        if in_flight:
+            print(f"⏳ {AGENT_NAME}: {len(in_flight)} transfers awaiting confirmation")
+
     except json.JSONDecodeError:
         print(f"❌ {AGENT_NAME} Error: JSON inválido recibido.")
+    except (KeyError, TypeError, ValueError) as e:
+        print(f"❌ {AGENT_NAME} Error: decisión mal formada - {e}")
 
 
 async def main():
     """Función principal del agente."""
+    global in_flight_slots
+    in_flight_slots = asyncio.Semaphore(MAX_IN_FLIGHT)
+    open_journal()
     await receive_orders()
 
 
-if _name_ == "_main_":
+if __name__ == "__main__":
     print(f"🤖 Iniciando {AGENT_NAME}, waiting for IA decisions...")
     asyncio.run(main())
@@ -0,0 +1,362 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Any, Optional
+import aiohttp
+from dotenv import load_dotenv
+from web3 import AsyncWeb3, Web3
+from web3.middleware import async_geth_poa_middleware
+from src.connections.sonic_connection import SonicConnection, SonicConnectionError
+from src.helpers.rpc_pool import make_async_provider
+from src.helpers.token_metadata import token_metadata
+
+logger = logging.getLogger("connections.async_sonic_connection")
+
+
+class AsyncSonicConnection(SonicConnection):
+    """SonicConnection whose chain actions are coroutines on one AsyncWeb3 client.
+
+    `get_balance`, `transfer` and `swap` (and the KyberSwap calls behind a
+    swap) await an AsyncWeb3 over a single aiohttp session, so any number of
+    them can overlap on one event loop without a thread each. Its requests
+    are routed over `rpc_urls` by the sync client's pool. Nonces, fee
+    quotes, token metadata and receipt tracking are the same process-wide
+    helpers SonicConnection uses, so both classes can send from one account.
+    Setup (`configure`, `is_configured`) stays on the inherited sync client.
+
+    Run actions with `await perform_action_async(...)`; the sync
+    `perform_action` still works and runs the action on a fresh event loop.
+    Await `close()` before an event loop that used the connection ends.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.max_connections = config.get("max_connections", 100)
+        self.request_timeout = config.get("request_timeout", 30)
+        self._async_web3: Optional[AsyncWeb3] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        # asyncio locks belong to one loop, so each loop gets its own
+        self._client_lock: Optional[asyncio.Lock] = None
+        self._client_lock_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def _get_client(self) -> AsyncWeb3:
+        """AsyncWeb3 bound to the running event loop, created once by the first caller"""
+        loop = asyncio.get_running_loop()
+        if self._client_lock_loop is not loop:
+            self._client_lock = asyncio.Lock()
+            self._client_lock_loop = loop
+        async with self._client_lock:
+            if self._async_web3 is not None and not self._session.closed and self._session_loop is loop:
+                return self._async_web3
+
+            # Sessions can't cross event loops: close the old one before replacing it
+            await self._close_session()
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                timeout=aiohttp.ClientTimeout(total=self.request_timeout)
+            )
+            self._session_loop = loop
+            # Same endpoints, pinning and cooldowns as the sync client, over our own session
+            self._async_web3 = AsyncWeb3(make_async_provider(self._web3.provider, self._session))
+            self._async_web3.middleware_onion.inject(async_geth_poa_middleware, layer=0)
+            return self._async_web3
+
+    async def _close_session(self) -> None:
+        session, loop = self._session, self._session_loop
+        self._session = None
+        self._async_web3 = None
+        if session is None or session.closed:
+            return
+        if loop is asyncio.get_running_loop():
+            await session.close()
+        elif loop is not None and loop.is_running():
+            # Still serving another thread: close it there
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(session.close(), loop))
+        else:
+            logger.warning("Dropping an aiohttp session whose event loop ended without close()")
+
+    async def close(self) -> None:
+        """Close the aiohttp session"""
+        await self._close_session()
+
+    def _get_account(self):
+        private_key = os.getenv('SONIC_PRIVATE_KEY')
+        if not private_key:
+            raise SonicConnectionError("No wallet configured")
+        return self._web3.eth.account.from_key(private_key)
+
+    async def _sign_and_send_async(self, account, tx: Dict[str, Any]):
+        """Sign and broadcast a transaction using a locally managed nonce"""
+        def sign(nonce: int):
+            tx['nonce'] = nonce
+            return account.sign_transaction(tx).rawTransaction
+
+        return await self._nonces.submit_async(await self._get_client(), account.address, sign)
+
+    async def _chain_id(self) -> int:
+        return await token_metadata.chain_id_async(await self._get_client())
+
+    async def get_balance(self, address: Optional[str] = None, token_address: Optional[str] = None) -> float:
+        """Get balance for an address or the configured wallet"""
+        try:
+            web3 = await self._get_client()
+            if not address:
+                address = self._get_account().address
+
+            if token_address:
+                contract = web3.eth.contract(
+                    address=Web3.to_checksum_address(token_address),
+                    abi=self.ERC20_ABI
+                )
+                balance, decimals = await asyncio.gather(
+                    contract.functions.balanceOf(Web3.to_checksum_address(address)).call(),
+                    token_metadata.decimals_async(web3, token_address)
+                )
+                return balance / (10 ** decimals)
+            else:
+                balance = await web3.eth.get_balance(Web3.to_checksum_address(address))
+                return web3.from_wei(balance, 'ether')
+
+        except Exception as e:
+            logger.error(f"Failed to get balance: {e}")
+            raise
+
+    async def transfer(self, to_address: str, amount: float, token_address: Optional[str] = None) -> str:
+        """Transfer $S or tokens to an address"""
+        try:
+            web3 = await self._get_client()
+            account = self._get_account()
+            chain_id, fees = await asyncio.gather(
+                self._chain_id(),
+                self._gas.fees_async(web3, self.gas_urgency)
+            )
+
+            if token_address:
+                contract = web3.eth.contract(
+                    address=Web3.to_checksum_address(token_address),
+                    abi=self.ERC20_ABI
+                )
+                decimals = await token_metadata.decimals_async(web3, token_address)
+                amount_raw = int(amount * (10 ** decimals))
+
+                tx = await contract.functions.transfer(
+                    Web3.to_checksum_address(to_address),
+                    amount_raw
+                ).build_transaction({
+                    'from': account.address,
+                    **fees,
+                    'chainId': chain_id
+                })
+            else:
+                tx = {
+                    'to': Web3.to_checksum_address(to_address),
+                    'value': web3.to_wei(amount, 'ether'),
+                    'gas': 21000,
+                    **fees,
+                    'chainId': chain_id
+                }
+
+            tx_hash = await self._sign_and_send_async(account, tx)
+
+            # Log and return explorer link immediately
+            tx_link = self._get_explorer_link(tx_hash.hex())
+            return f"⛓️ Transfer transaction sent: {tx_link}"
+
+        except Exception as e:
+            logger.error(f"Transfer failed: {e}")
+            raise
+
+    async def _aggregator_request(self, method: str, path: str, **kwargs) -> Dict:
+        await self._get_client()
+        async with self._session.request(method, f"{self.aggregator_api}{path}", **kwargs) as response:
+            response.raise_for_status()
+            data = await response.json()
+        if data.get("code") != 0:
+            raise SonicConnectionError(f"API error: {data.get('message')}")
+        return data["data"]
+
+    async def _get_swap_route(self, token_in: str, token_out: str, amount_in: float) -> Dict:
+        """Get the best swap route from Kyberswap API"""
+        try:
+            web3 = await self._get_client()
+            if token_in.lower() == self.NATIVE_TOKEN.lower():
+                amount_raw = web3.to_wei(amount_in, 'ether')
+            else:
+                decimals = await token_metadata.decimals_async(web3, token_in)
+                amount_raw = int(amount_in * (10 ** decimals))
+
+            return await self._aggregator_request(
+                "GET", "/routes",
+                headers={"x-client-id": "ZerePyBot"},
+                params={
+                    "tokenIn": token_in,
+                    "tokenOut": token_out,
+                    "amountIn": str(amount_raw),
+                    "gasInclude": "true"
+                }
+            )
+
+        except Exception as e:
+            logger.error(f"Failed to get swap route: {e}")
+            raise
+
+    async def _get_encoded_swap_data(self, route_summary: Dict, slippage: float = 0.5) -> str:
+        """Get encoded swap data from Kyberswap API"""
+        try:
+            account = self._get_account()
+            data = await self._aggregator_request(
+                "POST", "/route/build",
+                headers={"x-client-id": "zerepy"},
+                json={
+                    "routeSummary": route_summary,
+                    "sender": account.address,
+                    "recipient": account.address,
+                    "slippageTolerance": int(slippage * 100),  # Convert to bps
+                    "deadline": int(time.time() + 1200),  # 20 minutes
+                    "source": "ZerePyBot"
+                }
+            )
+            return data["data"]
+
+        except Exception as e:
+            logger.error(f"Failed to encode swap data: {e}")
+            raise
+
+    async def _handle_token_approval(self, token_address: str, spender_address: str, amount: int) -> None:
+        """Handle token approval for spender"""
+        try:
+            web3 = await self._get_client()
+            account = self._get_account()
+
+            token_contract = web3.eth.contract(
+                address=Web3.to_checksum_address(token_address),
+                abi=self.ERC20_ABI
+            )
+
+            # Check current allowance
+            current_allowance = await token_contract.functions.allowance(
+                account.address,
+                spender_address
+            ).call()
+
+            if current_allowance < amount:
+                chain_id, fees = await asyncio.gather(
+                    self._chain_id(),
+                    self._gas.fees_async(web3, self.gas_urgency)
+                )
+                approve_tx = await token_contract.functions.approve(
+                    spender_address,
+                    amount
+                ).build_transaction({
+                    'from': account.address,
+                    **fees,
+                    'chainId': chain_id
+                })
+
+                tx_hash = await self._sign_and_send_async(account, approve_tx)
+                logger.info(f"Approval transaction sent: {self._get_explorer_link(tx_hash.hex())}")
+
+                # The shared block follower resolves the receipt without blocking the loop
+                await asyncio.wrap_future(self._receipts.track(tx_hash))
+
+        except Exception as e:
+            logger.error(f"Approval failed: {e}")
+            raise
+
+    async def swap(self, token_in: str, token_out: str, amount: float, slippage: float = 0.5) -> str:
+        """Execute a token swap using the KyberSwap router"""
+        try:
+            web3 = await self._get_client()
+            account = self._get_account()
+            native_in = token_in.lower() == self.NATIVE_TOKEN.lower()
+
+            # Balance check and route lookup don't depend on each other
+            current_balance, route_data = await asyncio.gather(
+                self.get_balance(address=account.address, token_address=None if native_in else token_in),
+                self._get_swap_route(token_in, token_out, amount)
+            )
+
+            if current_balance < amount:
+                raise ValueError(f"Insufficient balance. Required: {amount}, Available: {current_balance}")
+
+            # Get encoded swap data
+            encoded_data = await self._get_encoded_swap_data(route_data["routeSummary"], slippage)
+
+            # Get router address from route data
+            router_address = route_data["routerAddress"]
+
+            # Handle token approval if not using native token
+            if not native_in:
+                if token_in.lower() == "0x039e2fb66102314ce7b64ce5ce3e5183bc94ad38".lower():  # $S token
+                    amount_raw = web3.to_wei(amount, 'ether')
+                else:
+                    decimals = await token_metadata.decimals_async(web3, token_in)
+                    amount_raw = int(amount * (10 ** decimals))
+                await self._handle_token_approval(token_in, router_address, amount_raw)
+
+            chain_id, fees = await asyncio.gather(
+                self._chain_id(),
+                self._gas.fees_async(web3, self.gas_urgency)
+            )
+
+            # Prepare transaction
+            tx = {
+                'from': account.address,
+                'to': Web3.to_checksum_address(router_address),
+                'data': encoded_data,
+                **fees,
+                'chainId': chain_id,
+                'value': web3.to_wei(amount, 'ether') if native_in else 0
+            }
+
+            # Estimate gas
+            try:
+                tx['gas'] = await web3.eth.estimate_gas(tx)
+            except Exception as e:
+                logger.warning(f"Gas estimation failed: {e}, using default gas limit")
+                tx['gas'] = 500000  # Default gas limit
+
+            # Sign and send transaction
+            tx_hash = await self._sign_and_send_async(account, tx)
+
+            # Log and return explorer link immediately
+            tx_link = self._get_explorer_link(tx_hash.hex())
+            return f"🔄 Swap transaction sent: {tx_link}"
+
+        except Exception as e:
+            logger.error(f"Swap failed: {e}")
+            raise
+
+    async def perform_action_async(self, action_name: str, kwargs) -> Any:
+        """Execute a Sonic action with validation, awaiting it on the running loop"""
+        if action_name not in self.actions:
+            raise KeyError(f"Unknown action: {action_name}")
+
+        load_dotenv()
+
+        # is_configured makes blocking RPC calls on the sync client
+        if not await asyncio.to_thread(self.is_configured, verbose=True):
+            raise SonicConnectionError("Sonic is not properly configured")
+
+        action = self.actions[action_name]
+        errors = action.validate_params(kwargs)
+        if errors:
+            raise ValueError(f"Invalid parameters: {', '.join(errors)}")
+
+        method_name = action_name.replace('-', '_')
+        result = getattr(self, method_name)(**kwargs)
+        if asyncio.iscoroutine(result):
+            result = await result
+        return result
+
+    def perform_action(self, action_name: str, kwargs) -> Any:
+        """Execute a Sonic action from sync code, on an event loop of its own"""
+        async def run():
+            try:
+                return await self.perform_action_async(action_name, kwargs)
+            finally:
+                await self.close()
+
+        return asyncio.run(run())
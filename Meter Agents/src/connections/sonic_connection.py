@@ -9,6 +9,12 @@ from web3.middleware import geth_poa_middleware
 from src.constants.abi import ERC20_ABI
 from src.connections.base_connection import BaseConnection, Action, ActionParameter
 from src.constants.networks import SONIC_NETWORKS
+from src.helpers.gas_oracle import URGENCY_TIERS, get_gas_oracle
+from src.helpers.nonce_manager import get_nonce_manager
+from src.helpers.receipt_tracker import get_receipt_tracker
+from src.helpers.rpc_batch import gather
+from src.helpers.rpc_pool import make_provider
+from src.helpers.token_metadata import token_metadata
 
 logger = logging.getLogger("connections.sonic_connection")
 
@@ -31,9 +37,17 @@ class SonicConnection(BaseConnection):
         network_config = SONIC_NETWORKS[network]
         self.explorer = network_config["scanner_url"]
         self.rpc_url = network_config["rpc_url"]
+        # Several endpoints are pooled: reads go to the fastest, writes stay pinned to one
+        self.rpc_urls = config.get("rpc_urls") or network_config.get("rpc_urls") or [self.rpc_url]
+        # Seconds a request waits for others to share its JSON-RPC batch; None turns batching off
+        self.batch_window = config.get("batch_window", 0.002)
         
         super().__init__(config)
         self._initialize_web3()
+        self._nonces = get_nonce_manager(self._web3)
+        self._receipts = get_receipt_tracker(self._web3)
+        self._gas = get_gas_oracle(self._web3)
+        self.gas_urgency = config.get("gas_urgency", "standard")
         self.ERC20_ABI = ERC20_ABI
         self.NATIVE_TOKEN = "0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE"
         self.aggregator_api = "https://aggregator-api.kyberswap.com/sonic/api/v1"
@@ -45,10 +59,14 @@ class SonicConnection(BaseConnection):
     def _initialize_web3(self):
         """Initialize Web3 connection"""
         if not self._web3:
-            self._web3 = Web3(Web3.HTTPProvider(self.rpc_url))
-            self._web3.middleware_onion.inject(geth_poa_middleware, layer=0)
-            if not self._web3.is_connected():
+            web3 = Web3(make_provider(self.rpc_urls, batch_window=self.batch_window))
+            web3.middleware_onion.inject(geth_poa_middleware, layer=0)
+            if not web3.is_connected():
+                # A pooled provider runs its own health check thread: don't leave it behind
+                if hasattr(web3.provider, "close"):
+                    web3.provider.close()
                 raise SonicConnectionError("Failed to connect to Sonic network")
+            self._web3 = web3
             
             try:
                 chain_id = self._web3.eth.chain_id
@@ -56,6 +74,14 @@ class SonicConnection(BaseConnection):
             except Exception as e:
                 logger.warning(f"Could not get chain ID: {e}")
 
+    def _sign_and_send(self, account, tx: Dict[str, Any]):
+        """Sign and broadcast a transaction using a locally managed nonce"""
+        def sign(nonce: int):
+            tx['nonce'] = nonce
+            return account.sign_transaction(tx).rawTransaction
+
+        return self._nonces.submit(account.address, sign)
+
     @property
     def is_llm_provider(self) -> bool:
         return False
@@ -69,7 +95,10 @@ class SonicConnection(BaseConnection):
         
         if config["network"] not in SONIC_NETWORKS:
             raise ValueError(f"Invalid network '{config['network']}'. Must be one of: {', '.join(SONIC_NETWORKS.keys())}")
-            
+
+        if config.get("gas_urgency", "standard") not in URGENCY_TIERS:
+            raise ValueError(f"Invalid gas_urgency. Must be one of: {', '.join(URGENCY_TIERS)}")
+
         return config
 
     def get_token_by_ticker(self, ticker: str) -> Optional[str]:
@@ -208,7 +237,7 @@ class SonicConnection(BaseConnection):
                     abi=self.ERC20_ABI
                 )
                 balance = contract.functions.balanceOf(address).call()
-                decimals = contract.functions.decimals().call()
+                decimals = token_metadata.decimals(self._web3, token_address)
                 return balance / (10 ** decimals)
             else:
                 balance = self._web3.eth.get_balance(address)
@@ -223,14 +252,19 @@ class SonicConnection(BaseConnection):
         try:
             private_key = os.getenv('SONIC_PRIVATE_KEY')
             account = self._web3.eth.account.from_key(private_key)
-            chain_id = self._web3.eth.chain_id
+            # Whatever isn't cached yet is fetched in one round trip
+            chain_id, fees, decimals = gather(
+                self._web3,
+                lambda: token_metadata.chain_id(self._web3),
+                lambda: self._gas.fees(self.gas_urgency),
+                lambda: token_metadata.decimals(self._web3, token_address) if token_address else None
+            )
             
             if token_address:
                 contract = self._web3.eth.contract(
                     address=Web3.to_checksum_address(token_address),
                     abi=self.ERC20_ABI
                 )
-                decimals = contract.functions.decimals().call()
                 amount_raw = int(amount * (10 ** decimals))
                 
                 tx = contract.functions.transfer(
@@ -238,22 +272,19 @@ class SonicConnection(BaseConnection):
                     amount_raw
                 ).build_transaction({
                     'from': account.address,
-                    'nonce': self._web3.eth.get_transaction_count(account.address),
-                    'gasPrice': self._web3.eth.gas_price,
+                    **fees,
                     'chainId': chain_id
                 })
             else:
                 tx = {
-                    'nonce': self._web3.eth.get_transaction_count(account.address),
                     'to': Web3.to_checksum_address(to_address),
                     'value': self._web3.to_wei(amount, 'ether'),
                     'gas': 21000,
-                    'gasPrice': self._web3.eth.gas_price,
+                    **fees,
                     'chainId': chain_id
                 }
 
-            signed = account.sign_transaction(tx)
-            tx_hash = self._web3.eth.send_raw_transaction(signed.rawTransaction)
+            tx_hash = self._sign_and_send(account, tx)
 
             # Log and return explorer link immediately
             tx_link = self._get_explorer_link(tx_hash.hex())
@@ -272,11 +303,7 @@ class SonicConnection(BaseConnection):
             if token_in.lower() == self.NATIVE_TOKEN.lower():
                 amount_raw = self._web3.to_wei(amount_in, 'ether')
             else:
-                token_contract = self._web3.eth.contract(
-                    address=Web3.to_checksum_address(token_in),
-                    abi=self.ERC20_ABI
-                )
-                decimals = token_contract.functions.decimals().call()
+                decimals = token_metadata.decimals(self._web3, token_in)
                 amount_raw = int(amount_in * (10 ** decimals))
             
             # Set up API request
@@ -356,17 +383,15 @@ class SonicConnection(BaseConnection):
                     amount
                 ).build_transaction({
                     'from': account.address,
-                    'nonce': self._web3.eth.get_transaction_count(account.address),
-                    'gasPrice': self._web3.eth.gas_price,
+                    **self._gas.fees(self.gas_urgency),
                     'chainId': self._web3.eth.chain_id
                 })
                 
-                signed_approve = account.sign_transaction(approve_tx)
-                tx_hash = self._web3.eth.send_raw_transaction(signed_approve.rawTransaction)
+                tx_hash = self._sign_and_send(account, approve_tx)
                 logger.info(f"Approval transaction sent: {self._get_explorer_link(tx_hash.hex())}")
                 
-                # Wait for approval to be mined
-                self._web3.eth.wait_for_transaction_receipt(tx_hash)
+                # Wait for approval to be mined, alongside any other transaction being tracked
+                self._receipts.wait(tx_hash)
                 
         except Exception as e:
             logger.error(f"Approval failed: {e}")
@@ -401,11 +426,7 @@ class SonicConnection(BaseConnection):
                 if token_in.lower() == "0x039e2fb66102314ce7b64ce5ce3e5183bc94ad38".lower():  # $S token
                     amount_raw = self._web3.to_wei(amount, 'ether')
                 else:
-                    token_contract = self._web3.eth.contract(
-                        address=Web3.to_checksum_address(token_in),
-                        abi=self.ERC20_ABI
-                    )
-                    decimals = token_contract.functions.decimals().call()
+                    decimals = token_metadata.decimals(self._web3, token_in)
                     amount_raw = int(amount * (10 ** decimals))
                 self._handle_token_approval(token_in, router_address, amount_raw)
             
@@ -414,8 +435,7 @@ class SonicConnection(BaseConnection):
                 'from': account.address,
                 'to': Web3.to_checksum_address(router_address),
                 'data': encoded_data,
-                'nonce': self._web3.eth.get_transaction_count(account.address),
-                'gasPrice': self._web3.eth.gas_price,
+                **self._gas.fees(self.gas_urgency),
                 'chainId': self._web3.eth.chain_id,
                 'value': self._web3.to_wei(amount, 'ether') if token_in.lower() == self.NATIVE_TOKEN.lower() else 0
             }
@@ -428,8 +448,7 @@ class SonicConnection(BaseConnection):
                 tx['gas'] = 500000  # Default gas limit
             
             # Sign and send transaction
-            signed_tx = account.sign_transaction(tx)
-            tx_hash = self._web3.eth.send_raw_transaction(signed_tx.rawTransaction)
+            tx_hash = self._sign_and_send(account, tx)
             
             # Log and return explorer link immediately
             tx_link = self._get_explorer_link(tx_hash.hex())
@@ -0,0 +1,341 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Dict, List, Optional, Set, Tuple
+import websockets
+
+logger = logging.getLogger("helpers.decision_feed")
+
+ALL_TOPIC = "all"
+TOPIC_PREFIXES = ("wallet:", "feeder:")
+
+
+def normalize_topic(topic: str) -> str:
+    """Canonical form of a topic, or ValueError for anything unknown"""
+    topic = str(topic).strip()
+    if topic == ALL_TOPIC:
+        return topic
+    for prefix in TOPIC_PREFIXES:
+        if topic.startswith(prefix) and len(topic) > len(prefix):
+            return topic.lower() if prefix == "wallet:" else topic
+    raise ValueError(f"Unknown topic '{topic}'. Use 'all', 'wallet:<address>' or 'feeder:<id>'")
+
+
+class _Client:
+    """One connected peer: a bounded outbox drained by its own writer task"""
+
+    def __init__(self, websocket, buffer_size: int):
+        self.websocket = websocket
+        self.outbox: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+        # Handshake replies and catch-up messages, sent before anything in the outbox
+        self.backlog: deque = deque()
+        self.wakeup = asyncio.Event()
+        self.writer: Optional[asyncio.Task] = None
+        # Clients that never subscribe get everything, as before topics existed
+        self.topics: Set[str] = {ALL_TOPIC}
+        # Live decisions held back while a request is handled (or the client has yet to send one),
+        # so a resume's catch-up reaches the client ahead of anything newer
+        self.held: Optional[List[Tuple[int, Dict[str, Any], Dict[str, str]]]] = []
+        self.greeted = False
+
+
+class DecisionFeed:
+    """WebSocket server that fans decisions out to meter agents.
+
+    The server and every client live on one long-lived event loop owned by a
+    background thread. `publish` may be called from any thread: the message
+    is handed to the loop, serialized once per distinct audience and dropped
+    into each client's bounded outbox. Every client drains its outbox in its
+    own writer task, so sends to different peers run concurrently and one slow
+    peer never delays the rest. A client whose outbox is full, or whose send
+    takes longer than `send_timeout`, is evicted.
+
+    Clients pick what they receive by sending `{"subscribe": [topics]}`
+    (answered with `{"subscribed": [...]}`) or `{"unsubscribe": [topics]}`.
+    Topics are `all`, `wallet:<address>` and `feeder:<id>`; a wallet or feeder
+    subscriber only receives the typed transfers it is party to, and nothing
+    at all for decisions that don't involve it.
+
+    Every decision is stamped with the feed's `epoch` and an increasing `seq`.
+    The last `replay_size` decisions stay in memory and, with `spill_path`,
+    all of them are also appended to a JSON Lines file. A reconnecting client
+    adds `"resume": {"epoch": E, "seq": N}` to its subscribe request and is
+    first sent every retained decision after N that matches its topics. Live
+    decisions for a client are held back until its request has been answered
+    (or, for a client that never sends one, for `handshake_timeout` seconds)
+    so they never overtake that catch-up.
+    """
+
+    def __init__(
+        self,
+        host: str = "0.0.0.0",
+        port: int = 8765,
+        client_buffer: int = 64,
+        send_timeout: float = 5.0,
+        replay_size: int = 1024,
+        spill_path: Optional[str] = None,
+        spill_max_bytes: int = 64 * 1024 * 1024,
+        handshake_timeout: float = 1.0
+    ):
+        self.host = host
+        self.port = port
+        self.client_buffer = client_buffer
+        self.send_timeout = send_timeout
+        self.spill_path = spill_path
+        self.spill_max_bytes = spill_max_bytes
+        self.handshake_timeout = handshake_timeout
+
+        self.loop = asyncio.new_event_loop()
+        self.clients: Dict[Any, _Client] = {}
+        self.published = 0
+        self.evicted = 0
+
+        self.replay: deque = deque(maxlen=replay_size)
+        self.epoch = int(time.time() * 1000)
+        self.seq = 0
+        self._spill = None
+        if spill_path:
+            self._open_spill()
+
+    def _open_spill(self) -> None:
+        """Continue the epoch and sequence of a previous run from the spill file"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.spill_path)), exist_ok=True)
+        entries = self._read_spill(0, None)
+        if entries:
+            self.seq, last_message, _ = entries[-1]
+            self.epoch = last_message["epoch"]
+            self.replay.extend(entries)
+        self._spill = open(self.spill_path, "a", encoding="utf-8")
+
+    def start(self) -> None:
+        thread = threading.Thread(target=self._run, daemon=True)
+        thread.start()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.create_task(self._serve())
+        self.loop.run_forever()
+
+    async def _serve(self):
+        while True:
+            try:
+                server = await websockets.serve(self._handler, self.host, self.port, origins=None)
+                logger.info(f"✅ WebSocket output started at ws://{self.host}:{self.port}")
+                await server.wait_closed()
+            except Exception as e:
+                logger.error(f"❌ Error in WebSocket output: {e}")
+
+            logger.warning("⚠️ WebSocket output closed. Retrying in 5 seconds...")
+            await asyncio.sleep(5)
+
+    async def _handler(self, websocket, path=None):
+        client = _Client(websocket, self.client_buffer)
+        client.writer = asyncio.create_task(self._write(client))
+        self.clients[websocket] = client
+        self.loop.call_later(self.handshake_timeout, self._greet_timeout, client)
+        logger.info(f"🟢 WebSocket client connected ({len(self.clients)} total)")
+        try:
+            async for raw in websocket:
+                await self._on_client_message(client, raw)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            self._drop(websocket)
+            logger.warning(f"🔴 WebSocket client disconnected ({len(self.clients)} left)")
+
+    def _greet_timeout(self, client: _Client) -> None:
+        if not client.greeted:
+            client.greeted = True
+            self._release(client, 0)
+
+    def _release(self, client: _Client, covered: int) -> None:
+        """Resume live delivery, first sending held decisions newer than seq `covered`"""
+        held, client.held = client.held or [], None
+        for entry in held:
+            if entry[0] > covered:
+                payload = self._payloads(entry, [client]).get(id(client))
+                if payload:
+                    client.backlog.append(payload)
+        client.wakeup.set()
+
+    async def _on_client_message(self, client: _Client, raw) -> None:
+        client.greeted = True
+        if client.held is None:
+            client.held = []
+        catch_up = []
+        covered = 0
+        try:
+            request = json.loads(raw)
+            if "subscribe" in request:
+                client.topics = {normalize_topic(topic) for topic in request["subscribe"]}
+            if "unsubscribe" in request:
+                client.topics -= {normalize_topic(topic) for topic in request["unsubscribe"]}
+            reply = {"subscribed": sorted(client.topics), "epoch": self.epoch, "seq": self.seq}
+            if "resume" in request:
+                # The catch-up covers everything published so far, held decisions included
+                covered = self.seq
+                catch_up, gap = await self._resume(client, request["resume"])
+                reply.update({"replayed": len(catch_up), "gap": gap})
+        except (ValueError, TypeError, AttributeError, KeyError) as e:
+            reply = {"error": str(e)}
+        client.backlog.append(json.dumps(reply))
+        client.backlog.extend(catch_up)
+        self._release(client, covered)
+
+    async def _resume(self, client: _Client, resume: Dict[str, Any]) -> Tuple[List[str], bool]:
+        """Payloads for every retained decision after the client's seq, and whether some were lost"""
+        # A different epoch means the client last saw a previous run: everything retained is new to it
+        after = int(resume["seq"]) if resume.get("epoch") == self.epoch else 0
+        entries = [entry for entry in self.replay if entry[0] > after]
+        oldest = entries[0][0] if entries else self.seq + 1
+
+        if self._spill and oldest > after + 1:
+            entries = await self.loop.run_in_executor(None, self._read_spill, after, oldest) + entries
+            oldest = entries[0][0] if entries else self.seq + 1
+
+        payloads = [self._payloads(entry, [client]).get(id(client)) for entry in entries]
+        return [payload for payload in payloads if payload], oldest > after + 1
+
+    def _read_spill(self, after: int, before: Optional[int]) -> List[Tuple[int, Dict[str, Any], Dict[str, str]]]:
+        entries = []
+        for path in (f"{self.spill_path}.1", self.spill_path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except json.JSONDecodeError:
+                            continue
+                        seq = record["message"]["seq"]
+                        if seq > after and (before is None or seq < before):
+                            entries.append((seq, record["message"], record["feeders"]))
+            except FileNotFoundError:
+                continue
+        return entries
+
+    async def _write(self, client: _Client):
+        try:
+            while True:
+                if client.backlog:
+                    payload = client.backlog.popleft()
+                elif not client.outbox.empty():
+                    payload = client.outbox.get_nowait()
+                else:
+                    client.wakeup.clear()
+                    await client.wakeup.wait()
+                    continue
+                await asyncio.wait_for(client.websocket.send(payload), self.send_timeout)
+        except asyncio.TimeoutError:
+            self._evict(client, "send timed out")
+        except (websockets.exceptions.ConnectionClosed, asyncio.CancelledError):
+            pass
+
+    def _drop(self, websocket) -> Optional[_Client]:
+        client = self.clients.pop(websocket, None)
+        if client and client.writer and client.writer is not asyncio.current_task():
+            client.writer.cancel()
+        return client
+
+    def _evict(self, client: _Client, reason: str) -> None:
+        if self._drop(client.websocket) is None:
+            return
+        self.evicted += 1
+        logger.warning(f"⚠️ Evicting slow WebSocket client: {reason}")
+        asyncio.ensure_future(client.websocket.close(code=1013, reason="slow consumer"))
+
+    def _enqueue(self, client: _Client, payload: str) -> None:
+        try:
+            client.outbox.put_nowait(payload)
+            client.wakeup.set()
+        except asyncio.QueueFull:
+            self._evict(client, f"{self.client_buffer} messages backlogged")
+
+    def _fan_out(self, message: Dict[str, Any], feeders: Dict[str, str]) -> None:
+        self.seq += 1
+        message = {**message, "epoch": self.epoch, "seq": self.seq}
+        entry = (self.seq, message, feeders)
+        self.replay.append(entry)
+        if self._spill:
+            self._spill_entry(message, feeders)
+
+        clients = list(self.clients.values())
+        payloads = self._payloads(entry, [client for client in clients if client.held is None])
+        for client in clients:
+            if client.held is not None:
+                if len(client.held) >= self.client_buffer:
+                    self._evict(client, f"{self.client_buffer} messages held during handshake")
+                else:
+                    client.held.append(entry)
+            elif id(client) in payloads:
+                self._enqueue(client, payloads[id(client)])
+
+    def _spill_entry(self, message: Dict[str, Any], feeders: Dict[str, str]) -> None:
+        try:
+            if self._spill.tell() >= self.spill_max_bytes:
+                self._spill.close()
+                os.replace(self.spill_path, f"{self.spill_path}.1")
+                self._spill = open(self.spill_path, "a", encoding="utf-8")
+            self._spill.write(json.dumps({"message": message, "feeders": feeders}) + "\n")
+            self._spill.flush()
+        except OSError as e:
+            logger.warning(f"Could not spill decision {message['seq']} to disk: {e}")
+
+    def _payloads(self, entry: Tuple[int, Dict[str, Any], Dict[str, str]], clients: List[_Client]) -> Dict[int, str]:
+        """id(client) -> serialized message for that client, each distinct payload serialized once"""
+        _, message, feeders = entry
+        full_payload = None
+        index = None
+        filtered_payloads: Dict[tuple, str] = {}
+        payloads = {}
+
+        for client in clients:
+            if ALL_TOPIC in client.topics:
+                if full_payload is None:
+                    full_payload = json.dumps(message)
+                payloads[id(client)] = full_payload
+                continue
+
+            if index is None:
+                index = self._index_transfers(message, feeders)
+            matches = tuple(sorted(set().union(*(index.get(topic, ()) for topic in client.topics))))
+            if not matches:
+                continue
+            if matches not in filtered_payloads:
+                filtered_payloads[matches] = json.dumps(self._filter(message, matches))
+            payloads[id(client)] = filtered_payloads[matches]
+        return payloads
+
+    def _index_transfers(self, message: Dict[str, Any], feeders: Dict[str, str]) -> Dict[str, List[int]]:
+        """topic -> positions of the transfers it is party to"""
+        index = defaultdict(list)
+        transfers = (message.get("decision") or {}).get("transfers", [])
+        for position, transfer in enumerate(transfers):
+            topics = set()
+            for wallet in (transfer["from"].lower(), transfer["to"].lower()):
+                topics.add(f"wallet:{wallet}")
+                if wallet in feeders:
+                    topics.add(f"feeder:{feeders[wallet]}")
+            for topic in topics:
+                index[topic].append(position)
+        return index
+
+    def _filter(self, message: Dict[str, Any], positions: tuple) -> Dict[str, Any]:
+        decision = message["decision"]
+        filtered = {key: value for key, value in message.items() if key not in ("decision", "ai_decision")}
+        filtered["decision"] = {**decision, "transfers": [decision["transfers"][i] for i in positions]}
+        return filtered
+
+    def publish(self, message: Dict[str, Any], feeders: Optional[Dict[str, str]] = None) -> None:
+        """Queue `message` for every interested client; safe to call from any thread.
+
+        `feeders` maps wallet addresses to feeder ids for `feeder:` topics.
+        """
+        feeders = {wallet.lower(): str(feeder) for wallet, feeder in (feeders or {}).items()}
+        self.published += 1
+        if self.clients:
+            logger.info(f"📡 Sending Solametrics AI decisions to {len(self.clients)} peers...")
+        self.loop.call_soon_threadsafe(self._fan_out, message, feeders)
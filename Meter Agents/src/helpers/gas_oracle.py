@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from web3 import Web3
+
+logger = logging.getLogger("helpers.gas_oracle")
+
+# Urgency tier -> percentile of recent priority fees to pay
+URGENCY_TIERS = {"slow": 25, "standard": 50, "fast": 90}
+PERCENTILES = sorted(set(URGENCY_TIERS.values()))
+# Multipliers on eth_gasPrice for chains without EIP-1559 fee history ("standard" is the old fixed ×1.2)
+LEGACY_MULTIPLIERS = {"slow": 1.0, "standard": 1.2, "fast": 1.25}
+
+_oracles: Dict[str, "GasOracle"] = {}
+_oracles_lock = threading.Lock()
+
+
+class GasOracle:
+    """Fee quotes shared by every sender on one chain, refreshed at most once per block.
+
+    One `eth_feeHistory` call over the last `history_blocks` blocks gives the
+    next block's base fee and the priority fees recently paid at each tier's
+    percentile. Quotes are cached for `refresh_interval` seconds (about a
+    block), so building a transaction costs no RPC call at all. Type-2 quotes
+    set `maxFeePerGas` to `base_fee_multiplier` times the base fee plus the
+    tip: enough headroom to stay includable through several full blocks,
+    while the chain only ever charges the actual base fee plus the tip.
+    Chains without fee history get `gasPrice` quotes from `eth_gasPrice`.
+    Refresh RPCs run outside the lock that guards the quote, so a slow node
+    never blocks an event loop reading it; one thread refreshes at a time.
+    """
+
+    def __init__(
+        self,
+        web3: Web3,
+        history_blocks: int = 10,
+        refresh_interval: float = 1.0,
+        base_fee_multiplier: float = 2.0,
+        min_priority_fee: int = 0,
+        max_fee_cap: Optional[int] = None
+    ):
+        self._web3 = web3
+        self.history_blocks = history_blocks
+        self.refresh_interval = refresh_interval
+        self.base_fee_multiplier = base_fee_multiplier
+        self.min_priority_fee = min_priority_fee
+        self.max_fee_cap = max_fee_cap
+
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refreshed_at = 0.0
+        self._base_fee: Optional[int] = None
+        self._priority_fees: Dict[str, int] = {}
+        self._gas_price: Optional[int] = None
+        self._async_refresh: Optional[asyncio.Future] = None
+        self.refreshes = 0
+
+    @property
+    def supports_eip1559(self) -> bool:
+        self._ensure_fresh()
+        return self._base_fee is not None
+
+    def _stale(self) -> bool:
+        return time.monotonic() - self._refreshed_at >= self.refresh_interval
+
+    def _ensure_fresh(self) -> None:
+        if not self._stale():
+            return
+        # Threads that find the quote stale together wait for one refresh
+        with self._refresh_lock:
+            if not self._stale():
+                return
+            try:
+                history = self._web3.eth.fee_history(self.history_blocks, "latest", PERCENTILES)
+                self._store(*self._parse_fee_history(history))
+            except Exception as e:
+                logger.debug(f"Fee history unavailable ({e}), using eth_gasPrice")
+                self._store(None, {}, self._web3.eth.gas_price)
+
+    def _parse_fee_history(self, history: Dict[str, Any]) -> Tuple[int, Dict[str, int]]:
+        base_fees = history.get("baseFeePerGas") or []
+        if not base_fees or base_fees[-1] is None:
+            raise ValueError("chain reports no base fee")
+
+        rewards = [block for block in history.get("reward") or [] if block]
+        priority_fees = {}
+        for tier, percentile in URGENCY_TIERS.items():
+            column = sorted(block[PERCENTILES.index(percentile)] for block in rewards)
+            tip = column[len(column) // 2] if column else 0
+            priority_fees[tier] = max(tip, self.min_priority_fee)
+        # The last entry is the base fee of the block after `latest`
+        return base_fees[-1], priority_fees
+
+    def _store(self, base_fee: Optional[int], priority_fees: Dict[str, int], gas_price: Optional[int] = None) -> None:
+        with self._lock:
+            self._base_fee = base_fee
+            self._priority_fees = priority_fees
+            self._gas_price = gas_price
+            self._refreshed_at = time.monotonic()
+            self.refreshes += 1
+
+    async def _refresh_async(self, web3: Any) -> None:
+        try:
+            history = await web3.eth.fee_history(self.history_blocks, "latest", PERCENTILES)
+            self._store(*self._parse_fee_history(history))
+        except Exception as e:
+            logger.debug(f"Fee history unavailable ({e}), using eth_gasPrice")
+            self._store(None, {}, await web3.eth.gas_price)
+
+    def fees(self, urgency: str = "standard") -> Dict[str, int]:
+        """Fee fields to merge into a transaction: type-2 when the chain supports it, else gasPrice"""
+        if urgency not in URGENCY_TIERS:
+            raise ValueError(f"Invalid urgency '{urgency}'. Must be one of: {', '.join(URGENCY_TIERS)}")
+        self._ensure_fresh()
+        with self._lock:
+            return self._quote(urgency)
+
+    async def fees_async(self, web3: Any, urgency: str = "standard") -> Dict[str, int]:
+        """fees() for coroutines, refreshing through `web3`, an AsyncWeb3 client on the same chain.
+
+        Coroutines that find the quote stale together share one refresh; one
+        that is cancelled while waiting leaves it running for the others.
+        """
+        if urgency not in URGENCY_TIERS:
+            raise ValueError(f"Invalid urgency '{urgency}'. Must be one of: {', '.join(URGENCY_TIERS)}")
+        if self._stale():
+            refresh = self._async_refresh
+            if refresh is None or refresh.done() or refresh.get_loop() is not asyncio.get_running_loop():
+                refresh = self._async_refresh = asyncio.ensure_future(self._refresh_async(web3))
+            await asyncio.shield(refresh)
+        with self._lock:
+            return self._quote(urgency)
+
+    def _quote(self, urgency: str) -> Dict[str, int]:
+        """Quote from the cached fees; caller holds the lock"""
+        if self._base_fee is None:
+            return {"gasPrice": int(self._gas_price * LEGACY_MULTIPLIERS[urgency])}
+
+        tip = self._priority_fees[urgency]
+        max_fee = int(self._base_fee * self.base_fee_multiplier) + tip
+        if self.max_fee_cap is not None:
+            max_fee = min(max_fee, self.max_fee_cap)
+            tip = min(tip, max_fee)
+        return {"maxFeePerGas": max_fee, "maxPriorityFeePerGas": tip}
+
+    def gas_price(self, urgency: str = "standard") -> int:
+        """Single legacy price for callers that can only send type-0 transactions"""
+        if urgency not in URGENCY_TIERS:
+            raise ValueError(f"Invalid urgency '{urgency}'. Must be one of: {', '.join(URGENCY_TIERS)}")
+        self._ensure_fresh()
+        with self._lock:
+            fees = self._quote(urgency)
+            if "gasPrice" in fees:
+                return fees["gasPrice"]
+            # Room for one full block of base fee growth (+12.5%) on top of the tip
+            return min(fees["maxFeePerGas"], int(self._base_fee * 1.125) + fees["maxPriorityFeePerGas"])
+
+
+def get_gas_oracle(web3: Web3, **options) -> GasOracle:
+    """Process-wide GasOracle for the RPC endpoint behind `web3`.
+
+    `options` configure the oracle when it is first created; asking for the
+    same endpoint again with different options raises ValueError.
+    """
+    key = getattr(web3.provider, "endpoint_uri", None) or str(id(web3.provider))
+    with _oracles_lock:
+        oracle = _oracles.get(key)
+        if oracle is None:
+            return _oracles.setdefault(key, GasOracle(web3, **options))
+        conflicting = {name: value for name, value in options.items() if getattr(oracle, name) != value}
+        if conflicting:
+            raise ValueError(f"Gas oracle for {key} already exists with different options: {', '.join(conflicting)}")
+        return oracle
@@ -0,0 +1,224 @@
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from web3 import Web3
+from web3._utils.encoding import FriendlyJsonSerde, Web3JsonEncoder
+from web3._utils.request import make_post_request
+from web3.providers.base import JSONBaseProvider
+from web3.types import RPCEndpoint, RPCResponse
+
+logger = logging.getLogger("helpers.rpc_batch")
+
+# Broadcasts keep their own request so failover and "already known" handling stay per transaction
+UNBATCHED_METHODS = {"eth_sendRawTransaction", "eth_sendTransaction"}
+
+_ids = itertools.count()
+
+
+def post_batch(provider: Any, calls: Sequence[Tuple[str, Any]]) -> Any:
+    """POST `calls` as one JSON-RPC batch array to an HTTPProvider's endpoint.
+
+    Returns the decoded body: normally a list of responses in any order, or a
+    single error object from nodes that refuse batches.
+    """
+    payload = [{"jsonrpc": "2.0", "method": method, "params": params or [], "id": next(_ids)}
+               for method, params in calls]
+    data = FriendlyJsonSerde().json_encode(payload, Web3JsonEncoder)
+    raw = make_post_request(provider.endpoint_uri, data.encode(), **provider.get_request_kwargs())
+    body = FriendlyJsonSerde().json_decode(raw.decode())
+    if isinstance(body, list):
+        # Hand back responses in request order; a missing one stays None
+        by_id = {response.get("id"): response for response in body if isinstance(response, dict)}
+        return [by_id.get(request["id"]) for request in payload]
+    return body
+
+
+class _Group:
+    def __init__(self, size: int):
+        self.size = size
+        self.waiting = 0
+        self.finished = 0
+
+    @property
+    def blocked(self) -> bool:
+        return self.waiting > 0 and self.waiting + self.finished >= self.size
+
+
+class _Call:
+    def __init__(self, method: str, params: Any, group: Optional[_Group], deadline: float):
+        self.method = method
+        self.params = params
+        self.group = group
+        self.deadline = deadline
+        self.done = threading.Event()
+        self.response: Optional[RPCResponse] = None
+        self.error: Optional[Exception] = None
+
+
+class BatchingProvider(JSONBaseProvider):
+    """Sends concurrent JSON-RPC requests as batch arrays, one round trip per batch.
+
+    Wraps an HTTPProvider (or a PooledHTTPProvider). A request waits up to
+    `window` seconds for others from any thread to join it, and the batch goes
+    out when the window closes or `max_batch` requests are queued. `gather`
+    runs a handful of web3 calls together and flushes as soon as every one of
+    them is waiting on the provider, so a flow that needs chain id, fees and
+    token decimals pays one round trip instead of three, with no window at
+    all. Each caller gets its own response back, `error` included, so web3
+    raises for a failed request and not for its batch mates. A node that
+    rejects batches gets the requests one at a time from then on; behind a
+    PooledHTTPProvider that is decided per endpoint by the pool. The wrapped
+    provider's middlewares (HTTPProvider's request retries) move onto the
+    wrapper, so they apply to every request, batched or not.
+    """
+
+    def __init__(
+        self,
+        provider: JSONBaseProvider,
+        window: float = 0.002,
+        max_batch: int = 100,
+        group_timeout: float = 0.05,
+        max_in_flight: int = 8
+    ):
+        super().__init__()
+        self.provider = provider
+        self.endpoint_uri = getattr(provider, "endpoint_uri", None) or str(id(provider))
+        # web3 only runs the middlewares of the provider it holds, so keep HTTPProvider's request retries
+        self.middlewares = provider.middlewares
+        self.window = window
+        self.max_batch = max_batch
+        # Backstop for gathered calls blocked on something other than the provider
+        self.group_timeout = group_timeout
+
+        self._cond = threading.Condition()
+        self._pending: List[_Call] = []
+        self._local = threading.local()
+        self._flusher: Optional[threading.Thread] = None
+        # Several batches may be on the wire at once; the next one fills while they travel
+        self._senders = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="rpc-batch-send")
+        self._batch_supported = True
+        self.stats = {"requests": 0, "batches": 0}
+
+    def __str__(self) -> str:
+        return f"Batching {self.provider}"
+
+    def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        group = getattr(self._local, "group", None)
+        if method in UNBATCHED_METHODS or (group is None and not self.window) or not self._batch_supported:
+            return self.provider.make_request(method, params)
+
+        call = _Call(method, params, group, time.monotonic() + (self.group_timeout if group else self.window))
+        with self._cond:
+            self._pending.append(call)
+            if group:
+                group.waiting += 1
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, daemon=True, name="rpc-batch")
+                self._flusher.start()
+            self._cond.notify()
+        call.done.wait()
+        if call.error:
+            raise call.error
+        return call.response
+
+    def is_connected(self, show_traceback: bool = False) -> bool:
+        return self.provider.is_connected(show_traceback=show_traceback)
+
+    def close(self) -> None:
+        """Stop the sender threads and close the wrapped provider"""
+        self._senders.shutdown(wait=False)
+        if hasattr(self.provider, "close"):
+            self.provider.close()
+
+    def gather(self, *calls: Callable[[], Any]) -> List[Any]:
+        """Run `calls` on their own threads, batching their requests, and return their results in order"""
+        group = _Group(len(calls))
+        results: List[Any] = [None] * len(calls)
+        errors: List[Optional[BaseException]] = [None] * len(calls)
+
+        def run(index: int, call: Callable[[], Any]) -> None:
+            self._local.group = group
+            try:
+                results[index] = call()
+            except BaseException as e:
+                errors[index] = e
+            finally:
+                with self._cond:
+                    group.finished += 1
+                    self._cond.notify()
+
+        threads = [threading.Thread(target=run, args=(index, call), daemon=True) for index, call in enumerate(calls)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for error in errors:
+            if error is not None:
+                raise error
+        return results
+
+    def _ready(self) -> Tuple[bool, Optional[float]]:
+        if not self._pending:
+            return False, None
+        if len(self._pending) >= self.max_batch or any(call.group and call.group.blocked for call in self._pending):
+            return True, None
+        wait = min(call.deadline for call in self._pending) - time.monotonic()
+        return wait <= 0, wait
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self._cond:
+                ready, wait = self._ready()
+                while not ready:
+                    self._cond.wait(wait)
+                    ready, wait = self._ready()
+                batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+                for call in batch:
+                    if call.group:
+                        call.group.waiting -= 1
+                self.stats["requests"] += len(batch)
+                self.stats["batches"] += 1
+            self._senders.submit(self._send, batch)
+
+    def _send(self, batch: List[_Call]) -> None:
+        responses: List[Optional[RPCResponse]] = [None] * len(batch)
+        if len(batch) > 1 and self._batch_supported:
+            try:
+                body = self._post([(call.method, call.params) for call in batch])
+                if isinstance(body, list):
+                    responses = body
+                else:
+                    # Only a single endpoint answers here; pools fail over and track this per endpoint
+                    self._batch_supported = False
+                    logger.warning(f"⚠️ RPC endpoint rejected a batch ({body.get('error')}), sending requests singly")
+            except Exception as e:
+                for call in batch:
+                    call.error = e
+                    call.done.set()
+                return
+
+        for call, response in zip(batch, responses):
+            try:
+                # Single requests, and any the batch answer left out, go on their own
+                call.response = response or self.provider.make_request(call.method, call.params)
+            except Exception as e:
+                call.error = e
+            call.done.set()
+
+    def _post(self, calls: List[Tuple[str, Any]]) -> Any:
+        if hasattr(self.provider, "make_batch_request"):
+            return self.provider.make_batch_request(calls)
+        if hasattr(self.provider, "get_request_kwargs"):
+            return post_batch(self.provider, calls)
+        return [self.provider.make_request(method, params) for method, params in calls]
+
+
+def gather(web3: Web3, *calls: Callable[[], Any]) -> List[Any]:
+    """Results of `calls`, in one JSON-RPC batch when `web3` sits on a BatchingProvider"""
+    provider = web3.provider
+    if isinstance(provider, BatchingProvider) and len(calls) > 1:
+        return provider.gather(*calls)
+    return [call() for call in calls]
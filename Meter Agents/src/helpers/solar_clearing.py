@@ -0,0 +1,220 @@
+import logging
+import re
+from dataclasses import dataclass
+from decimal import Decimal, ROUND_DOWN
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger("helpers.solar_clearing")
+
+PUBLIC_GRID = "PublicGrid"
+ALLOCATIONS = ("priority", "pro_rata")
+SOLAR_DECIMALS = 18
+DECISION_VERSION = 1
+DECISION_PATTERN = re.compile(
+    r"Wallet (0x[a-fA-F0-9]{40}) sends (\d+(?:\.\d+)?) SOLAR to Wallet (0x[a-fA-F0-9]{40}) on Sonic Network\."
+)
+
+
+@dataclass
+class Trade:
+    """A single settlement: `buyer` pays `amount` SOLAR to `seller` for `kwh` of energy."""
+    seller: str
+    buyer: str
+    kwh: float
+    amount: float
+
+    @property
+    def is_internal(self) -> bool:
+        return PUBLIC_GRID not in (self.seller, self.buyer)
+
+
+def format_amount(value: float, precision: int = 6) -> str:
+    """Render a token amount without trailing zeros (3 -> '3', 1.50 -> '1.5')"""
+    text = f"{value:.{precision}f}".rstrip("0").rstrip(".")
+    return text or "0"
+
+
+def to_wei(amount: Any, decimals: int = SOLAR_DECIMALS) -> int:
+    """Exact base-unit amount for a decimal token amount ('1.5' -> 1500000000000000000)"""
+    return int(Decimal(str(amount)).scaleb(decimals).to_integral_value(rounding=ROUND_DOWN))
+
+
+def build_decision(
+    tick: Any,
+    transfers: List[Tuple[str, str, Any]],
+    decimals: int = SOLAR_DECIMALS
+) -> Dict[str, Any]:
+    """Typed decision message: {"v", "tick", "transfers": [{"from", "to", "amount_wei"}]}.
+
+    `amount_wei` is a decimal string so 18-decimal values survive JSON
+    consumers that only have doubles.
+    """
+    return {
+        "v": DECISION_VERSION,
+        "tick": tick,
+        "transfers": [
+            {"from": sender, "to": recipient, "amount_wei": str(to_wei(amount, decimals))}
+            for sender, recipient, amount in transfers
+        ]
+    }
+
+
+def parse_decision_text(text: str) -> List[Tuple[str, str, str]]:
+    """(from, to, amount) triples from 'Wallet X sends N SOLAR to Wallet Y' prose, fractions included"""
+    return [(sender, recipient, amount) for sender, amount, recipient in DECISION_PATTERN.findall(text or "")]
+
+
+class ClearingEngine:
+    """Deterministic surplus/deficit clearing for a microgrid tick.
+
+    Houses with a surplus sell to houses with a deficit first; whatever is left
+    on either side is settled against the Public Grid. The buyer always pays.
+    """
+
+    def __init__(
+        self,
+        house_wallets: Dict[str, str],
+        price_per_kwh: float = 1.0,
+        allocation: str = "priority",
+        precision: int = 6
+    ):
+        if allocation not in ALLOCATIONS:
+            raise ValueError(f"Invalid allocation '{allocation}'. Must be one of: {', '.join(ALLOCATIONS)}")
+        if PUBLIC_GRID not in house_wallets:
+            raise ValueError(f"Wallet map must contain '{PUBLIC_GRID}'")
+
+        self.house_wallets = house_wallets
+        self.price_per_kwh = price_per_kwh
+        self.allocation = allocation
+        self.precision = precision
+        self._dust = 10 ** -precision
+
+    def wallet_for(self, house: Dict[str, Any]) -> Optional[str]:
+        """Resolve a house entry to its wallet, preferring an inline `wallet` field"""
+        return house.get("wallet") or self.house_wallets.get(house.get("house"))
+
+    def net_positions(self, houses: List[Dict[str, Any]]) -> Dict[str, float]:
+        """Net kWh per house (generation - consumption), skipping houses without a wallet"""
+        positions = {}
+        for house in houses:
+            name = house.get("house")
+            if not self.wallet_for(house):
+                logger.warning(f"⚠️ No wallet registered for house '{name}', skipping")
+                continue
+            net = float(house.get("generation", 0)) - float(house.get("consumption", 0))
+            positions[name] = positions.get(name, 0.0) + net
+        return positions
+
+    def clear(self, houses: List[Dict[str, Any]]) -> List[Trade]:
+        """Match surpluses against deficits, then settle the residual with the Public Grid"""
+        positions = self.net_positions(houses)
+        prices = {house.get("house"): house.get("price") for house in houses}
+
+        sellers = [(name, net) for name, net in positions.items() if net > self._dust]
+        buyers = [(name, -net) for name, net in positions.items() if net < -self._dust]
+
+        if self.allocation == "priority":
+            # Cheapest asks sell first, highest bids buy first, unpriced houses after every priced one;
+            # input order breaks ties
+            sellers.sort(key=lambda s: _price_key(prices.get(s[0]), ascending=True))
+            buyers.sort(key=lambda b: _price_key(prices.get(b[0]), ascending=False))
+            sell_volumes, buy_volumes = sellers, buyers
+        else:
+            sell_volumes, buy_volumes = self._pro_rata(sellers, buyers)
+
+        trades = self._match(sell_volumes, buy_volumes)
+
+        # Residuals go to the Public Grid
+        sold = {name: 0.0 for name, _ in sellers}
+        bought = {name: 0.0 for name, _ in buyers}
+        for trade in trades:
+            sold[trade.seller] += trade.kwh
+            bought[trade.buyer] += trade.kwh
+
+        for name, surplus in sellers:
+            self._append(trades, name, PUBLIC_GRID, surplus - sold[name])
+        for name, deficit in buyers:
+            self._append(trades, PUBLIC_GRID, name, deficit - bought[name])
+
+        return trades
+
+    def _pro_rata(
+        self,
+        sellers: List[Tuple[str, float]],
+        buyers: List[Tuple[str, float]]
+    ) -> Tuple[List[Tuple[str, float]], List[Tuple[str, float]]]:
+        """Scale the long side so every participant on it trades the same fraction internally"""
+        supply = sum(volume for _, volume in sellers)
+        demand = sum(volume for _, volume in buyers)
+        matched = min(supply, demand)
+        if matched <= 0:
+            return [], []
+        sell_ratio = matched / supply
+        buy_ratio = matched / demand
+        return (
+            [(name, volume * sell_ratio) for name, volume in sellers],
+            [(name, volume * buy_ratio) for name, volume in buyers]
+        )
+
+    def _match(self, sellers: List[Tuple[str, float]], buyers: List[Tuple[str, float]]) -> List[Trade]:
+        """Two-pointer fill: at most len(sellers) + len(buyers) - 1 trades"""
+        trades = []
+        i = j = 0
+        remaining_sell = sellers[0][1] if sellers else 0.0
+        remaining_buy = buyers[0][1] if buyers else 0.0
+
+        while i < len(sellers) and j < len(buyers):
+            kwh = min(remaining_sell, remaining_buy)
+            self._append(trades, sellers[i][0], buyers[j][0], kwh)
+            remaining_sell -= kwh
+            remaining_buy -= kwh
+            if remaining_sell <= self._dust:
+                i += 1
+                remaining_sell = sellers[i][1] if i < len(sellers) else 0.0
+            if remaining_buy <= self._dust:
+                j += 1
+                remaining_buy = buyers[j][1] if j < len(buyers) else 0.0
+        return trades
+
+    def _append(self, trades: List[Trade], seller: str, buyer: str, kwh: float) -> None:
+        kwh = round(kwh, self.precision)
+        if kwh <= self._dust:
+            return
+        amount = round(kwh * self.price_per_kwh, self.precision)
+        trades.append(Trade(seller=seller, buyer=buyer, kwh=kwh, amount=amount))
+
+    def _wallet_map(self, houses: Optional[List[Dict[str, Any]]]) -> Dict[str, str]:
+        wallets = dict(self.house_wallets)
+        for house in houses or []:
+            if house.get("wallet"):
+                wallets[house.get("house")] = house["wallet"]
+        return wallets
+
+    def transfers(
+        self,
+        trades: List[Trade],
+        houses: Optional[List[Dict[str, Any]]] = None
+    ) -> List[Tuple[str, str, float]]:
+        """(payer wallet, recipient wallet, amount) for each trade"""
+        wallets = self._wallet_map(houses)
+        return [(wallets[trade.buyer], wallets[trade.seller], trade.amount) for trade in trades]
+
+    def format_decision(self, trades: List[Trade], houses: Optional[List[Dict[str, Any]]] = None) -> str:
+        """Render trades in the 'Wallet X sends N SOLAR to Wallet Y on Sonic Network.' format"""
+        if not trades:
+            return "No transactions required: the microgrid is balanced."
+
+        lines = []
+        for sender, recipient, amount in self.transfers(trades, houses):
+            lines.append(
+                f"- Wallet {sender} sends {format_amount(amount, self.precision)} SOLAR "
+                f"to Wallet {recipient} on Sonic Network."
+            )
+        return "\n".join(lines)
+
+
+def _price_key(price: Optional[float], ascending: bool) -> Tuple[bool, float]:
+    """Sort key that puts houses without a price last on either side"""
+    if price is None:
+        return True, 0.0
+    return False, float(price) if ascending else -float(price)
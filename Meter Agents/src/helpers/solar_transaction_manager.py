@@ -1,12 +1,20 @@
 import logging
 import json
 import os
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
 from web3 import Web3
 from src.connections.sonic_connection import SonicConnection
+from src.constants.abi import DISPERSE_ABI
+from src.helpers.gas_oracle import get_gas_oracle
+from src.helpers.nonce_manager import get_nonce_manager
+from src.helpers.multicall import Multicall
+from src.helpers.token_metadata import token_metadata
 
 logger = logging.getLogger("solar_transaction_manager")
 
 SOLAR_TOKEN_ADDRESS = "0xA77884FE9B83C678689b98E877B2A2D5bAF53497"  # Ensure this is correct for testnet
+MAX_UINT256 = 2**256 - 1
 
 
 class SolarTransactionManager:
@@ -16,92 +24,228 @@ class SolarTransactionManager:
         self.sonic = SonicConnection({"network":
                                       "testnet"})  # ✅ Force Testnet Blaze
         self.web3 = self.sonic._web3  # ✅ Ensure Web3 connection is initialized
+        self.nonces = get_nonce_manager(self.web3)
+        self.gas = get_gas_oracle(self.web3)
+        self.gas_urgency = config.get("gas_urgency", "standard")
+        self.transfer_gas_limit = config.get("transfer_gas_limit", 100000)
+        self.multicall = Multicall(self.web3)
+        # Disperse-style multisend contract; without one, batches fall back to sequential transfers
+        self.multisend_address = config.get("multisend_address")
+        self.multisend_gas_per_recipient = config.get("multisend_gas_per_recipient", 40000)
+
+    def _load_wallet(self, participant_name):
+        wallet_path = os.path.expanduser(
+            f"~/.zerepy_keystore/{participant_name}_wallet.json")
+        if not os.path.exists(wallet_path):
+            raise FileNotFoundError(
+                f"Wallet file not found for {participant_name}")
+
+        with open(wallet_path, "r") as wallet_file:
+            return json.load(wallet_file)
 
     def get_token_balance(self, participant_name):
         """Fetch SOLAR Token balance of a participant"""
         try:
-            # Load wallet info
-            wallet_path = os.path.expanduser(
-                f"~/.zerepy_keystore/{participant_name}_wallet.json")
-            if not os.path.exists(wallet_path):
-                raise FileNotFoundError(
-                    f"Wallet file not found for {participant_name}")
-
-            with open(wallet_path, "r") as wallet_file:
-                wallet_data = json.load(wallet_file)
-                wallet_address = wallet_data["address"]
+            wallet_address = self._load_wallet(participant_name)["address"]
 
             logger.info(
                 f"🔍 Fetching balance for {participant_name} ({wallet_address}) on Sonic Testnet"
             )
 
-            # Connect to ERC-20 contract
-            contract = self.web3.eth.contract(
-                address=Web3.to_checksum_address(SOLAR_TOKEN_ADDRESS),
-                abi=self.sonic.ERC20_ABI)
-
-            # Call `balanceOf` function
-            balance_raw = contract.functions.balanceOf(wallet_address).call()
-            decimals = contract.functions.decimals().call()
-            balance = balance_raw / (10**decimals)
-
-            return balance
+            return self.get_token_balances([wallet_address])[wallet_address][SOLAR_TOKEN_ADDRESS]
 
         except Exception as e:
             logger.error(
                 f"❌ Error fetching token balance for {participant_name}: {e}")
             return None
 
+    def get_token_balances(
+            self,
+            wallet_addresses: List[str],
+            token_addresses: Optional[List[str]] = None
+    ) -> Dict[str, Dict[str, Optional[float]]]:
+        """Fetch balances for many wallets (and tokens) in one Multicall3 round trip.
+
+        Returns {wallet: {token: balance}}; a balance is None if its call reverted.
+        Token decimals come from the shared metadata cache; misses are fetched
+        in the same batch.
+        """
+        tokens = token_addresses or [SOLAR_TOKEN_ADDRESS]
+        chain_id = token_metadata.chain_id(self.web3)
+        known = {}
+        for token in tokens:
+            decimals = token_metadata.lookup(chain_id, token, "decimals")
+            if decimals is not None:
+                known[token] = decimals
+
+        try:
+            raw, fetched = self.multicall.erc20_balances(
+                wallet_addresses, tokens, known)
+        except Exception as e:
+            logger.warning(
+                f"⚠️ Multicall balance read failed ({e}), falling back to per-wallet calls"
+            )
+            raw, fetched = self._read_balances(wallet_addresses, tokens, known)
+
+        for token, decimals in fetched.items():
+            if decimals is not None:
+                token_metadata.put(chain_id, token, decimals=decimals)
+                known[token] = decimals
+
+        balances = {wallet: {} for wallet in wallet_addresses}
+        for (wallet, token), value in raw.items():
+            decimals = known.get(token)
+            balances[wallet][token] = (
+                None if value is None or decimals is None else value / (10**decimals))
+        return balances
+
+    def _read_balances(self, wallet_addresses, tokens, known_decimals):
+        """Sequential fallback for chains without Multicall3"""
+        raw, fetched = {}, {}
+        for token in tokens:
+            contract = self.web3.eth.contract(
+                address=Web3.to_checksum_address(token),
+                abi=self.sonic.ERC20_ABI)
+            if token not in known_decimals:
+                fetched[token] = contract.functions.decimals().call()
+            for wallet in wallet_addresses:
+                raw[(wallet, token)] = contract.functions.balanceOf(
+                    Web3.to_checksum_address(wallet)).call()
+        return raw, fetched
+
+    def _build_transfer(self, recipient_address, amount_wei):
+        contract = self.web3.eth.contract(
+            address=Web3.to_checksum_address(SOLAR_TOKEN_ADDRESS),
+            abi=self.sonic.ERC20_ABI)
+        return contract.functions.transfer(
+            Web3.to_checksum_address(recipient_address),
+            amount_wei).build_transaction({
+                "chainId":
+                token_metadata.chain_id(self.web3),
+                "gas":
+                self.transfer_gas_limit,
+                **self.gas.fees(self.gas_urgency),
+            })
+
+    def _sign_and_send(self, payer_data, txn):
+        def sign(nonce):
+            txn["nonce"] = nonce
+            return self.web3.eth.account.sign_transaction(
+                txn, private_key=payer_data["private_key"]).rawTransaction
+
+        return self.web3.to_hex(self.nonces.submit(payer_data["address"], sign))
+
     def execute_transaction(self, seller, buyer, amount):
         """Executes a token transfer from seller to buyer."""
         try:
-            seller_wallet_path = os.path.expanduser(
-                f"~/.zerepy_keystore/{seller}_wallet.json")
-            buyer_wallet_path = os.path.expanduser(
-                f"~/.zerepy_keystore/{buyer}_wallet.json")
-
-            if not os.path.exists(seller_wallet_path) or not os.path.exists(
-                    buyer_wallet_path):
-                raise FileNotFoundError(
-                    "❌ Wallet file not found for one or both participants")
-
-            with open(seller_wallet_path,
-                      "r") as seller_file, open(buyer_wallet_path,
-                                                "r") as buyer_file:
-                seller_data = json.load(seller_file)
-                buyer_data = json.load(buyer_file)
-                seller_address = seller_data["address"]
-                seller_private_key = seller_data["private_key"]
-                buyer_address = buyer_data["address"]
+            seller_data = self._load_wallet(seller)
+            buyer_address = self._load_wallet(buyer)["address"]
 
-            contract = self.web3.eth.contract(
-                address=Web3.to_checksum_address(SOLAR_TOKEN_ADDRESS),
-                abi=self.sonic.ERC20_ABI)
-            decimals = contract.functions.decimals().call()
+            decimals = token_metadata.decimals(self.web3, SOLAR_TOKEN_ADDRESS)
             amount_wei = int(amount * (10**decimals))
 
             # Build and send transaction
-            nonce = self.web3.eth.get_transaction_count(seller_address)
-            txn = contract.functions.transfer(
-                Web3.to_checksum_address(buyer_address),
-                amount_wei).build_transaction({
+            txn = self._build_transfer(buyer_address, amount_wei)
+            return self._sign_and_send(seller_data, txn)
+
+        except Exception as e:
+            logger.error(
+                f"❌ Error executing transaction from {seller} to {buyer}: {e}")
+            return None
+
+    def execute_batch(self, transfers: List[Tuple[str, str, float]]) -> Dict[str, List[str]]:
+        """Settle a clearing round of (payer, recipient, amount) transfers.
+
+        Transfers are grouped by payer and each group with more than one
+        recipient goes out as a single multisend transaction when
+        `multisend_address` is configured. Otherwise (or if the multisend
+        fails before it is broadcast) the group is broadcast as back-to-back
+        transfers. A multisend that fails after broadcast is not retried,
+        since the node may already have accepted it. Returns
+        {payer: [tx hashes]}, with None for payments that weren't sent.
+        """
+        by_payer = defaultdict(list)
+        for payer, recipient, amount in transfers:
+            by_payer[payer].append((recipient, amount))
+
+        results = {}
+        for payer, payments in by_payer.items():
+            sent = None
+            if self.multisend_address and len(payments) > 1:
+                sent = self._execute_multisend(payer, payments)
+            if sent is not None:
+                results[payer] = sent
+            else:
+                results[payer] = [
+                    self.execute_transaction(payer, recipient, amount)
+                    for recipient, amount in payments
+                ]
+        return results
+
+    def _execute_multisend(self, payer, payments: List[Tuple[str, float]]) -> Optional[List[Optional[str]]]:
+        """Pay every recipient of `payer` in one disperseToken call.
+
+        Returns None if the transaction was never broadcast (safe to fall back
+        to single transfers), otherwise [tx hash], or [None] when the broadcast
+        itself failed and its outcome is unknown.
+        """
+        try:
+            payer_data = self._load_wallet(payer)
+            decimals = token_metadata.decimals(self.web3, SOLAR_TOKEN_ADDRESS)
+            recipients = [
+                Web3.to_checksum_address(self._load_wallet(recipient)["address"])
+                for recipient, _ in payments
+            ]
+            values = [int(amount * (10**decimals)) for _, amount in payments]
+            multisend = Web3.to_checksum_address(self.multisend_address)
+
+            self._ensure_allowance(payer_data, multisend, sum(values))
+
+            contract = self.web3.eth.contract(address=multisend, abi=DISPERSE_ABI)
+            txn = contract.functions.disperseToken(
+                Web3.to_checksum_address(SOLAR_TOKEN_ADDRESS),
+                recipients,
+                values).build_transaction({
+                    "from":
+                    payer_data["address"],
                     "chainId":
-                    self.web3.eth.chain_id,
+                    token_metadata.chain_id(self.web3),
                     "gas":
-                    100000,
-                    "gasPrice":
-                    self.web3.to_wei("5", "gwei"),
-                    "nonce":
-                    nonce,
+                    50000 + self.multisend_gas_per_recipient * len(recipients),
+                    **self.gas.fees(self.gas_urgency),
                 })
 
-            signed_txn = self.web3.eth.account.sign_transaction(
-                txn, private_key=seller_private_key)
-            txn_hash = self.web3.eth.send_raw_transaction(
-                signed_txn.rawTransaction)
-            return self.web3.to_hex(txn_hash)
+        except Exception as e:
+            logger.warning(
+                f"⚠️ Multisend for {payer} failed ({e}), falling back to sequential transfers")
+            return None
 
+        try:
+            tx_hash = self._sign_and_send(payer_data, txn)
         except Exception as e:
+            # A timeout or dropped connection may hide an accepted broadcast; paying again could pay twice
             logger.error(
-                f"❌ Error executing transaction from {seller} to {buyer}: {e}")
-            return None
+                f"❌ Multisend broadcast for {payer} failed ({e}), not retrying to avoid paying twice")
+            return [None]
+        logger.info(
+            f"📦 {payer} paid {len(recipients)} recipients in one multisend: {tx_hash}")
+        return [tx_hash]
+
+    def _ensure_allowance(self, payer_data, spender, amount_wei):
+        """Approve the multisend contract once (unlimited) so later rounds skip this step"""
+        contract = self.web3.eth.contract(
+            address=Web3.to_checksum_address(SOLAR_TOKEN_ADDRESS),
+            abi=self.sonic.ERC20_ABI)
+        allowance = contract.functions.allowance(
+            Web3.to_checksum_address(payer_data["address"]), spender).call()
+        if allowance >= amount_wei:
+            return
+
+        txn = contract.functions.approve(spender, MAX_UINT256).build_transaction({
+            "from": payer_data["address"],
+            "chainId": token_metadata.chain_id(self.web3),
+            "gas": self.transfer_gas_limit,
+            **self.gas.fees(self.gas_urgency),
+        })
+        tx_hash = self._sign_and_send(payer_data, txn)
+        logger.info(f"🔓 Approved multisend contract for {payer_data['address']}: {tx_hash}")
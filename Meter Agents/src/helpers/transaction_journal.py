@@ -0,0 +1,177 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+
+class TransactionJournal:
+    """Append-only JSON Lines journal of transfer results.
+
+    Records are appended to numbered segments (`<base>.000001.jsonl`, ...)
+    and a new segment is started once the active one reaches `max_bytes`.
+    Writes are flushed to the OS immediately but fsync'ed in batches: every
+    `fsync_every` records or `fsync_interval` seconds, whichever comes first
+    (a background timer covers quiet periods), and on close. A sidecar
+    `<base>.index` maps txHash -> (segment, offset) so a lookup reads a
+    single line instead of the whole history.
+    """
+
+    def __init__(
+        self,
+        base_path: str,
+        max_bytes: int = 64 * 1024 * 1024,
+        fsync_every: int = 32,
+        fsync_interval: float = 1.0
+    ):
+        self.base_path = base_path
+        self.max_bytes = max_bytes
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+
+        self._lock = threading.Lock()
+        self._index: Dict[str, Tuple[int, int]] = {}
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+        os.makedirs(os.path.dirname(os.path.abspath(base_path)), exist_ok=True)
+        self._load_index()
+        segments = self.segments()
+        self._segment = segments[-1][0] if segments else 1
+        self._file = open(self._segment_path(self._segment), "a", encoding="utf-8")
+        self._index_file = open(f"{base_path}.index", "a", encoding="utf-8")
+        atexit.register(self.close)
+        if fsync_interval:
+            threading.Thread(target=self._sync_loop, daemon=True).start()
+
+    def _sync_loop(self) -> None:
+        # The last records before a lull would otherwise wait for the next append or close
+        while True:
+            time.sleep(self.fsync_interval)
+            with self._lock:
+                if self._file.closed:
+                    return
+                if self._pending and time.monotonic() - self._last_sync >= self.fsync_interval:
+                    self._sync()
+
+    def _segment_path(self, number: int) -> str:
+        return f"{self.base_path}.{number:06d}.jsonl"
+
+    def segments(self) -> list:
+        """(number, path) for every segment on disk, oldest first"""
+        found = []
+        for path in glob.glob(f"{glob.escape(self.base_path)}.*.jsonl"):
+            number = path[len(self.base_path) + 1:-len(".jsonl")]
+            if number.isdigit():
+                found.append((int(number), path))
+        return sorted(found)
+
+    def _load_index(self) -> None:
+        try:
+            with open(f"{self.base_path}.index", "r", encoding="utf-8") as f:
+                for line in f:
+                    parts = line.rstrip("\n").split("\t")
+                    if len(parts) == 3:
+                        self._index[parts[0]] = (int(parts[1]), int(parts[2]))
+        except FileNotFoundError:
+            pass
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """Write one record; cost is independent of the journal size"""
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._file.tell() >= self.max_bytes:
+                self._rotate()
+            offset = self._file.tell()
+            self._file.write(line)
+            self._file.flush()
+
+            tx_hash = record.get("txHash")
+            if tx_hash:
+                self._index[tx_hash] = (self._segment, offset)
+                self._index_file.write(f"{tx_hash}\t{self._segment}\t{offset}\n")
+                self._index_file.flush()
+
+            self._pending += 1
+            if self._pending >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+
+    def _sync(self) -> None:
+        os.fsync(self._file.fileno())
+        os.fsync(self._index_file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def _rotate(self) -> None:
+        self._sync()
+        self._file.close()
+        self._segment += 1
+        self._file = open(self._segment_path(self._segment), "a", encoding="utf-8")
+
+    def sync(self) -> None:
+        """Force outstanding records to disk"""
+        with self._lock:
+            if self._pending:
+                self._sync()
+
+    def get(self, tx_hash: str) -> Optional[Dict[str, Any]]:
+        """Latest record for `tx_hash`, or None"""
+        with self._lock:
+            location = self._index.get(tx_hash)
+        if location is None:
+            return None
+        segment, offset = location
+        try:
+            with open(self._segment_path(segment), "r", encoding="utf-8") as f:
+                f.seek(offset)
+                return json.loads(f.readline())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Stream every record, oldest first, one line at a time"""
+        for _, path in self.segments():
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn final line after a crash; everything before it is intact
+                        continue
+
+    def import_legacy(self, json_path: str, where: Optional[Callable[[Dict[str, Any]], bool]] = None) -> int:
+        """Copy records (those matching `where`, if given) from an old whole-file JSON array log.
+
+        The old file is left in place, since other agents may still need to
+        import their own records from it. A `<base>.legacy` marker keeps this
+        journal from importing it twice.
+        """
+        marker = f"{self.base_path}.legacy"
+        if os.path.exists(marker):
+            return 0
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                records = json.load(f)
+        except FileNotFoundError:
+            records = []
+        except json.JSONDecodeError:
+            return 0
+        imported = [record for record in records if where is None or where(record)]
+        for record in imported:
+            self.append(record)
+        self.sync()
+        with open(marker, "w", encoding="utf-8") as f:
+            f.write(f"{os.path.abspath(json_path)}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        return len(imported)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file.closed:
+                return
+            self._sync()
+            self._file.close()
+            self._index_file.close()
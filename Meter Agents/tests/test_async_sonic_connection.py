@@ -0,0 +1,64 @@
+import asyncio
+import json
+import socket
+
+from aiohttp import web
+
+from src.connections.async_sonic_connection import AsyncSonicConnection
+from src.helpers.rpc_pool import PooledHTTPProvider
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def bare_connection(rpc_urls):
+    """A connection on a stubbed sync client, without the Sonic network checks"""
+    connection = AsyncSonicConnection.__new__(AsyncSonicConnection)
+    connection.__dict__.update(
+        rpc_urls=rpc_urls, max_connections=4, request_timeout=5,
+        _web3=type("SyncWeb3", (), {"provider": PooledHTTPProvider(rpc_urls, health_interval=0)})(),
+        _async_web3=None, _session=None, _session_loop=None, _client_lock=None, _client_lock_loop=None)
+    return connection
+
+
+async def serve_block_number(port, requests):
+    async def rpc(request):
+        body = json.loads(await request.read())
+        requests.append(body["method"])
+        return web.json_response({"jsonrpc": "2.0", "id": body["id"], "result": "0x2a"})
+
+    app = web.Application()
+    app.router.add_post("/", rpc)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+def test_each_event_loop_gets_a_client_on_the_connection_session():
+    port = free_port()
+    # The first endpoint refuses connections, so every request fails over to the second
+    connection = bare_connection([f"http://127.0.0.1:{free_port()}", f"http://127.0.0.1:{port}"])
+    requests = []
+
+    async def run_once():
+        runner = await serve_block_number(port, requests)
+        try:
+            web3 = await connection._get_client()
+            session = connection._session
+            assert web3.provider.session is session
+            block = await web3.eth.block_number
+            await connection.close()
+            return block, session
+        finally:
+            await runner.cleanup()
+
+    (first, first_session), (second, second_session) = asyncio.run(run_once()), asyncio.run(run_once())
+
+    assert first == second == 42
+    assert requests == ["eth_blockNumber", "eth_blockNumber"]
+    assert first_session is not second_session
+    assert first_session.closed and second_session.closed
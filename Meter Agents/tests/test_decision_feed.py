@@ -0,0 +1,100 @@
+import asyncio
+import itertools
+import json
+import socket
+import time
+
+import websockets
+
+from src.connections.solar_metrics_connection import SolarMetricsConnection
+from src.helpers.decision_feed import DecisionFeed
+from src.helpers.llm_client import LatencyRecorder
+from src.helpers.solar_clearing import PUBLIC_GRID, ClearingEngine
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_resume_sends_backlog_before_decisions_published_meanwhile():
+    port = free_port()
+    feed = DecisionFeed(host="127.0.0.1", port=port)
+    feed.start()
+    for tick in (1, 2):
+        feed.publish({"ai_decision": f"tick {tick}"})
+
+    async def client():
+        for _ in range(50):
+            try:
+                websocket = await websockets.connect(f"ws://127.0.0.1:{port}")
+                break
+            except OSError:
+                await asyncio.sleep(0.05)
+        try:
+            await asyncio.sleep(0.1)
+            # Live decisions published before and while the resume is handled
+            feed.publish({"ai_decision": "tick 3"})
+            feed.publish({"ai_decision": "tick 4"})
+            await asyncio.sleep(0.1)
+            await websocket.send(json.dumps({"subscribe": ["all"], "resume": {"epoch": feed.epoch, "seq": 1}}))
+            feed.publish({"ai_decision": "tick 5"})
+
+            seqs = []
+            deadline = time.monotonic() + 5
+            while len(set(seqs)) < 4 and time.monotonic() < deadline:
+                message = json.loads(await asyncio.wait_for(websocket.recv(), 5))
+                if "seq" in message and "subscribed" not in message:
+                    seqs.append(message["seq"])
+            return seqs
+        finally:
+            await websocket.close()
+
+    seqs = asyncio.run(client())
+
+    # An agent drops anything at or below the last seq it saw, so nothing may arrive out of order
+    assert seqs == [2, 3, 4, 5]
+
+
+def test_feeder_subscribers_receive_streamed_llm_decisions():
+    port = free_port()
+    seller, buyer, other = ("0x" + digits * 20 for digits in ("a1", "b2", "c3"))
+    connection = SolarMetricsConnection.__new__(SolarMetricsConnection)
+    connection.__dict__.update(
+        feed=DecisionFeed(host="127.0.0.1", port=port),
+        clearing_engine=ClearingEngine({PUBLIC_GRID: other}),
+        decision_engine="llm", llm_stream=True, llm_latency=LatencyRecorder(),
+        decision_cache=None, netting=None, token_decimals=18, _ticks=itertools.count(1))
+    # The model streams one finished line, then an unterminated one left for the closing message
+    connection._llm_deltas = lambda data: iter([
+        f"- Wallet {buyer} sends 1.5 SOLAR to Wallet {seller} on Sonic Network.\n- Wallet {seller} ",
+        f"sends 0.5 SOLAR to Wallet {other} on Sonic Network.",
+    ])
+    connection.feed.start()
+    snapshot = json.dumps({"houses": [
+        {"house": "h1", "wallet": seller, "feeder": 7},
+        {"house": "h2", "wallet": buyer, "feeder": 8},
+    ]})
+
+    async def client():
+        for _ in range(50):
+            try:
+                websocket = await websockets.connect(f"ws://127.0.0.1:{port}")
+                break
+            except OSError:
+                await asyncio.sleep(0.05)
+        try:
+            await websocket.send(json.dumps({"subscribe": ["feeder:7"]}))
+            assert "subscribed" in json.loads(await asyncio.wait_for(websocket.recv(), 5))
+            await asyncio.to_thread(connection.process_energy_data, snapshot)
+            return [json.loads(await asyncio.wait_for(websocket.recv(), 5)) for _ in range(2)]
+        finally:
+            await websocket.close()
+
+    streamed, closing = asyncio.run(client())
+
+    assert streamed["decision"]["complete"] is False
+    assert [t["from"] for t in streamed["decision"]["transfers"]] == [buyer]
+    assert closing["decision"]["complete"] is True
+    assert [(t["from"], t["to"]) for t in closing["decision"]["transfers"]] == [(seller, other)]
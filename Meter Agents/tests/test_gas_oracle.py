@@ -0,0 +1,106 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.helpers.gas_oracle import GasOracle, get_gas_oracle
+
+GWEI = 10**9
+
+
+class Eth:
+    def __init__(self, history=None, gas_price=10 * GWEI):
+        self.history = history
+        self.gas_price = gas_price
+        self.fee_history_calls = 0
+
+    def fee_history(self, blocks, newest, percentiles):
+        self.fee_history_calls += 1
+        if self.history is None:
+            raise ValueError("the method eth_feeHistory does not exist")
+        return self.history
+
+
+def stub_web3(eth, endpoint_uri=None):
+    return SimpleNamespace(eth=eth, provider=SimpleNamespace(endpoint_uri=endpoint_uri))
+
+
+HISTORY = {
+    "baseFeePerGas": [90 * GWEI, 95 * GWEI, 100 * GWEI],
+    # 25th, 50th and 90th percentile tips of the last blocks; the empty block is ignored
+    "reward": [[1 * GWEI, 2 * GWEI, 5 * GWEI], [], [3 * GWEI, 4 * GWEI, 9 * GWEI], [2 * GWEI, 3 * GWEI, 7 * GWEI]],
+}
+
+
+def test_tiers_pay_the_median_of_their_percentile():
+    oracle = GasOracle(stub_web3(Eth(HISTORY)))
+
+    assert oracle.supports_eip1559
+    assert oracle.fees("slow") == {"maxFeePerGas": 202 * GWEI, "maxPriorityFeePerGas": 2 * GWEI}
+    assert oracle.fees("standard") == {"maxFeePerGas": 203 * GWEI, "maxPriorityFeePerGas": 3 * GWEI}
+    assert oracle.fees("fast") == {"maxFeePerGas": 207 * GWEI, "maxPriorityFeePerGas": 7 * GWEI}
+    with pytest.raises(ValueError):
+        oracle.fees("urgent")
+
+
+def test_min_priority_fee_and_max_fee_cap():
+    oracle = GasOracle(stub_web3(Eth(HISTORY)), min_priority_fee=4 * GWEI, max_fee_cap=150 * GWEI)
+
+    assert oracle.fees("slow") == {"maxFeePerGas": 150 * GWEI, "maxPriorityFeePerGas": 4 * GWEI}
+    assert oracle.fees("fast") == {"maxFeePerGas": 150 * GWEI, "maxPriorityFeePerGas": 7 * GWEI}
+    # The tip never exceeds the capped max fee
+    capped = GasOracle(stub_web3(Eth(HISTORY)), max_fee_cap=5 * GWEI)
+    assert capped.fees("fast") == {"maxFeePerGas": 5 * GWEI, "maxPriorityFeePerGas": 5 * GWEI}
+
+
+def test_chains_without_fee_history_get_legacy_gas_prices():
+    oracle = GasOracle(stub_web3(Eth(history=None)))
+
+    assert not oracle.supports_eip1559
+    assert oracle.fees("slow") == {"gasPrice": 10 * GWEI}
+    assert oracle.fees("standard") == {"gasPrice": 12 * GWEI}
+    assert oracle.fees("fast") == {"gasPrice": int(12.5 * GWEI)}
+    assert oracle.gas_price("standard") == 12 * GWEI
+
+
+def test_quotes_are_cached_between_refreshes():
+    eth = Eth(HISTORY)
+    oracle = GasOracle(stub_web3(eth), refresh_interval=60)
+
+    for urgency in ("slow", "standard", "fast"):
+        oracle.fees(urgency)
+    assert eth.fee_history_calls == 1
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_refresh():
+    class AsyncEth:
+        def __init__(self):
+            self.release = asyncio.Event()
+
+        async def fee_history(self, blocks, newest, percentiles):
+            await self.release.wait()
+            return HISTORY
+
+    async def main():
+        eth = AsyncEth()
+        oracle = GasOracle(stub_web3(Eth(HISTORY)))
+        web3 = SimpleNamespace(eth=eth)
+        first = asyncio.ensure_future(oracle.fees_async(web3))
+        second = asyncio.ensure_future(oracle.fees_async(web3, "fast"))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        eth.release.set()
+        return await asyncio.wait_for(second, 5)
+
+    assert asyncio.run(main()) == {"maxFeePerGas": 207 * GWEI, "maxPriorityFeePerGas": 7 * GWEI}
+
+
+def test_shared_oracle_rejects_different_options():
+    web3 = stub_web3(Eth(HISTORY), endpoint_uri="http://gas-oracle-test")
+    oracle = get_gas_oracle(web3, max_fee_cap=150 * GWEI)
+
+    assert get_gas_oracle(web3) is oracle
+    assert get_gas_oracle(web3, max_fee_cap=150 * GWEI) is oracle
+    with pytest.raises(ValueError):
+        get_gas_oracle(web3, max_fee_cap=200 * GWEI)
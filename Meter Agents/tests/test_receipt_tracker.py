@@ -0,0 +1,80 @@
+from types import SimpleNamespace
+
+from src.helpers.receipt_tracker import ReceiptTracker
+
+TX_A, TX_B = "0x" + "aa" * 32, "0x" + "bb" * 32
+
+
+def receipt(tx_hash, block):
+    return {"transactionHash": tx_hash, "blockNumber": hex(block), "status": "0x1", "gasUsed": "0x5208",
+            "cumulativeGasUsed": "0x5208", "logs": [], "transactionIndex": "0x0"}
+
+
+class LaggingNode:
+    """Serves block 11 with both transactions, but only A's receipt at first"""
+
+    def __init__(self):
+        self.blocks = {10: {"number": "0xa", "transactions": []},
+                       11: {"number": "0xb", "transactions": [TX_A, TX_B]}}
+        self.receipts = {11: [receipt(TX_A, 11)]}
+        self.errors = {}
+
+    def make_request(self, method, params):
+        if method in self.errors:
+            return {"error": self.errors[method]}
+        if method == "eth_getBlockByNumber":
+            number = max(self.blocks) if params[0] == "latest" else int(params[0], 16)
+            return {"result": self.blocks.get(number)}
+        if method == "eth_getBlockReceipts":
+            return {"result": self.receipts.get(int(params[0], 16), [])}
+        raise AssertionError(method)
+
+
+def tracker_for(node):
+    tracker = ReceiptTracker(SimpleNamespace(provider=node), backfill=0)
+    tracker._thread = object()  # drive the follower by hand
+    return tracker
+
+
+def test_block_is_rescanned_until_every_tracked_receipt_resolves():
+    node = LaggingNode()
+    tracker = tracker_for(node)
+    futures = [tracker.track(TX_A), tracker.track(TX_B)]
+    tracker._last_block = 10
+
+    tracker._follow()
+    assert futures[0].done() and not futures[1].done()
+    assert tracker._last_block == 10
+
+    node.receipts[11].append(receipt(TX_B, 11))
+    tracker._follow()
+    assert futures[1].result(0)["status"] == 1
+    assert tracker._last_block == 11
+
+
+def test_follower_moves_past_a_block_that_never_completes():
+    node = LaggingNode()
+    node.blocks[12] = {"number": "0xc", "transactions": []}
+    tracker = tracker_for(node)
+    tracker.track(TX_B)
+    tracker._last_block = 10
+
+    for _ in range(tracker.block_retries):
+        tracker._follow()
+        assert tracker._last_block == 10
+    tracker._follow()
+    # TX_B is left to the per-hash lookup when it expires
+    assert tracker._last_block == 12
+    assert TX_B in tracker._pending
+
+
+def test_only_method_not_found_disables_block_receipts():
+    node = LaggingNode()
+    tracker = tracker_for(node)
+    node.errors["eth_getBlockReceipts"] = {"code": -32000, "message": "header not found"}
+    tracker._receipts(node.blocks[10], set())
+    assert tracker._block_receipts
+
+    node.errors["eth_getBlockReceipts"] = {"code": -32601, "message": "the method eth_getBlockReceipts does not exist"}
+    tracker._receipts(node.blocks[10], set())
+    assert not tracker._block_receipts
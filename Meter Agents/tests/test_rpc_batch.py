@@ -0,0 +1,81 @@
+import time
+
+from web3 import Web3
+from web3.middleware import http_retry_request_middleware
+
+from src.helpers.rpc_batch import BatchingProvider
+
+
+class Node:
+    """Stands in for the wrapped provider; answers single requests with the method name"""
+    middlewares = ()
+
+    def __init__(self):
+        self.single = []
+
+    def make_request(self, method, params):
+        self.single.append(method)
+        return {"jsonrpc": "2.0", "id": 1, "result": method}
+
+
+def batching(node, answer, **options):
+    provider = BatchingProvider(node, **options)
+    provider.batches = []
+
+    def post(calls):
+        provider.batches.append([method for method, _ in calls])
+        return answer(calls)
+
+    provider._post = post
+    return provider
+
+
+def test_each_caller_gets_its_own_response_from_a_batch():
+    node = Node()
+    provider = batching(node, lambda calls: [
+        {"jsonrpc": "2.0", "id": i, "error": {"code": -32000, "message": "execution reverted"}}
+        if method == "eth_call" else {"jsonrpc": "2.0", "id": i, "result": "0x1"}
+        for i, (method, _) in enumerate(calls)])
+
+    chain_id, call = provider.gather(lambda: provider.make_request("eth_chainId", []),
+                                     lambda: provider.make_request("eth_call", []))
+
+    assert chain_id["result"] == "0x1" and "error" not in chain_id
+    assert call["error"]["message"] == "execution reverted"
+    assert node.single == []
+
+
+def test_gather_flushes_without_waiting_for_the_window():
+    node = Node()
+    provider = batching(node, lambda calls: [{"jsonrpc": "2.0", "id": i, "result": hex(i)}
+                                             for i in range(len(calls))], window=30, group_timeout=30)
+
+    start = time.monotonic()
+    results = provider.gather(*(lambda method=method: provider.make_request(method, [])
+                                for method in ("eth_chainId", "eth_gasPrice", "eth_blockNumber")))
+
+    assert time.monotonic() - start < 5
+    assert len(provider.batches) == 1 and sorted(provider.batches[0]) == ["eth_blockNumber", "eth_chainId", "eth_gasPrice"]
+    assert sorted(result["result"] for result in results) == ["0x0", "0x1", "0x2"]
+
+
+def test_rejected_batch_falls_back_to_single_requests():
+    node = Node()
+    provider = batching(node, lambda calls: {"jsonrpc": "2.0", "id": None,
+                                             "error": {"code": -32600, "message": "batch requests disabled"}})
+
+    results = provider.gather(lambda: provider.make_request("eth_chainId", []),
+                              lambda: provider.make_request("eth_gasPrice", []))
+    assert [result["result"] for result in results] == ["eth_chainId", "eth_gasPrice"]
+
+    # Later requests skip batching altogether
+    provider.gather(lambda: provider.make_request("eth_blockNumber", []),
+                    lambda: provider.make_request("eth_chainId", []))
+    assert len(provider.batches) == 1
+    assert sorted(node.single) == ["eth_blockNumber", "eth_chainId", "eth_chainId", "eth_gasPrice"]
+
+
+def test_wrapping_an_http_provider_keeps_its_retry_middleware():
+    provider = BatchingProvider(Web3.HTTPProvider("http://127.0.0.1:8545"))
+
+    assert http_retry_request_middleware in provider.middlewares
@@ -0,0 +1,99 @@
+from web3 import Web3
+
+from src.helpers import rpc_pool
+from src.helpers.rpc_pool import PooledHTTPProvider
+
+CALLS = [("eth_chainId", []), ("eth_blockNumber", [])]
+RAW_TX = "0x02f86b"
+
+
+class Node:
+    """Stands in for one endpoint's HTTPProvider, answering from `responses` or raising `error`"""
+
+    def __init__(self, name, sent):
+        self.name = name
+        self.sent = sent
+        self.error = None
+        self.responses = {}
+
+    def make_request(self, method, params):
+        self.sent.append((self.name, method))
+        if self.error:
+            raise self.error
+        return self.responses.get(method, {"jsonrpc": "2.0", "id": 1, "result": self.name})
+
+
+def stub_pool(*names):
+    pool = PooledHTTPProvider([f"http://{name}" for name in names], health_interval=0)
+    sent = []
+    for endpoint, name in zip(pool.endpoints, names):
+        endpoint.provider = Node(name, sent)
+    return pool, sent
+
+
+def test_reads_go_to_the_fastest_healthy_endpoint():
+    pool, _ = stub_pool("slow", "fast", "lagging")
+    for endpoint, latency, block in zip(pool.endpoints, (0.3, 0.1, 0.01), (100, 100, 90)):
+        endpoint.latency, endpoint.block = latency, block
+
+    assert pool.make_request("eth_call", [])["result"] == "fast"
+    pool.endpoints[1].fail(pool.cooldown, pool.max_cooldown)
+    assert pool.make_request("eth_call", [])["result"] == "slow"
+
+
+def test_writes_stay_pinned_and_fail_over_together():
+    pool, sent = stub_pool("a", "b")
+    pool.endpoints[1].latency = 0.01
+
+    pool.make_request("eth_getTransactionCount", ["0x0", "pending"])
+    pool.make_request("eth_sendRawTransaction", [RAW_TX])
+    assert [name for name, _ in sent] == ["a", "a"]
+
+    pool.endpoints[0].provider.error = ConnectionError("connection reset")
+    assert pool.make_request("eth_sendRawTransaction", [RAW_TX])["result"] == "b"
+    pool.endpoints[0].provider.error = None
+    # a is cooling down, so the nonce read follows the broadcasts to b
+    assert pool.make_request("eth_getTransactionCount", ["0x0", "pending"])["result"] == "b"
+
+
+def test_already_known_after_failover_counts_as_sent():
+    pool, _ = stub_pool("a", "b")
+    pool.endpoints[0].provider.error = ConnectionError("read timed out")
+    pool.endpoints[1].provider.responses["eth_sendRawTransaction"] = {
+        "jsonrpc": "2.0", "id": 1, "error": {"code": -32000, "message": "already known"}}
+
+    response = pool.make_request("eth_sendRawTransaction", [RAW_TX])
+    assert response["result"] == Web3.to_hex(Web3.keccak(hexstr=RAW_TX))
+
+    # Straight from the pinned node it is the caller's own duplicate, and stays an error
+    pool, _ = stub_pool("a")
+    pool.endpoints[0].provider.responses["eth_sendRawTransaction"] = {
+        "jsonrpc": "2.0", "id": 1, "error": {"code": -32000, "message": "already known"}}
+    assert "error" in pool.make_request("eth_sendRawTransaction", [RAW_TX])
+
+
+def test_batch_fails_over_from_an_endpoint_that_rejects_batches(monkeypatch):
+    pool = PooledHTTPProvider(["http://refuses", "http://accepts"], health_interval=0)
+    sent = []
+
+    def post_batch(provider, calls):
+        sent.append(provider.endpoint_uri)
+        if provider.endpoint_uri == "http://refuses":
+            return {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "batch requests disabled"}}
+        return [{"jsonrpc": "2.0", "id": i, "result": hex(i)} for i, _ in enumerate(calls)]
+
+    monkeypatch.setattr(rpc_pool, "post_batch", post_batch)
+
+    assert pool.make_batch_request(CALLS)[1]["result"] == "0x1"
+    assert pool.make_batch_request(CALLS)[0]["result"] == "0x0"
+    # The refusing node was asked once; it still serves single requests
+    assert sent == ["http://refuses", "http://accepts", "http://accepts"]
+    assert [endpoint["batches"] for endpoint in pool.status()] == [False, True]
+
+
+def test_calls_go_singly_when_no_endpoint_takes_batches(monkeypatch):
+    pool = PooledHTTPProvider(["http://a", "http://b"], health_interval=0)
+    monkeypatch.setattr(rpc_pool, "post_batch", lambda provider, calls: {"error": "not supported"})
+
+    assert pool.make_batch_request(CALLS) == [None, None]
+    assert pool.make_batch_request(CALLS) == [None, None]
@@ -0,0 +1,30 @@
+from src.helpers.settlement_netting import NettingLedger
+
+A, B, C = "0xa", "0xb", "0xc"
+
+
+class FlakyManager:
+    def __init__(self, failing):
+        self.failing = failing
+        self.batches = []
+
+    def execute_batch(self, transfers):
+        self.batches.append(list(transfers))
+        results = {}
+        for payer, recipient, _ in transfers:
+            results.setdefault(payer, []).append(None if recipient in self.failing else f"0x{len(self.batches)}")
+        return results
+
+
+def test_failed_transfers_are_settled_in_the_next_window():
+    manager = FlakyManager(failing={C})
+    ledger = NettingLedger(manager, window_rounds=1)
+
+    ledger.record([(A, B, 2.0), (A, C, 1.0)])
+    assert ledger.net_obligations() == [(A, C, 1.0)]
+
+    manager.failing = set()
+    ledger.record([(A, B, 0.5)])
+    assert sorted(manager.batches[-1]) == [(A, B, 0.5), (A, C, 1.0)]
+    assert ledger.net_obligations() == []
+    ledger.close()
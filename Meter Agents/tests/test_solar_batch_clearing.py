@@ -0,0 +1,40 @@
+import numpy as np
+
+from src.helpers.solar_batch_clearing import clear_batch
+
+
+def assert_consistent(result, tolerance):
+    ticks, sellers, buyers = result.trade_tick, result.trade_seller, result.trade_buyer
+    # Every trade pairs a house with surplus at that tick and a house with deficit
+    assert (result.net[sellers, ticks] > 0).all()
+    assert (result.net[buyers, ticks] < 0).all()
+
+    sold = np.zeros(result.net.shape)
+    bought = np.zeros(result.net.shape)
+    np.add.at(sold, (sellers, ticks), result.trade_kwh)
+    np.add.at(bought, (buyers, ticks), result.trade_kwh)
+    np.testing.assert_allclose(sold, result.sold_internal, atol=tolerance)
+    np.testing.assert_allclose(bought, result.bought_internal, atol=tolerance)
+
+
+def test_float32_inputs_pair_houses_within_their_own_tick():
+    rng = np.random.default_rng(0)
+    generation = rng.uniform(0, 6, size=(10_000, 64)).astype(np.float32)
+    consumption = rng.uniform(0, 8, size=(10_000, 64)).astype(np.float32)
+
+    result = clear_batch(generation, consumption)
+
+    assert result.trade_kwh.dtype == np.float32
+    assert_consistent(result, tolerance=1e-4)
+
+
+def test_pro_rata_float32_matches_float64():
+    rng = np.random.default_rng(1)
+    generation = rng.uniform(0, 6, size=(2_000, 16))
+    consumption = rng.uniform(0, 8, size=(2_000, 16))
+
+    single = clear_batch(generation.astype(np.float32), consumption.astype(np.float32), allocation="pro_rata")
+    double = clear_batch(generation, consumption, allocation="pro_rata")
+
+    assert_consistent(single, tolerance=1e-4)
+    np.testing.assert_allclose(single.grid_import, double.grid_import, atol=1e-4)
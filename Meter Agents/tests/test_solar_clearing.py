@@ -0,0 +1,71 @@
+from src.helpers.solar_clearing import ClearingEngine, build_decision, parse_decision_text, to_wei
+
+SELLER = "0x" + "a1" * 20
+BUYER = "0x" + "b2" * 20
+LLM_TEXT = (
+    f"- Wallet {BUYER} sends 1.5 SOLAR to Wallet {SELLER} on Sonic Network.\n"
+    f"- Wallet {SELLER} sends 3 SOLAR to Wallet {BUYER} on Sonic Network.\n"
+)
+
+
+def test_parse_decision_text_returns_from_to_amount():
+    assert parse_decision_text(LLM_TEXT) == [(BUYER, SELLER, "1.5"), (SELLER, BUYER, "3")]
+
+
+def test_llm_text_round_trips_through_build_decision():
+    decision = build_decision(7, parse_decision_text(LLM_TEXT))
+
+    assert decision["tick"] == 7
+    assert decision["transfers"] == [
+        {"from": BUYER, "to": SELLER, "amount_wei": str(to_wei("1.5"))},
+        {"from": SELLER, "to": BUYER, "amount_wei": "3000000000000000000"},
+    ]
+
+
+WALLETS = {"PublicGrid": "0x" + "00" * 20, **{name: "0x" + f"{i:02x}" * 20 for i, name in enumerate("abcde", 1)}}
+
+
+def house(name, generation=0.0, consumption=0.0, price=None):
+    entry = {"house": name, "generation": generation, "consumption": consumption}
+    if price is not None:
+        entry["price"] = price
+    return entry
+
+
+def test_priority_fills_best_prices_first_and_unpriced_houses_last():
+    engine = ClearingEngine(WALLETS, allocation="priority")
+    houses = [
+        house("a", generation=2),                  # unpriced seller
+        house("b", generation=2, price=0.9),
+        house("c", consumption=2),                 # unpriced buyer
+        house("d", consumption=2, price=1.2),
+        house("e", consumption=1, price=1.5),
+    ]
+
+    trades = [(t.seller, t.buyer, t.kwh) for t in engine.clear(houses)]
+
+    assert trades == [
+        ("b", "e", 1.0), ("b", "d", 1.0), ("a", "d", 1.0), ("a", "c", 1.0),
+        ("PublicGrid", "c", 1.0),
+    ]
+
+
+def test_pro_rata_shares_the_short_side_evenly():
+    engine = ClearingEngine(WALLETS, allocation="pro_rata")
+    houses = [house("a", generation=3), house("b", consumption=4), house("c", consumption=2)]
+
+    trades = engine.clear(houses)
+    internal = {(t.seller, t.buyer): t.kwh for t in trades if t.is_internal}
+    grid = {t.buyer: t.kwh for t in trades if not t.is_internal}
+
+    assert internal == {("a", "b"): 2.0, ("a", "c"): 1.0}
+    assert grid == {"b": 2.0, "c": 1.0}
+
+
+def test_positions_within_dust_are_left_out():
+    engine = ClearingEngine(WALLETS, precision=3)
+    houses = [house("a", generation=1.0004, consumption=1.0), house("b", consumption=0.0009), house("c", generation=1)]
+
+    trades = engine.clear(houses)
+
+    assert [(t.seller, t.buyer, t.kwh) for t in trades] == [("c", "PublicGrid", 1.0)]
@@ -0,0 +1,45 @@
+from src.connections.solar_metrics_connection import SolarMetricsConnection
+from src.helpers.llm_client import LatencyRecorder
+
+SELLER = "0x" + "a1" * 20
+BUYER = "0x" + "b2" * 20
+LLM_TEXT = f"- Wallet {BUYER} sends 1.5 SOLAR to Wallet {SELLER} on Sonic Network.\n"
+
+
+class Recorder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, *args):
+        self.calls.append(args)
+
+    record = publish = __call__
+
+
+def bare_connection(**attributes):
+    """A connection without its backend socket, output server or worker threads"""
+    connection = SolarMetricsConnection.__new__(SolarMetricsConnection)
+    connection.token_decimals = 18
+    connection.netting = None
+    connection.feed = Recorder()
+    connection.__dict__.update(attributes)
+    return connection
+
+
+def test_llm_decisions_are_netted_and_marked_when_the_server_settles():
+    netting = Recorder()
+    connection = bare_connection(netting=netting)
+
+    connection._publish_llm_decision(LLM_TEXT, tick=3)
+
+    (message, _), = connection.feed.calls
+    assert message["decision"]["settled_by"] == "server"
+    assert netting.calls == [([(BUYER, SELLER, 1.5)],)]
+
+
+def test_get_llm_latency_runs_as_a_registered_action():
+    connection = bare_connection(llm_latency=LatencyRecorder())
+    connection.register_actions()
+
+    assert connection.actions["get-llm-latency"].parameters == []
+    assert connection.perform_action("get-llm-latency", {}) == connection.llm_latency.summary()
@@ -0,0 +1,29 @@
+import queue
+import threading
+
+from src.helpers.tick_coalescer import FeederPool, TickCoalescer
+
+
+def test_house_that_drops_out_is_not_decided_again():
+    decisions = queue.Queue()
+    coalescer = TickCoalescer(decisions.put)
+
+    coalescer.submit({"tick": 1, "houses": [{"house": "a", "net": 2}, {"house": "b", "net": -2}]})
+    decided = [decisions.get(timeout=5)]
+    coalescer.submit({"tick": 2, "houses": [{"house": "a", "net": 1}]})
+    decided.append(decisions.get(timeout=5))
+
+    assert [house["house"] for house in decided[0]["houses"]] == ["a", "b"]
+    assert decided[1] == {"tick": 2, "houses": [{"house": "a", "net": 1}]}
+
+
+def test_invalid_messages_are_counted():
+    done = threading.Event()
+    pool = FeederPool(lambda snapshot: done.set())
+
+    pool.submit("not json")
+    pool.submit('{"houses": [{"house": "a"}]}')
+
+    assert done.wait(5)
+    assert pool.stats["invalid"] == 1
+    assert pool.stats["received"] == 1
@@ -0,0 +1,24 @@
+import json
+
+from src.helpers.transaction_journal import TransactionJournal
+
+
+def test_each_agent_imports_only_its_own_legacy_records(tmp_path):
+    legacy = tmp_path / "transactions_log.json"
+    legacy.write_text(json.dumps([
+        {"sender": "0xA", "txHash": "0x1"},
+        {"sender": "0xb", "txHash": "0x2"},
+        {"sender": "0xa", "txHash": "0x3"},
+    ]))
+
+    journals = {}
+    for wallet in ("0xa", "0xb"):
+        journal = TransactionJournal(str(tmp_path / f"log_{wallet}"), fsync_interval=0)
+        journal.import_legacy(str(legacy), where=lambda record, wallet=wallet: record["sender"].lower() == wallet)
+        # A restart doesn't import the same records again
+        assert journal.import_legacy(str(legacy)) == 0
+        journals[wallet] = [record["txHash"] for record in journal]
+        journal.close()
+
+    assert journals == {"0xa": ["0x1", "0x3"], "0xb": ["0x2"]}
+    assert legacy.exists()
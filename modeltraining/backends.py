@@ -0,0 +1,125 @@
+"""Decision backends shared by evaluate.py and benchmark.py.
+
+A backend factory takes the parsed command-line options and the reference
+ClearingEngine and returns `decide(sample) -> iterator of text pieces`, where
+`sample["snapshot"]` is one energy snapshot. Add one with `@register("name")`
+or pass `--backend package.module:factory` to load it from anywhere on the path.
+"""
+import importlib
+import json
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "Meter Agents"))
+
+from src.helpers.energy_dataset import energy_prompt  # noqa: E402
+
+BACKENDS = {}
+PROMPTS = ("energy", "production")
+
+
+def register(name: str):
+    def decorator(factory):
+        BACKENDS[name] = factory
+        return factory
+    return decorator
+
+
+def load_backend(name: str, options, engine):
+    """Build a registered backend, or one given as 'module:factory'"""
+    if name in BACKENDS:
+        return BACKENDS[name](options, engine)
+    if ":" in name:
+        module, attribute = name.split(":", 1)
+        return getattr(importlib.import_module(module), attribute)(options, engine)
+    raise ValueError(f"Unknown backend '{name}'. Use one of {', '.join(BACKENDS)} or module:factory")
+
+
+def snapshot_wallets(snapshot, engine):
+    """Wallet map for a prompt: the configured houses plus any inline wallets"""
+    wallets = dict(engine.house_wallets)
+    for house in snapshot["houses"]:
+        if house.get("wallet"):
+            wallets[house["house"]] = house["wallet"]
+    return wallets
+
+
+def prompt_style(options, default: str) -> str:
+    return getattr(options, "prompt", None) or default
+
+
+@register("clearing")
+def clearing_backend(options, engine):
+    """The deterministic engine, rendered as text like the live connection does"""
+    def decide(sample):
+        houses = sample["snapshot"]["houses"]
+        yield engine.format_decision(engine.clear(houses), houses)
+    return decide
+
+
+@register("batch")
+def batch_backend(options, engine):
+    """The vectorized NumPy clearing path the connection uses for large grids"""
+    from src.connections.solar_metrics_connection import clear_houses
+
+    def decide(sample):
+        houses = sample["snapshot"]["houses"]
+        yield engine.format_decision(clear_houses(engine, houses, 0, 256), houses)
+    return decide
+
+
+@register("dataset")
+def dataset_backend(options, engine):
+    """The labelled completions in energy.json, to score the training data itself"""
+    def decide(sample):
+        if "completion" not in sample:
+            raise ValueError("sample has no labelled completion")
+        yield sample["completion"]
+    return decide
+
+
+@register("ollama")
+def ollama_backend(options, engine):
+    """A local model behind Ollama, prompted with the training layout by default"""
+    from src.connections.ollama_connection import OllamaConnection
+    from src.connections.solar_metrics_connection import SYSTEM_PROMPT, llm_messages
+
+    connection = OllamaConnection({"base_url": options.base_url or "http://localhost:11434", "model": options.model})
+    connection.preload()
+    production = prompt_style(options, "energy") == "production"
+
+    def decide(sample):
+        snapshot = sample["snapshot"]
+        if production:
+            prompt = llm_messages(json.dumps(snapshot), snapshot_wallets(snapshot, engine))[1]["content"]
+            return connection.stream_text(prompt, SYSTEM_PROMPT, temperature=0)
+        return connection.stream_text(energy_prompt(snapshot), temperature=0)
+    return decide
+
+
+@register("openai")
+def openai_backend(options, engine):
+    """OpenAI or any compatible server (llama.cpp's llama-server), with the live connection's prompt by default"""
+    from openai import OpenAI
+    from src.connections.solar_metrics_connection import llm_messages
+
+    client = OpenAI(base_url=options.base_url) if options.base_url else OpenAI()
+    production = prompt_style(options, "production") == "production"
+
+    def decide(sample):
+        snapshot = sample["snapshot"]
+        if production:
+            messages = llm_messages(json.dumps(snapshot), snapshot_wallets(snapshot, engine))
+        else:
+            messages = [{"role": "user", "content": energy_prompt(snapshot)}]
+        response = client.chat.completions.create(
+            model=options.model,
+            messages=messages,
+            temperature=0,
+            stream=True)
+        for chunk in response:
+            if chunk.choices:
+                yield chunk.choices[0].delta.content or ""
+    return decide
+
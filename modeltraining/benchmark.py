@@ -0,0 +1,137 @@
+"""Benchmark decision backends for speed and settlement correctness.
+
+    python modeltraining/benchmark.py --backend clearing --backend batch --grid-sizes 4,64,1024
+    python modeltraining/benchmark.py --backend ollama --model solarmetrics --grid-sizes 4
+    python modeltraining/benchmark.py --backend openai --model gpt-4 --concurrency 4 --report gpt4.json
+
+Every sample in energy.json, plus `--ticks` synthetic snapshots per grid size,
+is replayed through each backend. The SOLAR transfers in each answer are
+checked with check_settlement (known wallets, buyer pays, every house and the
+Public Grid net exactly their kWh at the engine's price), so any valid
+settlement passes, not only the one ClearingEngine picks. Per backend and
+workload the report gives p50/p95/p99 latency, throughput in ticks per second
+over the wall clock, and the error rate: ticks that raised or settled wrongly.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "Meter Agents"))
+
+from backends import BACKENDS, PROMPTS, load_backend  # noqa: E402
+from src.connections.solar_metrics_connection import SolarMetricsConnection  # noqa: E402
+from src.helpers.energy_dataset import load_samples  # noqa: E402
+from src.helpers.llm_client import LatencyRecorder  # noqa: E402
+from src.helpers.settlement_checks import check_settlement  # noqa: E402
+from src.helpers.solar_clearing import ClearingEngine, parse_decision_text  # noqa: E402
+
+WEATHER = ("sunny", "cloudy", "rainy")
+
+
+def synthetic_grid(size: int, ticks: int, seed: int):
+    """`ticks` random snapshots of `size` houses, each carrying its own wallet"""
+    rng = random.Random(f"{seed}:{size}")
+    names = [f"S{index:05d}" for index in range(size)]
+    wallets = {name: "0x" + hashlib.sha256(name.encode()).hexdigest()[:40] for name in names}
+    samples = []
+    for _ in range(ticks):
+        houses = [{
+            "house": name,
+            "wallet": wallets[name],
+            "generation": round(rng.uniform(0, 6), 1),
+            "consumption": round(rng.uniform(0, 8), 1)
+        } for name in names]
+        samples.append({"snapshot": {"weather": rng.choice(WEATHER), "houses": houses}})
+    return samples
+
+
+def run(decide, samples, engine: ClearingEngine, concurrency: int):
+    latency = LatencyRecorder(window=len(samples) or 1)
+    violations = Counter()
+    outcome = Counter()
+
+    def settle(sample):
+        houses = sample["snapshot"]["houses"]
+        start = time.perf_counter()
+        try:
+            text = "".join(decide(sample))
+        except Exception as e:
+            latency.record(time.perf_counter() - start, error=True)
+            return "error", [f"error: {type(e).__name__}"]
+        latency.record(time.perf_counter() - start)
+        found = check_settlement(houses, parse_decision_text(text), engine)
+        return ("invalid" if found else "valid"), found
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as pool:
+        for status, found in pool.map(settle, samples):
+            outcome[status] += 1
+            violations.update(reason.split(":", 1)[0] for reason in found)
+    wall = time.perf_counter() - start
+
+    total = max(len(samples), 1)
+    return {
+        "ticks": len(samples),
+        "valid": outcome["valid"],
+        "invalid": outcome["invalid"],
+        "errors": outcome["error"],
+        "error_rate": (outcome["invalid"] + outcome["error"]) / total,
+        "violations": dict(violations),
+        "throughput_tps": len(samples) / wall if wall else float("inf"),
+        "wall_s": wall,
+        "latency": latency.summary()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark decision backends on energy.json and synthetic grids")
+    parser.add_argument("--backend", action="append", help=f"{', '.join(BACKENDS)} or module:factory; repeatable")
+    parser.add_argument("--model", default="solarmetrics")
+    parser.add_argument("--base-url", help="Ollama URL, or base URL of an OpenAI-compatible server")
+    parser.add_argument("--prompt", choices=PROMPTS, help="Training layout or the live connection's prompt")
+    parser.add_argument("--dataset", default=os.path.join(HERE, "energy.json"))
+    parser.add_argument("--no-dataset", action="store_true", help="Only run the synthetic grids")
+    parser.add_argument("--grid-sizes", default="16,256", help="Comma-separated synthetic grid sizes, '' for none")
+    parser.add_argument("--ticks", type=int, default=50, help="Synthetic snapshots per grid size")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--concurrency", type=int, default=1, help="Ticks decided at once")
+    parser.add_argument("--price-per-kwh", type=float, default=1.0)
+    parser.add_argument("--report", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    engine = ClearingEngine(SolarMetricsConnection.house_wallets, price_per_kwh=args.price_per_kwh)
+    workloads = {}
+    if not args.no_dataset:
+        workloads["energy.json"] = load_samples(args.dataset)
+    for size in filter(None, args.grid_sizes.split(",")):
+        workloads[f"synthetic x{int(size)}"] = synthetic_grid(int(size), args.ticks, args.seed)
+
+    results = []
+    for name in args.backend or ["clearing"]:
+        decide = load_backend(name, args, engine)
+        for workload, samples in workloads.items():
+            result = {"backend": name, "workload": workload, **run(decide, samples, engine, args.concurrency)}
+            results.append(result)
+            latency = result["latency"]
+            print(f"📊 {name:<10} {workload:<18} {result['ticks']:>5} ticks | "
+                  f"p50 {latency.get('p50_ms', 0):8.2f} ms | p95 {latency.get('p95_ms', 0):8.2f} ms | "
+                  f"p99 {latency.get('p99_ms', 0):8.2f} ms | {result['throughput_tps']:9.1f} ticks/s | "
+                  f"errors {result['error_rate']:.1%}")
+            if result["violations"]:
+                print(f"   ⚠️ {result['violations']}")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Convert energy.json into fine-tuning files for a local decision model.
+
+    python modeltraining/convert_energy.py --format chat --relabel --modelfile modeltraining/Modelfile
+
+Writes a training and a held-out evaluation split as JSON Lines, either as
+prompt/completion pairs (llama.cpp, unsloth, axolotl) or as chat messages
+(OpenAI-style fine-tuning). With --relabel every completion is regenerated
+from the deterministic clearing engine, so the model learns one consistent
+answer per snapshot. --modelfile writes an Ollama Modelfile that serves the
+tuned weights with the same prompt layout SolarMetricsConnection sends.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "Meter Agents"))
+
+from src.connections.solar_metrics_connection import SolarMetricsConnection  # noqa: E402
+from src.helpers.energy_dataset import energy_prompt, format_completion, load_samples  # noqa: E402
+from src.helpers.solar_clearing import ClearingEngine  # noqa: E402
+
+FORMATS = ("completion", "chat")
+
+MODELFILE = '''FROM {base}
+TEMPLATE """{{{{ .Prompt }}}}"""
+PARAMETER temperature 0
+PARAMETER num_predict {num_predict}
+PARAMETER stop "Energy data:"
+PARAMETER stop "###"
+'''
+
+
+def is_holdout(prompt: str, fraction: float) -> bool:
+    """Stable split: the same prompt always lands on the same side"""
+    bucket = int(hashlib.sha256(prompt.encode()).hexdigest()[:8], 16) / 0xFFFFFFFF
+    return bucket < fraction
+
+
+def to_record(prompt: str, completion: str, fmt: str):
+    if fmt == "chat":
+        return {"messages": [{"role": "user", "content": prompt}, {"role": "assistant", "content": completion}]}
+    return {"prompt": prompt, "completion": completion}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert energy.json into fine-tuning JSON Lines")
+    parser.add_argument("--input", default=os.path.join(HERE, "energy.json"))
+    parser.add_argument("--output-dir", default=HERE)
+    parser.add_argument("--format", choices=FORMATS, default="completion")
+    parser.add_argument("--relabel", action="store_true", help="Regenerate completions with the clearing engine")
+    parser.add_argument("--holdout", type=float, default=0.2, help="Fraction of snapshots kept for evaluation")
+    parser.add_argument("--price-per-kwh", type=float, default=1.0)
+    parser.add_argument("--modelfile", help="Also write an Ollama Modelfile to this path")
+    parser.add_argument("--base", default="./solarmetrics.gguf", help="Weights the Modelfile points at")
+    parser.add_argument("--num-predict", type=int, default=512)
+    args = parser.parse_args()
+
+    engine = ClearingEngine(SolarMetricsConnection.house_wallets, price_per_kwh=args.price_per_kwh)
+    samples = load_samples(args.input)
+
+    splits = {"train": [], "eval": []}
+    seen = set()
+    for sample in samples:
+        # Re-render the prompt so training matches what the connection sends byte for byte
+        prompt = energy_prompt(sample["snapshot"])
+        if prompt in seen:
+            continue
+        seen.add(prompt)
+
+        completion = sample["completion"]
+        if args.relabel:
+            houses = sample["snapshot"]["houses"]
+            completion = format_completion(engine.clear(houses), houses, engine)
+        split = "eval" if is_holdout(prompt, args.holdout) else "train"
+        splits[split].append(to_record(prompt, completion, args.format))
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for split, records in splits.items():
+        path = os.path.join(args.output_dir, f"energy_{split}.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        print(f"✅ Wrote {len(records)} {split} records to {path}")
+
+    print(f"ℹ️ {len(samples)} samples read, {len(samples) - len(seen)} duplicate snapshots dropped")
+
+    if args.modelfile:
+        with open(args.modelfile, "w", encoding="utf-8") as f:
+            f.write(MODELFILE.format(base=args.base, num_predict=args.num_predict))
+        print(f"✅ Wrote {args.modelfile}; load it with: ollama create solarmetrics -f {args.modelfile}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Score a decision model against the deterministic clearing engine.
+
+    python modeltraining/evaluate.py --backend ollama --model solarmetrics
+    python modeltraining/evaluate.py --backend openai --model gpt-4 --dataset modeltraining/energy_eval.jsonl
+
+Every snapshot is sent to the backend (see backends.py) and the SOLAR
+transfers in the answer are compared with what ClearingEngine settles for
+the same snapshot:
+
+- exact: the same transfers (payer, payee, amount), in any order
+- net: every wallet ends up with the same SOLAR balance change, which is what
+  settlement actually depends on; a different but valid pairing still counts
+- parsed: the answer contained at least one well-formed transfer line
+
+Latency is reported as total time and time to the first streamed token.
+The `dataset` backend scores the energy.json labels themselves and `clearing`
+is the engine against itself, a sanity check that should score 100%.
+benchmark.py adds rule checks, synthetic grids and throughput.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "Meter Agents"))
+
+from backends import BACKENDS, PROMPTS, load_backend  # noqa: E402
+from src.connections.solar_metrics_connection import SolarMetricsConnection  # noqa: E402
+from src.helpers.energy_dataset import load_samples, net_flows, parse_prompt  # noqa: E402
+from src.helpers.llm_client import LatencyRecorder  # noqa: E402
+from src.helpers.solar_clearing import ClearingEngine, parse_decision_text  # noqa: E402
+
+
+def read_dataset(path: str):
+    """Samples from energy.json, or from a JSON Lines split written by convert_energy.py"""
+    if not path.endswith(".jsonl"):
+        return load_samples(path)
+
+    samples = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if "messages" in record:
+                record = {"prompt": record["messages"][0]["content"], "completion": record["messages"][-1]["content"]}
+            snapshot = parse_prompt(record["prompt"])
+            if snapshot is not None:
+                samples.append({**record, "snapshot": snapshot})
+    return samples
+
+
+def normalized(transfers, precision: int):
+    return sorted((sender.lower(), recipient.lower(), round(float(amount), precision))
+                  for sender, recipient, amount in transfers)
+
+
+def evaluate(samples, backend, engine: ClearingEngine, verbose: bool = False):
+    latency = LatencyRecorder(window=len(samples) or 1)
+    first_token = LatencyRecorder(window=len(samples) or 1)
+    scores = {"samples": len(samples), "exact": 0, "net": 0, "parsed": 0}
+    failures = []
+
+    for index, sample in enumerate(samples):
+        houses = sample["snapshot"]["houses"]
+        expected = engine.transfers(engine.clear(houses), houses)
+
+        start = time.perf_counter()
+        pieces = []
+        try:
+            for piece in backend(sample):
+                if not pieces:
+                    first_token.record(time.perf_counter() - start)
+                pieces.append(piece)
+        except Exception as e:
+            latency.record(time.perf_counter() - start, error=True)
+            failures.append({"sample": index, "error": str(e)})
+            continue
+        elapsed = time.perf_counter() - start
+        latency.record(elapsed)
+
+        text = "".join(pieces)
+        actual = parse_decision_text(text)
+        exact = normalized(actual, engine.precision) == normalized(expected, engine.precision)
+        net = net_flows(actual, engine.precision) == net_flows(expected, engine.precision)
+        scores["parsed"] += bool(actual) or not expected
+        scores["exact"] += exact
+        scores["net"] += net
+        if not net:
+            failures.append({"sample": index, "snapshot": sample["snapshot"], "answer": text})
+        if verbose:
+            print(f"{'✅' if net else '❌'} #{index} exact={exact} net={net} "
+                  f"{elapsed * 1000:.0f} ms")
+
+    total = max(scores["samples"], 1)
+    return {
+        **scores,
+        "exact_rate": scores["exact"] / total,
+        "net_rate": scores["net"] / total,
+        "parse_rate": scores["parsed"] / total,
+        "latency": latency.summary(),
+        "first_token": first_token.summary(),
+        "failures": failures
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate a decision model against the clearing engine")
+    parser.add_argument("--backend", default="ollama", help=f"{', '.join(BACKENDS)} or module:factory")
+    parser.add_argument("--model", default="solarmetrics")
+    parser.add_argument("--prompt", choices=PROMPTS, help="Training layout or the live connection's prompt")
+    parser.add_argument("--base-url", help="Ollama URL, or base URL of an OpenAI-compatible server")
+    parser.add_argument("--dataset", default=os.path.join(HERE, "energy.json"))
+    parser.add_argument("--limit", type=int, help="Only evaluate the first N samples")
+    parser.add_argument("--price-per-kwh", type=float, default=1.0)
+    parser.add_argument("--report", help="Write the full report, failures included, to this JSON file")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    engine = ClearingEngine(SolarMetricsConnection.house_wallets, price_per_kwh=args.price_per_kwh)
+    samples = read_dataset(args.dataset)[:args.limit]
+    report = evaluate(samples, load_backend(args.backend, args, engine), engine, verbose=args.verbose)
+
+    latency, first_token = report["latency"], report["first_token"]
+    print(f"\n📊 {args.backend}:{args.model} on {report['samples']} samples")
+    print(f"   exact {report['exact_rate']:.1%} | net {report['net_rate']:.1%} | parsed {report['parse_rate']:.1%} "
+          f"| errors {latency['errors']}")
+    if "p50_ms" in latency:
+        print(f"   latency p50 {latency['p50_ms']:.0f} ms | p95 {latency['p95_ms']:.0f} ms "
+              f"| p99 {latency['p99_ms']:.0f} ms | max {latency['max_ms']:.0f} ms")
+    if "p50_ms" in first_token:
+        print(f"   first token p50 {first_token['p50_ms']:.0f} ms | p95 {first_token['p95_ms']:.0f} ms")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()